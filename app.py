@@ -1,24 +1,32 @@
 # app.py
-# FastAPI server for HFTSim (API only calls CLIs; no training logic here)
+# FastAPI server for HFTSim (API dispatches train/backtest to a warm worker pool; no training logic here)
 
 from fastapi import FastAPI, Request, Query, HTTPException
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
 import os
-import sys
 import json
 import time
-import subprocess
+import numpy as np
 import pandas as pd
 
 # Trigger auto-registration for factors/models (metadata only; no training here)
 import factors
 import models
 from factors.base import get_all_factors
-from factors.engine import compute_factors
+from factors.cache import cached_factors, factor_code_hash, get_factor_cache
 from models.base import get_all_models
+from experiments.dataset import data_exists
+from experiments.downsample import FORMATS, METHODS, downsample, downsample_curve, encode_payload
+from experiments.pyramid import SeriesPyramid
+from experiments.tickstore import align_top_of_book, load_ticks
+from experiments import executor
+from experiments.jobs import JOBS, data_stamp
+from experiments.thresholds import load_sweep
+from experiments.artifacts import MODEL_FILE, TEST_FILES, artifact_stamp, get_artifact_cache
+from experiments.preprocess import PREPROCESS_FILE
 
 # -----------------------------------------------------------------------------
 # FastAPI app & static/templates
@@ -46,22 +54,109 @@ templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
 # -----------------------------------------------------------------------------
 # Helpers
 # -----------------------------------------------------------------------------
-def _run(cmd: list[str]) -> str:
+def _submit_train(factor: str, model: str, horizon: int, eps: float, drop_equal: bool,
+                  scale: bool, data_path: str, onnx: bool = False) -> tuple:
     """
-    Run a subprocess command and return stdout. Raise HTTPException on failure.
+    Queue a training job (experiments.train.run_train in a warm worker).
+    Identical in-flight requests (same factors/model/horizon/eps/flags/data) share one job.
     """
+    factors_norm = ",".join(s.strip() for s in factor.split(",") if s.strip())
+    key = ("train", factors_norm, model, horizon, float(eps), drop_equal, scale, onnx, data_stamp(data_path))
+    outdir = _mk_outdir(model, factor, horizon, eps)
+    params = {
+        "data": data_path,
+        "model": model,
+        "factors": factors_norm,
+        "horizon": horizon,
+        "eps": eps,
+        "drop_equal": drop_equal,
+        "scale": scale,
+        "test_size": 1.0 / 6.0,  # 5:1 split
+        "outdir": outdir,
+        "onnx": onnx,
+    }
     try:
-        p = subprocess.run(cmd, capture_output=True, text=True)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to spawn process: {e}")
+        job, dedup = JOBS.submit("train", executor.train_task, params, key)
+    except RuntimeError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    if dedup:
+        try:
+            os.rmdir(outdir)  # unused (still empty) dir of the duplicate request
+        except OSError:
+            pass
+    return job, dedup
+
+
+def _submit_backtest(artifacts_dir: str, horizon: int, data_path: str, latency_ticks: int = 0,
+                     rescore: bool = False) -> tuple:
+    """Queue a backtest job (experiments.backtest.run_backtest in a warm worker)."""
+    key = ("backtest", os.path.abspath(artifacts_dir), horizon, latency_ticks, rescore,
+           data_stamp(data_path), data_stamp("configs/run.yaml"))
+    params = {
+        "artdir": artifacts_dir,
+        "data_path": data_path,
+        "horizon": horizon,
+        "json_path": None,
+        "fees_cfg": "configs/run.yaml",
+        "latency_ticks": latency_ticks,
+        "rescore": rescore,
+    }
+    try:
+        return JOBS.submit("backtest", executor.backtest_task, params, key)
+    except RuntimeError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+
+BACKTEST_FILES = (MODEL_FILE, PREPROCESS_FILE) + TEST_FILES
+PYRAMID_SERIES = ("pnl", "pnl_net", "drawdown", "drawdown_net", "position", "y_prob")
+
+
+def _backtest_key(horizon: int, data_path: str, latency_ticks: int, rescore: bool) -> tuple:
+    return (horizon, latency_ticks, rescore, data_stamp(data_path), data_stamp("configs/run.yaml"))
+
+
+async def _backtest_result(artifacts_dir: str, horizon: int, data_path: str, latency_ticks: int, rescore: bool) -> dict:
+    """Full-resolution backtest result (NumPy series); same run + same inputs are served from memory."""
+    cache = get_artifact_cache()
+    extra = _backtest_key(horizon, data_path, latency_ticks, rescore)
+    result = cache.get(artifacts_dir, "backtest_result", BACKTEST_FILES, extra)
+    if result is None:
+        stamp = artifact_stamp(artifacts_dir, BACKTEST_FILES)
+        job, _ = _submit_backtest(artifacts_dir, horizon, data_path, latency_ticks, rescore)
+        await job.wait()
+        result = cache.put(artifacts_dir, "backtest_result", BACKTEST_FILES, _job_result(job),
+                           extra=extra, stamp=stamp)
+    return result
+
 
-    if p.returncode != 0:
-        err = (p.stderr or "").strip()
-        out = (p.stdout or "").strip()
-        msg = err if err else out if out else "subprocess failed"
-        raise HTTPException(status_code=500, detail=msg)
+def _job_result(job):
+    """Result of a finished job (artifacts_dir attached); HTTPException otherwise."""
+    status = job.status
+    if status == "failed":
+        raise HTTPException(status_code=500, detail=job.error)
+    if status == "cancelled":
+        raise HTTPException(status_code=410, detail=f"Job {job.id} was cancelled")
+    if status != "done":
+        raise HTTPException(status_code=409, detail=f"Job {job.id} is {status}")
+    out = dict(job.result)
+    out["artifacts_dir"] = job.params.get("outdir") or job.params.get("artdir")
+    return out
 
-    return (p.stdout or "").strip()
+
+def _chart_params(method: str, fmt: str) -> None:
+    if method not in METHODS:
+        raise HTTPException(status_code=400, detail=f"method must be one of {list(METHODS)}")
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {list(FORMATS)}")
+
+
+def _encoded(payload: dict, fmt: str = "json", table_key=None) -> Response:
+    """Serialize a payload holding NumPy arrays (experiments/downsample.encode_payload)."""
+    try:
+        body, media_type = encode_payload(payload, fmt, table_key=table_key)
+    except ImportError as e:
+        raise HTTPException(status_code=400, detail=f"format={fmt} unavailable: {e}")
+    return Response(content=body, media_type=media_type)
 
 
 def _mk_outdir(model: str, factor: str, horizon: int, eps: float) -> str:
@@ -80,23 +175,10 @@ def _ensure_midprice(df: pd.DataFrame) -> pd.DataFrame:
     """Construct midprice if needed (used by /api/compute)."""
     if "midprice" in df.columns:
         return df
-    if {"bid", "ask"}.issubset(df.columns):
-        df = df.copy()
-        df["midprice"] = (df["bid"] + df["ask"]) / 2.0
-        return df
-    if {"side", "price"}.issubset(df.columns):
-        buy = df[df["side"] == "BUY"].reset_index(drop=True)
-        sell = df[df["side"] == "SELL"].reset_index(drop=True)
-        if len(buy) != len(sell):
-            raise HTTPException(status_code=400, detail="BUY/SELL row count mismatch; cannot build midprice")
-        out = pd.DataFrame({"ts_ns": buy["ts_ns"].values})
-        out["midprice"] = (buy["price"].values + sell["price"].values) / 2.0
-        return out
-    if "price" in df.columns:
-        df = df.copy()
-        df["midprice"] = df["price"]
-        return df
-    raise HTTPException(status_code=400, detail="No suitable columns to construct midprice")
+    try:
+        return align_top_of_book(df)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 # -----------------------------------------------------------------------------
@@ -133,42 +215,99 @@ async def api_models():
         safe[name] = {
             "name": meta.get("name", name),
             "desc": meta.get("desc", ""),
-            "task": meta.get("task", "classification")
+            "task": meta.get("task", "classification"),
+            "online": bool(meta.get("online", False))
         }
     return JSONResponse(safe)
 
 
 @app.get("/api/compute")
-async def api_compute(
+def api_compute(
     factor: str = Query(..., description="Single factor name"),
-    data_path: str = Query("data/orderbook_top_ticks.csv", description="CSV path")
+    data_path: str = Query("data/orderbook_top_ticks.csv",
+                           description="CSV path, tick store or dataset spec (root?instrument=..&start=..&end=..)"),
+    points: int = Query(0, description="Downsample to ~points rows (plot width); 0 = all rows"),
+    method: str = Query("minmax", description="minmax | lttb"),
+    start_ns: int = Query(None, description="Only rows with x >= start_ns"),
+    end_ns: int = Query(None, description="Only rows with x <= end_ns"),
+    format: str = Query("json", description="json | b64 (typed-array buffers) | arrow (IPC stream)"),
 ):
     """
-    Compute one factor's time series and return {x, y}.
+    Compute one factor's time series and return {x, y, downsample}.
+    Served from the on-disk factor cache (factors/cache.py) when the CSV, the
+    factor and its code are unchanged; the CSV is only parsed on a miss.
+    Plain def: FastAPI runs it in the threadpool so parsing/computing never blocks the event loop.
     """
-    try:
-        df = pd.read_csv(data_path)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to read CSV: {e}")
-
-    df = _ensure_midprice(df)
+    _chart_params(method, format)
+    ts, series = _factor_series(factor, data_path)
+    # 按图宽降采样 / 截取时间窗，再按 format 编码（json 下 x 仍是字符串，兼容旧前端）
+    x, sub, info = downsample(ts, {"y": series}, points, method, start_ns, end_ns)
+    return _encoded({"x": x, "y": sub["y"], "downsample": info}, format)
+
+
+def _factor_series(factor: str, data_path: str):
+    """(x, y) arrays of one factor: on-disk factor cache first, ticks are only parsed on a miss."""
+    if not data_exists(data_path):
+        raise HTTPException(status_code=400, detail=f"Failed to read CSV: {data_path} not found")
+
+    loaded = {}
+
+    def load_df() -> pd.DataFrame:
+        if "df" not in loaded:
+            try:
+                df = load_ticks(data_path)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=f"Failed to read CSV: {e}")
+            loaded["df"] = _ensure_midprice(df)
+        return loaded["df"]
 
     try:
-        X = compute_factors(df, [factor])
+        X = cached_factors(data_path, [factor], load_df)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Factor compute failed: {e}")
 
     if factor not in X.columns:
         raise HTTPException(status_code=400, detail=f"Factor {factor} not computed")
 
-    series = X[factor].fillna(0)
+    series = X[factor].fillna(0).to_numpy()
     # x 轴优先 ts_ns，否则用 index
-    if "ts_ns" in df.columns:
-        x = df.loc[series.index, "ts_ns"].astype(str).tolist()
-    else:
-        x = series.index.astype(str).tolist()
+    ts = get_factor_cache().get_or_build(
+        data_path, "ts_ns", "column",
+        lambda: load_df()["ts_ns"].to_numpy() if "ts_ns" in load_df().columns else np.arange(len(load_df()))
+    )
+    return ts, series
+
+
+@app.get("/api/compute/range")
+def api_compute_range(
+    factor: str = Query(..., description="Single factor name"),
+    data_path: str = Query("data/orderbook_top_ticks.csv"),
+    start_ns: int = Query(None, description="Window start (inclusive); omit for the first row"),
+    end_ns: int = Query(None, description="Window end (inclusive); omit for the last row"),
+    points: int = Query(1500, description="Max buckets returned"),
+    format: str = Query("json", description="json | b64 | arrow"),
+):
+    """
+    Zoom query on a factor series: min/max/last per bucket at the pyramid level that fits
+    `points` buckets into [start_ns, end_ns]. The pyramid is built once per (data, factor code)
+    and kept in the artifact cache, so each query costs O(points).
+    """
+    _chart_params("minmax", format)
+    if not data_exists(data_path):
+        raise HTTPException(status_code=400, detail=f"Failed to read CSV: {data_path} not found")
 
-    return {"x": x, "y": series.tolist()}
+    def build() -> SeriesPyramid:
+        ts, y = _factor_series(factor, data_path)
+        return SeriesPyramid(ts, {"y": y})
+
+    extra = (factor, factor_code_hash(factor), data_stamp(data_path))
+    pyr = get_artifact_cache().get_or_load(data_path, "factor_pyramid", (), build,
+                                           extra=extra, nbytes=lambda p: p.nbytes)
+    return _encoded(pyr.query(start_ns, end_ns, points), format, table_key="series")
 
 
 @app.get("/api/train")
@@ -180,43 +319,16 @@ async def api_train(
     drop_equal: bool = Query(False),
     scale: bool = Query(True),
     data_path: str = Query("data/orderbook_top_ticks.csv"),
+    onnx: bool = Query(False, description="Also export model.onnx + feature_order.json (parity-checked)"),
 ):
     """
-    API only *calls* the CLI trainer (experiments/train.py).
+    Runs experiments.train.run_train in a warm worker (same code path as the CLI).
     Uses fixed 5:1 split => test_size = 1/6.
     Returns meta.json + artifacts_dir.
     """
-    outdir = _mk_outdir(model, factor, horizon, eps)
-
-    cmd = [
-        sys.executable, "-m", "experiments.train",
-        "--data", data_path,
-        "--model", model,
-        "--factors", factor,
-        "--horizon", str(horizon),
-        "--eps", str(eps),
-        "--test_size", str(1.0 / 6.0),  # 5:1 split
-        "--outdir", outdir,
-    ]
-    if drop_equal:
-        cmd.append("--drop_equal")
-    if scale:
-        cmd.append("--scale")
-
-    _ = _run(cmd)
-
-    meta_path = os.path.join(outdir, "meta.json")
-    if not os.path.exists(meta_path):
-        raise HTTPException(status_code=500, detail="meta.json not found after training")
-
-    try:
-        with open(meta_path, "r") as f:
-            meta = json.load(f)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to read meta.json: {e}")
-
-    meta["artifacts_dir"] = outdir
-    return JSONResponse(meta)
+    job, _ = _submit_train(factor, model, horizon, eps, drop_equal, scale, data_path, onnx)
+    await job.wait()
+    return JSONResponse(_job_result(job))
 
 
 @app.get("/api/backtest")
@@ -230,12 +342,20 @@ async def api_backtest(
     model: str = Query(None, description="Required if artifacts_dir is omitted"),
     horizon: int = Query(5),
     data_path: str = Query("data/orderbook_top_ticks.csv"),
+    latency_ticks: int = Query(0, description="Signal delay (ticks) for the net-of-cost PnL"),
+    rescore: bool = Query(False, description="Score all rows of data_path via the run's saved preprocessing"),
+    points: int = Query(0, description="Downsample series to ~points rows (plot width); 0 = all rows"),
+    method: str = Query("minmax", description="minmax | lttb (on pnl_net)"),
+    start_ns: int = Query(None, description="Only test rows with ts >= start_ns"),
+    end_ns: int = Query(None, description="Only test rows with ts <= end_ns"),
+    format: str = Query("json", description="json | b64 (typed-array buffers) | arrow (IPC stream of series)"),
 ):
     """
-    API only *calls* the CLI backtester (experiments/backtest.py).
+    Runs experiments.backtest.run_backtest in a warm worker (same code path as the CLI).
     If artifacts_dir is not provided, it will call /api/train first (with same horizon).
-    Returns {threshold, series{ts,ret,signals,pnl,y_test,y_prob}, artifacts_dir}.
+    Returns {threshold, series{ts,ret,signals,pnl,pnl_net,y_test,y_prob}, risk, risk_net, artifacts_dir, downsample}.
     """
+    _chart_params(method, format)
     # If no artifacts_dir, train once to produce artifacts
     if not artifacts_dir:
         if not (factor and model):
@@ -249,30 +369,167 @@ async def api_backtest(
             drop_equal=False,
             scale=True,
             data_path=data_path,
+            onnx=False,
         )
         # train_meta is a JSONResponse; extract body
         train_meta_body = json.loads(train_meta.body.decode()) if hasattr(train_meta, "body") else train_meta
         artifacts_dir = train_meta_body["artifacts_dir"]
 
-    # Run backtest CLI and write JSON to artifacts_dir/backtest.json
-    backtest_json = os.path.join(artifacts_dir, "backtest.json")
-    cmd = [
-        sys.executable, "-m", "experiments.backtest",
-        "--artdir", artifacts_dir,
-        "--data", data_path,
-        "--horizon", str(horizon),
-        "--json", backtest_json,
-    ]
-    _ = _run(cmd)
-
-    if not os.path.exists(backtest_json):
-        raise HTTPException(status_code=500, detail="backtest.json not found after backtest")
-
-    try        :
-        with open(backtest_json, "r") as f:
-            payload = json.load(f)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to read backtest.json: {e}")
+    # each (window, points, method, format) view of the run's arrays is encoded once and kept as bytes
+    cache = get_artifact_cache()
+    view = _backtest_key(horizon, data_path, latency_ticks, rescore) + (points, method, start_ns, end_ns, format)
+    body = cache.get(artifacts_dir, "backtest_payload", BACKTEST_FILES, view)
+    if body is not None:
+        return Response(content=body, media_type=FORMATS[format])
+    stamp = artifact_stamp(artifacts_dir, BACKTEST_FILES)
+    result = await _backtest_result(artifacts_dir, horizon, data_path, latency_ticks, rescore)
+    series = result["series"]
+    ts, sub, info = downsample(series["ts"], {k: v for k, v in series.items() if k != "ts"},
+                               points, method, start_ns, end_ns,
+                               keys=("pnl_net", "pnl", "drawdown", "drawdown_net", "y_prob"))
+    curves = dict(result.get("curves") or {})
+    curves["pr"] = downsample_curve(curves.get("pr"), points, "precision")
+    payload = dict(result, series=dict(sub, ts=ts), downsample=info, curves=curves)
+    resp = _encoded(payload, format, table_key="series")
+    cache.put(artifacts_dir, "backtest_payload", BACKTEST_FILES, resp.body, extra=view, nbytes=len(resp.body), stamp=stamp)
+    return resp
+
+
+@app.get("/api/backtest/range")
+async def api_backtest_range(
+    artifacts_dir: str = Query(..., description="artifacts_dir of a trained run"),
+    horizon: int = Query(5),
+    data_path: str = Query("data/orderbook_top_ticks.csv"),
+    latency_ticks: int = Query(0),
+    rescore: bool = Query(False),
+    start_ns: int = Query(None, description="Window start (inclusive); omit for the first test row"),
+    end_ns: int = Query(None, description="Window end (inclusive); omit for the last test row"),
+    points: int = Query(1500, description="Max buckets returned"),
+    format: str = Query("json", description="json | b64 | arrow"),
+):
+    """
+    Zoom query on the backtest series (pnl, pnl_net, drawdown, drawdown_net, position, y_prob):
+    min/max/last per bucket from a pyramid built once per run + inputs, O(points) per query.
+    """
+    _chart_params("minmax", format)
+    extra = _backtest_key(horizon, data_path, latency_ticks, rescore)
+    cache = get_artifact_cache()
+    pyr = cache.get(artifacts_dir, "backtest_pyramid", BACKTEST_FILES, extra)
+    if pyr is None:
+        stamp = artifact_stamp(artifacts_dir, BACKTEST_FILES)
+        series = (await _backtest_result(artifacts_dir, horizon, data_path, latency_ticks, rescore))["series"]
+        pyr = SeriesPyramid(series["ts"], {k: series.get(k) for k in PYRAMID_SERIES})
+        cache.put(artifacts_dir, "backtest_pyramid", BACKTEST_FILES, pyr, extra=extra, nbytes=pyr.nbytes, stamp=stamp)
+    return _encoded(pyr.query(start_ns, end_ns, points), format, table_key="series")
+
+
+@app.get("/api/backtest/threshold")
+def api_backtest_threshold(
+    artifacts_dir: str = Query(..., description="artifacts_dir of a finished backtest"),
+    t_long: float = Query(..., description="long if prob > t_long"),
+    t_short: float = Query(None, description="short if prob < t_short (omit for long-only)"),
+    horizon: int = Query(5),
+    latency_ticks: int = Query(0),
+    rescore: bool = Query(False),
+    series: bool = Query(True, description="Include cumulative PnL series for redraw"),
+    points: int = Query(0, description="Downsample the series to ~points rows; 0 = all rows"),
+    method: str = Query("minmax", description="minmax | lttb (on pnl_net)"),
+    start_ns: int = Query(None),
+    end_ns: int = Query(None),
+    format: str = Query("json", description="json | b64 | arrow"),
+):
+    """
+    Threshold lookup without re-running the model: answered from the sweep structure
+    (threshold_sweep_h*_l*.npz) the backtest of artifacts_dir wrote for this horizon/latency.
+    series.ts is the test-set time axis when the sweep file carries it (row index otherwise).
+    """
+    _chart_params(method, format)
+    try:
+        sw = load_sweep(artifacts_dir, horizon, latency_ticks, rescore)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if t_short is not None and t_short > t_long:
+        raise HTTPException(status_code=400, detail="t_short must be <= t_long")
+    out = sw.at(t_long, t_short, with_path=series)
+    out.update({"artifacts_dir": artifacts_dir, "latency_ticks": sw.latency_ticks, **getattr(sw, "meta", {})})
+    if series:
+        x = sw.ts if sw.ts is not None else np.arange(sw.n, dtype=np.int64)
+        x, path, out["downsample"] = downsample(x, out["series"], points, method, start_ns, end_ns,
+                                                keys=("pnl_net", "pnl"))
+        out["series"] = dict(path, ts=x)
+    return _encoded(out, format, table_key="series")
+
+
+# -----------------------------------------------------------------------------
+# Jobs: submit -> job_id, then poll status / result
+# -----------------------------------------------------------------------------
+@app.post("/api/jobs/train")
+async def api_jobs_train(
+    factor: str = Query(..., description="Comma-separated factor names"),
+    model: str = Query(...),
+    horizon: int = Query(5),
+    eps: float = Query(0.0),
+    drop_equal: bool = Query(False),
+    scale: bool = Query(True),
+    data_path: str = Query("data/orderbook_top_ticks.csv"),
+    onnx: bool = Query(False, description="Also export model.onnx + feature_order.json (parity-checked)"),
+):
+    """Queue a training job; returns {job_id, status, deduplicated} immediately."""
+    job, dedup = _submit_train(factor, model, horizon, eps, drop_equal, scale, data_path, onnx)
+    return JSONResponse({"job_id": job.id, "status": job.status, "deduplicated": dedup})
+
+
+@app.post("/api/jobs/backtest")
+async def api_jobs_backtest(
+    artifacts_dir: str = Query(..., description="artifacts_dir of a finished training job"),
+    horizon: int = Query(5),
+    data_path: str = Query("data/orderbook_top_ticks.csv"),
+    latency_ticks: int = Query(0),
+    rescore: bool = Query(False),
+):
+    """Queue a backtest job; returns {job_id, status, deduplicated} immediately."""
+    job, dedup = _submit_backtest(artifacts_dir, horizon, data_path, latency_ticks, rescore)
+    return JSONResponse({"job_id": job.id, "status": job.status, "deduplicated": dedup})
+
+
+@app.get("/api/jobs")
+async def api_jobs():
+    return JSONResponse(JOBS.list())
+
+
+def _get_job(job_id: str):
+    job = JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+
+@app.get("/api/jobs/{job_id}")
+async def api_job_status(job_id: str):
+    """Status / progress of one job (queued | running | done | failed | cancelled)."""
+    return JSONResponse(_get_job(job_id).info())
+
+
+@app.get("/api/jobs/{job_id}/result")
+async def api_job_result(job_id: str):
+    """Result of a finished job; 202 + status while queued/running, 410 if cancelled."""
+    job = _get_job(job_id)
+    if job.status in ("queued", "running"):
+        return JSONResponse(job.info(), status_code=202)
+    return _encoded(_job_result(job))
+
+
+@app.post("/api/jobs/{job_id}/cancel")
+async def api_job_cancel(job_id: str):
+    return JSONResponse(JOBS.cancel(_get_job(job_id).id).info())
+
+
+@app.get("/api/artifacts/cache")
+def api_artifact_cache():
+    """Hit/miss counters and memory use of the API-process artifact cache."""
+    return JSONResponse(get_artifact_cache().stats())
+
 
-    payload["artifacts_dir"] = artifacts_dir
-    return JSONResponse(payload)
+@app.on_event("shutdown")
+def _shutdown_pool():
+    executor.shutdown()
@@ -1,11 +1,18 @@
 # dashboard_review.py
+# 复盘计算在 experiments/review.py（向量化 + 按文件 mtime/粒度记忆化），这里只负责控件与绘图。
+# 实时模式：experiments/live_review.py 按字节偏移 tail 成交/信号文件（或命名管道），每次刷新只处理新增成交。
+# 订单生命周期：experiments/orders.py 按 buy_id / sell_id 建索引，逐订单 VWAP、成交笔数、完成耗时、排队代理指标。
 import os
-import math
+import time
 import numpy as np
 import pandas as pd
 import altair as alt
 import streamlit as st
 
+from experiments.live_review import LiveReview
+from experiments.orders import order_review
+from experiments.review import BUCKETS, chart_frame, review
+
 st.set_page_config(page_title="HFTSim – Industrial Review", layout="wide")
 st.title("🏦 HFTSim – Strategy Review Dashboard")
 
@@ -14,182 +21,94 @@ st.title("🏦 HFTSim – Strategy Review Dashboard")
 # -------------------------------
 SIGNAL_FILE = "data/signals_buy.csv"          # timestamp,price,signal(0/1/2)
 TRADE_FILE  = "data/trades_executed.csv"      # ts_ns,side,price,qty,buy_id,sell_id
+QUOTE_FILE  = "data/orderbook_top_ticks.csv"  # ts_ns,side,price,qty 顶档（滑点对真实 bid/ask）
+CHART_POINTS = 2000                           # 时间线图最多画的点数（min/max 包络降采样）
 
 # -------------------------------
-# 2) 读数据 + 预处理
+# 实时模式（跟随正在运行的模拟）
 # -------------------------------
-@st.cache_data(show_spinner=False)
-def load_signals(path: str) -> pd.DataFrame:
-    if not os.path.exists(path):
-        return pd.DataFrame(columns=["timestamp","price","signal"])
-    df = pd.read_csv(path)
-    # 允许 ns 时间戳或标准时间字符串
-    df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
-    # 过滤坏时间
-    df = df[df["timestamp"].notna()].sort_values("timestamp")
-    # 映射信号文本（非必需，仅备用）
-    mapping = {0:"BUY", 1:"SELL", 2:"HOLD"}
-    if "signal" in df.columns:
-        df["signal_txt"] = df["signal"].map(mapping).fillna(df["signal"].astype(str))
-    else:
-        df["signal_txt"] = "NA"
-    # 去重
-    df = df.drop_duplicates(subset=["timestamp"])
-    return df.reset_index(drop=True)
-
-@st.cache_data(show_spinner=False)
-def load_trades(path: str) -> pd.DataFrame:
-    if not os.path.exists(path):
-        cols = ["ts_ns","side","price","qty","buy_id","sell_id"]
-        return pd.DataFrame(columns=cols)
-    df = pd.read_csv(path)
-    # 成交时间可能是 ns 时间戳或字符串
-    # 如果是大整数，pd.to_datetime可以识别 ns；若失败，errors='coerce'
-    df["ts_ns"] = pd.to_datetime(df["ts_ns"], errors="coerce")
-    df = df[df["ts_ns"].notna()].sort_values("ts_ns")
-    # 方向规范化
-    if "side" in df.columns:
-        df["side"] = df["side"].str.upper().str.strip()
+def run_live():
+    with st.sidebar:
+        bucket = st.selectbox("聚合粒度", BUCKETS, index=BUCKETS.index("100ms"))
+        interval = st.slider("刷新间隔（秒）", 0.5, 10.0, 1.0, 0.5)
+        window = st.number_input("图表显示最近 N 个桶", 200, 200_000, CHART_POINTS, 200)
+    key = (TRADE_FILE, SIGNAL_FILE, bucket)
+    if st.session_state.get("live_key") != key:
+        old = st.session_state.get("live")
+        if old is not None:
+            old.close()
+        st.session_state["live"] = LiveReview(TRADE_FILE, SIGNAL_FILE if os.path.exists(SIGNAL_FILE) else None, bucket)
+        st.session_state["live_key"] = key
+    live: LiveReview = st.session_state["live"]
+    t0 = time.perf_counter()
+    new = live.update()
+    m = live.metrics()
+    st.caption(f"新增成交 {new} 笔 · 本次刷新 {1e3 * (time.perf_counter() - t0):.1f} ms · 偏移 {m['trade_offset']:,} B")
+
+    if m["fills"] == 0:
+        st.info(f"等待 {TRADE_FILE} 写入成交…")
     else:
-        df["side"] = "UNKNOWN"
-    # 数值
-    for c in ["price","qty"]:
-        if c in df.columns:
-            df[c] = pd.to_numeric(df[c], errors="coerce")
-    df = df.dropna(subset=["price","qty"])
-    return df.reset_index(drop=True)
-
-df_sig  = load_signals(SIGNAL_FILE)
-df_trd  = load_trades(TRADE_FILE)
-
-if df_trd.empty:
-    st.warning("没有发现成交数据（data/trades_executed.csv）。先跑完模拟再来复盘。")
-    st.stop()
+        c = st.columns(6)
+        c[0].metric("Position", f"{m['position']:,.0f}")
+        c[1].metric("Equity PnL", f"{m['final_pnl']:,.2f}")
+        c[2].metric("Max Drawdown", f"{m['max_drawdown']:,.2f}")
+        c[3].metric("Sharpe (approx.)", f"{m['sharpe']:,.2f}")
+        c[4].metric("Avg Slippage", f"{m['avg_slippage']:.6f}")
+        c[5].metric("Fills", f"{m['fills']:,}")
+        tl = live.frame(int(window))
+        st.subheader("累计 PnL / 回撤（最近窗口）")
+        st.altair_chart(alt.Chart(tl).transform_fold(["cum_pnl", "drawdown"]).mark_line().encode(
+            x=alt.X("ts:T", title="Time"), y=alt.Y("value:Q", title="PnL"), color="key:N"
+        ), use_container_width=True)
+        st.subheader("持仓（最近窗口）")
+        st.altair_chart(alt.Chart(tl).mark_line(color="orange").encode(
+            x="ts:T", y=alt.Y("position:Q", title="Position")), use_container_width=True)
+        st.subheader("滑点分布（按 tick 分箱，相对成交前参考价）")
+        hist = live.slip_frame()
+        st.altair_chart(alt.Chart(hist[hist["count"] > 0]).mark_bar().encode(
+            x=alt.X("slippage:Q", title="Slippage per trade (signed)"), y="count:Q"), use_container_width=True)
+
+    time.sleep(interval)
+    (getattr(st, "rerun", None) or st.experimental_rerun)()
+
 
-# -------------------------------
-# 3) 自动选择聚合粒度 + 控件
-# -------------------------------
-t0 = df_trd["ts_ns"].min()
-t1 = df_trd["ts_ns"].max()
-span_sec = (t1 - t0).total_seconds() if pd.notna(t0) and pd.notna(t1) else 0.0
-
-# 按跨度自动给一个合理粒度
-def auto_bucket(seconds: float) -> str:
-    if seconds <= 2.0:
-        return "10ms"
-    if seconds <= 60.0:
-        return "100ms"
-    if seconds <= 3600.0:
-        return "1s"
-    return "1min"
-
-default_bucket = auto_bucket(span_sec)
 with st.sidebar:
-    st.header("⚙️ 设置")
-    st.write(f"数据跨度约：**{span_sec:.3f} 秒**")
-    bucket = st.selectbox("聚合粒度", ["10ms","100ms","1s","1min"], index=["10ms","100ms","1s","1min"].index(default_bucket))
-    show_tables = st.checkbox("显示明细表（可能较慢）", value=False)
+    live_mode = st.toggle("实时模式（tail 成交文件）", value=False) if hasattr(st, "toggle") \
+        else st.checkbox("实时模式（tail 成交文件）", value=False)
+if live_mode:
+    run_live()
+    st.stop()
 
 # -------------------------------
-# 4) 标的价格基准（用于持仓估值/滑点参考）
-#    用 signals 的 price 作为 mid（不完美，但够复盘）
+# 2) 读数据 + 自动粒度（同一组文件 + 粒度只算一次）
 # -------------------------------
-if df_sig.empty:
-    # 万一没有signals，用成交加权均价代理价格时间线
-    ref = df_trd[["ts_ns","price","qty"]].copy()
-    ref = ref.rename(columns={"ts_ns":"ts"})
-    # 以成交时间为锚点构造价格曲线
-    ref = ref.set_index("ts").groupby(pd.Grouper(freq=bucket)).apply(lambda x: np.average(x["price"], weights=x["qty"]) if x["qty"].sum()>0 else x["price"].mean()).to_frame("mid")
-else:
-    ref = df_sig[["timestamp","price"]].rename(columns={"timestamp":"ts","price":"mid"}).copy()
-    ref = ref.set_index("ts").sort_index()
-    # 先按较细频率重采样再前向填充
-    ref = ref.resample(bucket).last().ffill()
-
-ref = ref.reset_index().rename(columns={"index":"ts"})
-ref = ref.dropna(subset=["ts","mid"])
+auto = review(TRADE_FILE, SIGNAL_FILE, QUOTE_FILE)
+if auto["trades"].empty:
+    st.warning("没有发现成交数据（data/trades_executed.csv）。先跑完模拟再来复盘。")
+    st.stop()
 
 # -------------------------------
-# 5) 构建持仓与PnL（仓位法：现金+持仓*mid）
+# 3) 控件
 # -------------------------------
-# 将成交按聚合粒度对齐
-trd = df_trd.copy()
-trd["bucket_ts"] = trd["ts_ns"].dt.floor(bucket)
-
-# 方向：BUY 正，SELL 负
-trd["signed_qty"] = np.where(trd["side"]=="BUY", trd["qty"], np.where(trd["side"]=="SELL", -trd["qty"], 0))
-trd["cash_flow"]  = - trd["price"] * trd["signed_qty"]   # 买入现金流为负，卖出为正
-
-# 聚合（每个时间桶）
-agg = trd.groupby("bucket_ts").agg(
-    net_qty=("signed_qty","sum"),
-    cash_delta=("cash_flow","sum"),
-    vol=("qty","sum"),
-    avg_price=("price","mean"),
-).reset_index().rename(columns={"bucket_ts":"ts"})
-
-# 和参考价格时间线合并
-timeline = pd.merge(ref, agg, on="ts", how="outer").sort_values("ts")
-timeline[["net_qty","cash_delta","vol","avg_price"]] = timeline[["net_qty","cash_delta","vol","avg_price"]].fillna(0)
-
-# 递推：持仓 & 现金 & 账户净值
-timeline["position"] = timeline["net_qty"].cumsum()
-timeline["cash"]     = timeline["cash_delta"].cumsum()
-timeline["equity"]   = timeline["cash"] + timeline["position"] * timeline["mid"]
-
-# per-bucket收益（Δequity）
-timeline["pnl_step"] = timeline["equity"].diff().fillna(0)
-timeline["cum_pnl"]  = timeline["equity"] - timeline["equity"].iloc[0]
+with st.sidebar:
+    st.header("⚙️ 设置")
+    st.write(f"数据跨度约：**{auto['span_sec']:.3f} 秒**")
+    bucket = st.selectbox("聚合粒度", BUCKETS, index=BUCKETS.index(auto["bucket"]))
+    show_tables = st.checkbox("显示明细表（可能较慢）", value=False)
 
-# -------------------------------
-# 6) 关键指标
-# -------------------------------
-def max_drawdown(series: pd.Series) -> float:
-    if series.empty:
-        return 0.0
-    peak = series.cummax()
-    dd = (series - peak)
-    return dd.min()
-
-def sharpe_from_steps(steps: pd.Series, seconds_per_bucket: float) -> float:
-    # 简化计算：Sharpe = mean(step)/std(step) * sqrt(年化步数)
-    # 年化系数：一年秒数约 31_536_000
-    if steps.std(ddof=1) == 0:
-        return 0.0
-    ann_factor = math.sqrt(31_536_000 / seconds_per_bucket) if seconds_per_bucket>0 else 0
-    return steps.mean() / steps.std(ddof=1) * ann_factor
-
-# 估计每个bucket的秒数
-bucket_sec = {"10ms":0.01, "100ms":0.1, "1s":1.0, "1min":60.0}[bucket]
-
-final_pnl   = float(timeline["cum_pnl"].iloc[-1]) if len(timeline)>0 else 0.0
-mdd         = float(max_drawdown(timeline["cum_pnl"]))
-sharpe      = float(sharpe_from_steps(timeline["pnl_step"], bucket_sec))
-turnover    = float(trd["qty"].sum() / (timeline["position"].abs().mean() + 1e-9))  # 粗略换手率
-hit_rate    = float((timeline["pnl_step"]>0).mean()) if len(timeline)>0 else 0.0
-
-# 滑点估计：成交价 vs 同桶参考价
-# 将成交与 ref 按最近桶对齐，计算 (trade_price - mid) * side_sign
-slip = pd.merge(
-    trd[["ts_ns","bucket_ts","side","price","qty","signed_qty"]],
-    ref.rename(columns={"ts":"bucket_ts"}),
-    on="bucket_ts", how="left"
-)
-slip["side_sign"] = np.where(slip["signed_qty"]>=0, 1, -1)  # BUY正 SELL负
-slip["slippage"]  = (slip["price"] - slip["mid"]) * slip["side_sign"]
-
-avg_slip   = float((slip["slippage"]).mean()) if not slip.empty else 0.0
-med_slip   = float((slip["slippage"]).median()) if not slip.empty else 0.0
+res = review(TRADE_FILE, SIGNAL_FILE, QUOTE_FILE, bucket)
+timeline, slip, m = res["timeline"], res["slippage"], res["metrics"]
+df_trd, df_sig = res["trades"], res["signals"]
 
 # -------------------------------
-# 7) 布局与可视化
+# 4) 布局与可视化
 # -------------------------------
 col1, col2 = st.columns([2,1])
 
 with col1:
     st.subheader("累计 PnL（聚合后）")
     if not timeline.empty:
-        chart_pnl = alt.Chart(timeline).mark_line().encode(
+        chart_pnl = alt.Chart(chart_frame(timeline, ["cum_pnl"], CHART_POINTS)).mark_line().encode(
             x=alt.X("ts:T", title="Time"),
             y=alt.Y("cum_pnl:Q", title="Cumulative PnL"),
             tooltip=["ts:T","cum_pnl:Q","position:Q","mid:Q"]
@@ -200,17 +119,21 @@ with col1:
 
 with col2:
     st.subheader("关键指标")
-    st.metric("Final PnL", f"{final_pnl:,.2f}")
-    st.metric("Max Drawdown", f"{mdd:,.2f}")
-    st.metric("Sharpe (approx.)", f"{sharpe:,.2f}")
-    st.metric("Hit Rate", f"{hit_rate*100:.1f}%")
-    st.metric("Turnover (rough)", f"{turnover:.2f}")
-    st.metric("Avg Slippage", f"{avg_slip:.6f}")
-    st.metric("Median Slippage", f"{med_slip:.6f}")
+    st.metric("Final PnL", f"{m['final_pnl']:,.2f}")
+    st.metric("Max Drawdown", f"{m['max_drawdown']:,.2f}")
+    st.metric("Sharpe (approx.)", f"{m['sharpe']:,.2f}")
+    st.metric("Hit Rate", f"{m['hit_rate']*100:.1f}%")
+    st.metric("Turnover (rough)", f"{m['turnover']:.2f}")
+    st.metric("Avg Slippage", f"{m['avg_slippage']:.6f}")
+    st.metric("Median Slippage", f"{m['median_slippage']:.6f}")
+    if res["has_quotes"]:
+        st.metric("Avg Slippage vs touch", f"{m['avg_slippage_touch']:.6f}")
+    else:
+        st.caption("未找到顶档行情，滑点以聚合参考价计。")
 
 st.subheader("成交量随时间（聚合）")
 if not timeline.empty:
-    vol_bar = alt.Chart(timeline).mark_bar().encode(
+    vol_bar = alt.Chart(chart_frame(timeline, ["vol"], CHART_POINTS)).mark_bar().encode(
         x=alt.X("ts:T", title="Time"),
         y=alt.Y("vol:Q", title="Volume"),
         tooltip=["ts:T","vol:Q","avg_price:Q"]
@@ -221,22 +144,62 @@ else:
 
 st.subheader("净敞口 / 持仓（聚合）")
 if not timeline.empty:
-    pos_chart = alt.Chart(timeline).mark_line(color="orange").encode(
+    pos_chart = alt.Chart(chart_frame(timeline, ["position"], CHART_POINTS)).mark_line(color="orange").encode(
         x="ts:T", y=alt.Y("position:Q", title="Position"),
         tooltip=["ts:T","position:Q"]
     ).interactive()
     st.altair_chart(pos_chart, use_container_width=True)
 
 st.subheader("滑点分布（方向调整后）")
-if not slip.empty:
-    slip_hist = alt.Chart(slip.dropna(subset=["slippage"])).mark_bar().encode(
-        x=alt.X("slippage:Q", bin=alt.Bin(maxbins=50), title="Slippage per trade (signed)"),
-        y="count()"
+s = slip["slippage"].dropna().to_numpy()
+if len(s):
+    # 先在 numpy 里分箱，图表只拿 50 行
+    counts, edges = np.histogram(s, bins=50)
+    hist = pd.DataFrame({"lo": edges[:-1], "hi": edges[1:], "count": counts})
+    slip_hist = alt.Chart(hist).mark_bar().encode(
+        x=alt.X("lo:Q", title="Slippage per trade (signed)"), x2="hi:Q", y="count:Q"
     )
     st.altair_chart(slip_hist, use_container_width=True)
 else:
     st.info("未能计算滑点分布。")
 
+# -------------------------------
+# 5) 订单生命周期（buy_id / sell_id）
+# -------------------------------
+if {"buy_id", "sell_id"} <= set(df_trd.columns):
+    st.subheader("订单生命周期（按 buy_id / sell_id 聚合）")
+    orv = order_review(TRADE_FILE)
+    ost, om = orv["stats"], orv["summary"]
+    c = st.columns(6)
+    c[0].metric("Orders", f"{om['orders']:,}")
+    c[1].metric("Fills / order", f"{om['fills_per_order']:.2f}")
+    c[2].metric("Partial-fill share", f"{om['partial_fill_share']*100:.1f}%")
+    c[3].metric("Time to complete p50", f"{om['ttc_median_ms']:.2f} ms")
+    c[4].metric("Time to complete p95", f"{om['ttc_p95_ms']:.2f} ms")
+    c[5].metric("Queue ahead p50", f"{om['queue_ahead_median']:,.0f}")
+    oc1, oc2 = st.columns(2)
+    with oc1:
+        # 成交笔数分布：bincount 后只画几十行
+        cnt = np.bincount(ost["fills"].to_numpy())
+        nfill = pd.DataFrame({"fills": np.arange(len(cnt)), "orders": cnt}).iloc[1:]
+        st.altair_chart(alt.Chart(nfill).mark_bar().encode(
+            x=alt.X("fills:O", title="Fills per order"), y=alt.Y("orders:Q", title="Orders")
+        ), use_container_width=True)
+    with oc2:
+        # 完成耗时（首笔 -> 末笔成交），log10 分箱，仅多笔成交的订单
+        ttc = ost.loc[ost["fills"] > 1, "time_to_complete_ns"].to_numpy(dtype=float) / 1e6
+        ttc = ttc[ttc > 0]
+        if len(ttc):
+            counts, edges = np.histogram(np.log10(ttc), bins=40)
+            hist = pd.DataFrame({"lo": 10 ** edges[:-1], "hi": 10 ** edges[1:], "count": counts})
+            st.altair_chart(alt.Chart(hist).mark_bar().encode(
+                x=alt.X("lo:Q", title="Time to complete (ms, log)", scale=alt.Scale(type="log")), x2="hi:Q",
+                y="count:Q"), use_container_width=True)
+        else:
+            st.info("没有多笔成交的订单。")
+    with st.expander("订单明细（完成耗时最长的 200 个）"):
+        st.dataframe(ost.nlargest(200, "time_to_complete_ns"))
+
 if show_tables:
     st.divider()
     st.subheader("明细（可能较慢）")
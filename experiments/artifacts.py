@@ -0,0 +1,175 @@
+# experiments/artifacts.py
+# In-memory cache of deserialized artifacts (model.joblib, X_test/y_test parquet,
+# threshold sweeps, backtest payloads). Entries are keyed by artifacts_dir + name
+# and validated against the size/mtime of the files they were built from, so a
+# retrain into the same dir is picked up. LRU eviction under a byte cap.
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_MAX_BYTES = int(float(os.environ.get("HFT_ARTIFACT_CACHE_MB", 512)) * (1 << 20))
+
+
+def artifact_stamp(artdir: str, files: Sequence[str]) -> Tuple:
+    """(name, size, mtime_ns) of each file; missing files stamp as None."""
+    out = []
+    for name in files:
+        try:
+            st = os.stat(os.path.join(artdir, name))
+            out.append((name, st.st_size, st.st_mtime_ns))
+        except OSError:
+            out.append((name, None))
+    return tuple(out)
+
+
+def estimate_nbytes(obj: Any) -> int:
+    """Rough in-memory size of arrays / frames / JSON-like payloads."""
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=False).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(index=True, deep=False))
+    if isinstance(obj, dict):
+        return 64 + sum(estimate_nbytes(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        if obj and isinstance(obj[0], (list, tuple, dict, np.ndarray)):
+            return 64 + sum(estimate_nbytes(v) for v in obj)
+        return 64 + 32 * len(obj)        # boxed floats/ints + list slot
+    if isinstance(obj, str):
+        return 50 + len(obj)
+    return 64
+
+
+class ArtifactCache:
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = int(max_bytes)
+        self._entries: "OrderedDict[Hashable, Tuple[Tuple, Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(artdir: str, name: str, extra: Hashable = ()) -> Tuple:
+        return (os.path.abspath(artdir), name, extra)
+
+    def get(self, artdir: str, name: str, files: Sequence[str], extra: Hashable = ()) -> Optional[Any]:
+        """Cached value if present and its source files are unchanged; else None."""
+        key = self._key(artdir, name, extra)
+        stamp = artifact_stamp(artdir, files)
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is None or hit[0] != stamp:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return hit[1]
+
+    def put(self, artdir: str, name: str, files: Sequence[str], value: Any,
+            extra: Hashable = (), nbytes: Optional[int] = None, stamp: Optional[Tuple] = None) -> Any:
+        """
+        Store `value`. Pass `stamp` taken *before* building the value when the files may change
+        concurrently (a stale stamp just causes a miss next time, never a stale hit).
+        """
+        key = self._key(artdir, name, extra)
+        stamp = artifact_stamp(artdir, files) if stamp is None else stamp
+        size = estimate_nbytes(value) if nbytes is None else int(nbytes)
+        if size > self.max_bytes:
+            return value  # never cache something that would evict everything
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (stamp, value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                _, (_, _, sz) = self._entries.popitem(last=False)
+                self._bytes -= sz
+        return value
+
+    def get_or_load(self, artdir: str, name: str, files: Sequence[str], load: Callable[[], Any],
+                    extra: Hashable = (), nbytes: Optional[Callable[[Any], int]] = None) -> Any:
+        hit = self.get(artdir, name, files, extra)
+        if hit is not None:
+            return hit
+        stamp = artifact_stamp(artdir, files)
+        value = load()
+        return self.put(artdir, name, files, value, extra=extra,
+                        nbytes=(nbytes(value) if nbytes else None), stamp=stamp)
+
+    def invalidate(self, artdir: Optional[str] = None) -> None:
+        with self._lock:
+            if artdir is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            root = os.path.abspath(artdir)
+            for key in [k for k in self._entries if k[0] == root]:
+                self._bytes -= self._entries.pop(key)[2]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_CACHE: Optional[ArtifactCache] = None
+
+
+def get_artifact_cache() -> ArtifactCache:
+    """Process-wide cache (one per API process / pool worker)."""
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = ArtifactCache()
+    return _CACHE
+
+
+# ---- typed loaders
+MODEL_FILE = "model.joblib"
+TEST_FILES = ("X_test.parquet", "y_test.parquet")
+
+
+def load_model(artdir: str, cache: Optional[ArtifactCache] = None):
+    """model.joblib, deserialized once per file version."""
+    import joblib
+    cache = cache or get_artifact_cache()
+    path = os.path.join(artdir, MODEL_FILE)
+    return cache.get_or_load(artdir, "model", [MODEL_FILE], lambda: joblib.load(path),
+                             nbytes=lambda _m: os.path.getsize(path))
+
+
+def load_test_set(artdir: str, cache: Optional[ArtifactCache] = None) -> Tuple[pd.DataFrame, np.ndarray]:
+    """(X_test, y_test) from the parquet pair, read once per file version."""
+    cache = cache or get_artifact_cache()
+
+    def _read():
+        try:
+            X_test = pd.read_parquet(os.path.join(artdir, TEST_FILES[0]))  # requires pyarrow or fastparquet
+            y_test = pd.read_parquet(os.path.join(artdir, TEST_FILES[1]))["y_test"].to_numpy()
+        except Exception as e:
+            raise RuntimeError("Failed to read parquet. Install pyarrow: pip install pyarrow. Detail: %s" % e)
+        return X_test, y_test
+
+    return cache.get_or_load(artdir, "test_set", TEST_FILES, _read)
+
+
+def load_preprocess(artdir: str, cache: Optional[ArtifactCache] = None):
+    """FeaturePipeline of a run (preprocess.json); None for runs trained before it was persisted."""
+    from experiments.preprocess import PREPROCESS_FILE, FeaturePipeline
+    if not os.path.exists(os.path.join(artdir, PREPROCESS_FILE)):
+        return None
+    cache = cache or get_artifact_cache()
+    return cache.get_or_load(artdir, "preprocess", [PREPROCESS_FILE], lambda: FeaturePipeline.load(artdir),
+                             nbytes=lambda _p: 4096)
+
@@ -5,7 +5,6 @@ from typing import Optional
 
 import numpy as np
 import pandas as pd
-import joblib
 
 from sklearn.metrics import (
     precision_recall_curve, average_precision_score,
@@ -14,32 +13,69 @@ from sklearn.metrics import (
 from sklearn.calibration import calibration_curve
 
 # only reused inside experiments (keep FastAPI clean)
-from experiments.pipeline import _build_midprice
-
-
-def run_backtest(artdir: str, data_path: str, horizon: int, json_path: Optional[str]) -> dict:
-    # ---- load artifacts
-    model_path = os.path.join(artdir, "model.joblib")
-    x_test_path = os.path.join(artdir, "X_test.parquet")
-    y_test_path = os.path.join(artdir, "y_test.parquet")
-    if not (os.path.exists(model_path) and os.path.exists(x_test_path) and os.path.exists(y_test_path)):
-        raise FileNotFoundError(
-            "Artifacts incomplete. Expect model.joblib, X_test.parquet, y_test.parquet in " + artdir
-        )
-
-    clf = joblib.load(model_path)
-    try:
-        X_test = pd.read_parquet(x_test_path)   # requires pyarrow or fastparquet
-        y_test = pd.read_parquet(y_test_path)["y_test"].to_numpy()
-    except Exception as e:
-        raise RuntimeError("Failed to read parquet. Install pyarrow: pip install pyarrow. Detail: %s" % e)
+from experiments.pipeline import _build_midprice, _make_label, cached_forward_returns
+from experiments.preprocess import PREPROCESS_FILE
+from factors.cache import cached_factors
+from experiments.dataset import dataset_spec, is_dataset_spec
+from experiments.tickstore import load_ticks
+from experiments.downsample import downsample_curve, to_json_payload
+from experiments.bt_kernel import CostModel, backtest_kernel, cost_rate, kernel_summary
+from experiments.thresholds import ThresholdSweep, sweep_file, to_jsonable
+from experiments.artifacts import MODEL_FILE, TEST_FILES, load_model, load_preprocess, load_test_set
+
+PR_POINTS = 1000  # cap on the stored PR curve; /api/backtest?points= reduces it further
+
+
+def _rescore_set(artdir: str, data_path: str, mid: pd.DataFrame, horizon: int):
+    """(X, y) for all labelled rows of data_path: raw factors -> saved FeaturePipeline (no refit)."""
+    pipe = load_preprocess(artdir)
+    raw = cached_factors(data_path, pipe.inputs, lambda: mid)
+    raw.index = mid.index
+    X = pipe.transform(raw, as_frame=True)
+    meta_path = os.path.join(artdir, "meta.json")
+    meta = json.load(open(meta_path)) if os.path.exists(meta_path) else {}
+    R = cached_forward_returns(data_path, [horizon], lambda: mid)
+    y = _make_label(mid, horizon=horizon, eps=float(meta.get("eps", 0.0)),
+                    drop_equal=bool(meta.get("drop_equal", False)), R=R)
+    valid = y.notna().to_numpy()
+    return X[valid], y[valid].astype(int).to_numpy()
+
+
+def run_backtest(artdir: str, data_path: str, horizon: int, json_path: Optional[str],
+                 ticks: Optional[pd.DataFrame] = None,
+                 fees_cfg: Optional[str] = "configs/run.yaml", latency_ticks: int = 0,
+                 max_position: float = 1.0, execution: str = "taker", rescore: bool = False) -> dict:
+    """
+    Backtest one artifacts dir; `ticks` can be passed in when the caller already loaded data_path.
+    Gross PnL keeps the original signals * ret definition; the *_net fields apply fees/slippage
+    from fees_cfg (configs/run.yaml), an N-tick signal delay and position limits (bt_kernel.py).
+    rescore=True ignores the stored X_test and scores every labelled row of data_path from raw
+    factors through the run's saved preprocessing (preprocess.json) — backtests on new data.
+    """
+    # ---- load artifacts (deserialized once per file version per process, experiments/artifacts.py)
+    needed = (MODEL_FILE, PREPROCESS_FILE) if rescore else (MODEL_FILE,) + TEST_FILES
+    if not all(os.path.exists(os.path.join(artdir, f)) for f in needed):
+        raise FileNotFoundError(f"Artifacts incomplete. Expect {', '.join(needed)} in " + artdir)
+
+    clf = load_model(artdir)
+    df = ticks if ticks is not None else load_ticks(data_path)
+    mid = _build_midprice(df)
+    if rescore:
+        X_test, y_test = _rescore_set(artdir, data_path, mid, horizon)
+    else:
+        X_test, y_test = load_test_set(artdir)
 
     # ---- build test returns aligned with label horizon
-    df = pd.read_csv(data_path)
-    mid = _build_midprice(df)
-    ret_full = mid["midprice"].pct_change(horizon).shift(-horizon)
+    # same cached forward-return array the trainer labelled with (experiments/pipeline.py)
+    ret_full = pd.Series(cached_forward_returns(data_path, [horizon], lambda: mid)[:, 0], index=mid.index)
     ret_test = ret_full.loc[X_test.index].fillna(0.0).to_numpy()
 
+    # ---- time axis
+    if "ts_ns" in mid.columns:
+        ts = mid.loc[X_test.index, "ts_ns"].to_numpy(dtype=np.int64)
+    else:
+        ts = np.arange(len(ret_test), dtype=np.int64)
+
     # ---- predictions
     y_prob = None
     if hasattr(clf, "predict_proba"):
@@ -71,6 +107,30 @@ def run_backtest(artdir: str, data_path: str, horizon: int, json_path: Optional[
     exposure = float(np.mean(signals))
     turnover = float(np.sum(np.abs(np.diff(signals))))  # entry/exit count for 0/1 signal
 
+    # ---- costs, latency & limits
+    if fees_cfg and os.path.exists(fees_cfg):
+        cost = CostModel.from_yaml(fees_cfg, latency_ticks=latency_ticks,
+                                   max_position=max_position, execution=execution)
+    else:
+        cost = CostModel(latency_ticks=latency_ticks, max_position=max_position, execution=execution)
+    book = mid.loc[X_test.index]
+    quotes = dict(
+        mid=book["midprice"].to_numpy(),
+        bid=(book["bid"].to_numpy() if "bid" in book.columns else None),
+        ask=(book["ask"].to_numpy() if "ask" in book.columns else None),
+    )
+    kern = backtest_kernel(signals, ret=ret_test, cost=cost, **quotes)
+
+    # ---- threshold sweep: every threshold from one sort; persisted for /api/backtest/threshold
+    sweep_payload = None
+    if y_prob is not None:
+        sweep = ThresholdSweep(y_prob, ret_test, y_true=y_test,
+                               rate=cost_rate(cost, len(ret_test), **quotes),
+                               latency_ticks=cost.latency_ticks)
+        sweep.save(os.path.join(artdir, sweep_file(horizon, cost.latency_ticks, rescore)),
+                   ts=ts, horizon=horizon, threshold=threshold)
+        sweep_payload = to_jsonable(sweep.long_only(sweep.default_grid(51)))
+
     # ---- classification at chosen threshold
     if len(np.unique(y_test)) == 2:
         tn, fp, fn, tp = confusion_matrix(y_test, signals).ravel()
@@ -88,7 +148,8 @@ def run_backtest(artdir: str, data_path: str, horizon: int, json_path: Optional[
     if (y_prob is not None) and (float(np.std(y_prob)) > 0.0):
         prec, rec, _thr = precision_recall_curve(y_test, y_prob)
         ap = float(average_precision_score(y_test, y_prob))
-        pr_curve = {"precision": prec.tolist(), "recall": rec.tolist()}
+        # one point per distinct score otherwise (~n_test); the envelope of precision is what the plot shows
+        pr_curve = downsample_curve({"precision": prec, "recall": rec}, PR_POINTS, "precision")
         frac_pos, mean_pred = calibration_curve(y_test, y_prob, n_bins=10, strategy="quantile")
         calib = {"mean_pred": mean_pred.tolist(), "frac_pos": frac_pos.tolist()}
         brier = float(brier_score_loss(y_test, y_prob))
@@ -102,23 +163,22 @@ def run_backtest(artdir: str, data_path: str, horizon: int, json_path: Optional[
     bins = np.linspace(lo, hi, 31) if hi > lo else np.linspace(-1e-6, 1e-6, 31)
     hist_counts, hist_edges = np.histogram(ret_test, bins=bins)
 
-    # ---- time axis
-    if "ts_ns" in mid.columns:
-        ts = mid.loc[X_test.index, "ts_ns"].astype(str).tolist()
-    else:
-        ts = list(map(str, range(len(cum))))
-
+    # series stay NumPy arrays (cheap to pickle from the worker); experiments/downsample.py
+    # range-selects / downsamples / encodes them per request, to_json_payload gives the JSON form
     payload = {
         "threshold": threshold,
         "series": {
             "ts": ts,
-            "ret": ret_test.tolist(),
-            "signals": signals.tolist(),
-            "pnl": cum.tolist(),           # cumulative PnL
-            "step_pnl": step_pnl.tolist(),
-            "drawdown": drawdown.tolist(),
-            "y_test": y_test.tolist(),
-            "y_prob": (y_prob.tolist() if y_prob is not None else None),
+            "ret": ret_test,
+            "signals": signals,
+            "pnl": cum,                    # cumulative PnL
+            "step_pnl": step_pnl,
+            "drawdown": drawdown,
+            "position": kern["pos"],
+            "pnl_net": kern["cum_net"],
+            "drawdown_net": kern["drawdown"],
+            "y_test": np.asarray(y_test),
+            "y_prob": y_prob,
         },
         "risk": {
             "max_drawdown": max_drawdown,
@@ -126,6 +186,9 @@ def run_backtest(artdir: str, data_path: str, horizon: int, json_path: Optional[
             "exposure": exposure,
             "turnover": turnover
         },
+        "risk_net": kernel_summary(kern),
+        "costs": cost.to_dict(),
+        "threshold_sweep": sweep_payload,
         "classification": {
             "tp": int(tp), "fp": int(fp), "tn": int(tn), "fn": int(fn),
             "precision_at_threshold": precision_th,
@@ -146,25 +209,38 @@ def run_backtest(artdir: str, data_path: str, horizon: int, json_path: Optional[
 
     if json_path:
         with open(json_path, "w") as f:
-            json.dump(payload, f)
+            json.dump(to_json_payload(payload), f)
     return payload
 
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--artdir", default="artifacts/latest")
-    ap.add_argument("--data", default="data/orderbook_top_ticks.csv")
+    ap.add_argument("--data", default="data/orderbook_top_ticks.csv", help="CSV / tick store / dataset root or spec")
+    ap.add_argument("--instrument", default="", help="partitioned dataset: instrument (experiments/dataset.py)")
+    ap.add_argument("--start", default="", help="partitioned dataset: first date (inclusive)")
+    ap.add_argument("--end", default="", help="partitioned dataset: last date (inclusive)")
     ap.add_argument("--horizon", type=int, default=5)
     ap.add_argument("--json", default="", help="If set, write result JSON to this path")
+    ap.add_argument("--fees_cfg", default="configs/run.yaml", help="fees_bps / slippage_bps source")
+    ap.add_argument("--latency_ticks", type=int, default=0, help="signal delay in ticks")
+    ap.add_argument("--max_position", type=float, default=1.0)
+    ap.add_argument("--execution", default="taker", choices=["taker", "maker"])
+    ap.add_argument("--rescore", action="store_true",
+                    help="score all rows of --data from raw factors via the run's preprocess.json")
     args = ap.parse_args()
+    if is_dataset_spec(args.data):
+        args.data = dataset_spec(args.data, args.instrument, args.start, args.end)
 
     try:
         payload = run_backtest(
             artdir=args.artdir, data_path=args.data, horizon=args.horizon,
-            json_path=(args.json if args.json else None)
+            json_path=(args.json if args.json else None),
+            fees_cfg=args.fees_cfg, latency_ticks=args.latency_ticks,
+            max_position=args.max_position, execution=args.execution, rescore=args.rescore,
         )
         if not args.json:
-            print(json.dumps(payload))
+            print(json.dumps(to_json_payload(payload)))
     except Exception as e:
         sys.stderr.write(f"[backtest error] {e}\n")
         sys.exit(1)
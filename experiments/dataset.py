@@ -0,0 +1,253 @@
+# experiments/dataset.py
+# Partitioned multi-instrument / multi-day tick dataset:
+#   <root>/dataset.json
+#   <root>/instrument=<SYM>/date=<YYYY-MM-DD>/{ts_ns,bid,ask,bid_qty,ask_qty,midprice}.npy + meta.json
+# Every partition is a tick store (experiments/tickstore.py), so columns are memory-mapped
+# and only the requested ones are touched. A *dataset spec* selects a slice:
+#   data/ticks_ds?instrument=AAPL&start=2024-01-02&end=2024-01-31&ts_start=...&ts_end=...
+# and can be passed wherever a data path is accepted (load_ticks, train/backtest CLIs, API).
+# Pruning: instrument/date by directory name, then ts_ns by the per-partition ts_min/ts_max
+# in meta.json, then a binary search on the (sorted) ts_ns column inside each partition.
+#   python -m experiments.dataset ingest --data data/orderbook_top_ticks.csv --root data/ticks_ds --instrument AAPL
+#   python -m experiments.dataset ls --spec "data/ticks_ds?instrument=AAPL&start=2024-01-02"
+import argparse
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlencode
+
+import numpy as np
+import pandas as pd
+
+from experiments.tickstore import align_top_of_book, is_store, load_ticks, write_store
+
+DATASET_FILE = "dataset.json"
+NS_PER_DAY = 86_400 * 1_000_000_000
+
+
+def _norm_date(d) -> Optional[str]:
+    """'20240102' / '2024-01-02' / Timestamp -> '2024-01-02' (None passes through)."""
+    if d is None or d == "":
+        return None
+    return pd.Timestamp(str(d)).strftime("%Y-%m-%d")
+
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    root: str
+    instruments: Tuple[str, ...] = ()        # empty = all
+    start: Optional[str] = None               # inclusive partition dates
+    end: Optional[str] = None
+    ts_start: Optional[int] = None            # half-open [ts_start, ts_end) on ts_ns
+    ts_end: Optional[int] = None
+
+    @classmethod
+    def parse(cls, spec: str) -> "DatasetSpec":
+        root, _, query = spec.partition("?")
+        q = {k: v[-1] for k, v in parse_qs(query).items()}
+        inst = tuple(s.strip() for s in q.get("instrument", "").split(",") if s.strip())
+        ts = lambda k: int(q[k]) if q.get(k) else None
+        return cls(root, inst, _norm_date(q.get("start")), _norm_date(q.get("end")),
+                   ts("ts_start"), ts("ts_end"))
+
+    def __str__(self) -> str:
+        q = {"instrument": ",".join(self.instruments), "start": self.start, "end": self.end,
+             "ts_start": self.ts_start, "ts_end": self.ts_end}
+        query = urlencode({k: v for k, v in q.items() if v not in (None, "")}, safe=",")
+        return f"{self.root}?{query}" if query else self.root
+
+
+@dataclass
+class Partition:
+    instrument: str
+    date: str
+    path: str
+    meta: Dict = field(default_factory=dict)
+
+    @property
+    def n_rows(self) -> int:
+        return int(self.meta.get("n_rows", 0))
+
+
+def is_dataset(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, DATASET_FILE))
+
+
+def is_dataset_spec(path: Optional[str]) -> bool:
+    """True for a dataset root, with or without a ?query."""
+    return bool(path) and is_dataset(path.partition("?")[0])
+
+
+def dataset_spec(root: str, instrument: str = "", start: str = "", end: str = "") -> str:
+    """Combine a --data argument with --instrument/--start/--end CLI filters."""
+    spec = DatasetSpec.parse(root)
+    inst = tuple(s for s in instrument.split(",") if s) or spec.instruments
+    return str(DatasetSpec(spec.root, inst, _norm_date(start) or spec.start, _norm_date(end) or spec.end,
+                           spec.ts_start, spec.ts_end))
+
+
+def _read_meta(path: str) -> Dict:
+    with open(os.path.join(path, "meta.json")) as f:
+        return json.load(f)
+
+
+def list_partitions(spec) -> List[Partition]:
+    """Partitions selected by instrument / date range / ts range, in (instrument, date) order."""
+    spec = DatasetSpec.parse(spec) if isinstance(spec, str) else spec
+    out = []
+    for inst_dir in sorted(os.listdir(spec.root)):
+        if not inst_dir.startswith("instrument="):
+            continue
+        inst = inst_dir[len("instrument="):]
+        if spec.instruments and inst not in spec.instruments:
+            continue
+        base = os.path.join(spec.root, inst_dir)
+        for date_dir in sorted(os.listdir(base)):
+            if not date_dir.startswith("date="):
+                continue
+            date = date_dir[len("date="):]
+            if (spec.start and date < spec.start) or (spec.end and date > spec.end):
+                continue
+            path = os.path.join(base, date_dir)
+            if not is_store(path):
+                continue
+            meta = _read_meta(path)
+            lo, hi = meta.get("ts_min"), meta.get("ts_max")
+            if lo is not None and ((spec.ts_end is not None and lo >= spec.ts_end)
+                                   or (spec.ts_start is not None and hi < spec.ts_start)):
+                continue
+            out.append(Partition(inst, date, path, meta))
+    return out
+
+
+def row_range(part: Partition, spec: DatasetSpec) -> Tuple[int, int]:
+    """[i0, i1) rows of a partition inside [ts_start, ts_end); only ts_ns pages are touched."""
+    n = part.n_rows
+    if spec.ts_start is None and spec.ts_end is None:
+        return 0, n
+    ts = np.load(os.path.join(part.path, "ts_ns.npy"), mmap_mode="r")
+    if not part.meta.get("ts_sorted", True):
+        keep = np.ones(n, dtype=bool)
+        if spec.ts_start is not None:
+            keep &= ts >= spec.ts_start
+        if spec.ts_end is not None:
+            keep &= ts < spec.ts_end
+        idx = np.flatnonzero(keep)
+        if len(idx) and idx[-1] - idx[0] + 1 != len(idx):
+            raise ValueError(f"{part.path}: ts_ns is unsorted; re-ingest to use ts_start/ts_end")
+        return (int(idx[0]), int(idx[-1]) + 1) if len(idx) else (0, 0)
+    i0 = int(np.searchsorted(ts, spec.ts_start, "left")) if spec.ts_start is not None else 0
+    i1 = int(np.searchsorted(ts, spec.ts_end, "left")) if spec.ts_end is not None else n
+    return i0, max(i0, i1)
+
+
+def load_dataset(spec, columns: Optional[Sequence[str]] = None, single_instrument: bool = False) -> pd.DataFrame:
+    """
+    Concatenate the selected partitions (instrument, then date order), reading only `columns`
+    and only the rows inside the ts range. With several instruments an `instrument` column
+    (categorical) is added; `single_instrument=True` refuses that (per-series consumers).
+    """
+    spec = DatasetSpec.parse(spec) if isinstance(spec, str) else spec
+    parts = list_partitions(spec)
+    instruments = sorted({p.instrument for p in parts})
+    if single_instrument and len(instruments) > 1:
+        raise ValueError(f"dataset spec selects {len(instruments)} instruments {instruments}; "
+                         f"add ?instrument=<one of them>")
+    if not parts:
+        raise ValueError(f"dataset spec {spec} selects no partitions")
+    cols = list(columns) if columns is not None else list(parts[0].meta["columns"])
+    chunks: Dict[str, List[np.ndarray]] = {c: [] for c in cols}
+    lengths = []
+    for p in parts:
+        i0, i1 = row_range(p, spec)
+        if i1 <= i0:
+            continue
+        lengths.append((p.instrument, i1 - i0))
+        for c in cols:
+            if c in p.meta["columns"]:
+                chunks[c].append(np.load(os.path.join(p.path, f"{c}.npy"), mmap_mode="r")[i0:i1])
+            else:
+                chunks[c].append(np.full(i1 - i0, np.nan))
+    data = {c: (np.concatenate(v) if v else np.empty(0)) for c, v in chunks.items()}
+    df = pd.DataFrame(data, columns=cols)
+    if len(instruments) > 1:
+        df["instrument"] = pd.Categorical(np.repeat([i for i, _ in lengths], [n for _, n in lengths]),
+                                          categories=instruments)
+    return df
+
+
+def dataset_stamp(spec) -> Tuple:
+    """Identity of a spec's data: the filters + (partition, size, mtime) of every selected meta.json."""
+    spec = DatasetSpec.parse(spec) if isinstance(spec, str) else spec
+    out = [os.path.abspath(spec.root), str(spec)]
+    for p in list_partitions(spec):
+        st = os.stat(os.path.join(p.path, "meta.json"))
+        out.append((p.instrument, p.date, st.st_size, st.st_mtime_ns))
+    return tuple(out)
+
+
+def source_stamp(path: str) -> Tuple:
+    """(abspath, size, mtime_ns) of a file/store, or dataset_stamp for a dataset spec."""
+    if is_dataset_spec(path):
+        return dataset_stamp(path)
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+
+def data_exists(path: Optional[str]) -> bool:
+    return bool(path) and (os.path.exists(path) or is_dataset_spec(path))
+
+
+# ---- writing
+def write_partition(mid: pd.DataFrame, root: str, instrument: str, date: str) -> str:
+    out = os.path.join(root, f"instrument={instrument}", f"date={_norm_date(date)}")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    return write_store(mid, out)
+
+
+def ingest_dataset(data: str, root: str, instrument: str) -> List[str]:
+    """Split one tick file/store into per-day partitions (UTC date of ts_ns) under root."""
+    mid = align_top_of_book(load_ticks(data))
+    ts = mid["ts_ns"].to_numpy(dtype=np.int64)
+    if len(ts) and (np.diff(ts) < 0).any():
+        order = np.argsort(ts, kind="stable")
+        mid, ts = mid.iloc[order].reset_index(drop=True), ts[order]
+    day = ts // NS_PER_DAY
+    starts = np.flatnonzero(np.r_[True, day[1:] != day[:-1]]) if len(day) else np.empty(0, dtype=int)
+    bounds = np.r_[starts, len(day)]
+    os.makedirs(root, exist_ok=True)
+    if not is_dataset(root):
+        with open(os.path.join(root, DATASET_FILE), "w") as f:
+            json.dump({"layout": "instrument=<SYM>/date=<YYYY-MM-DD>", "tz": "UTC"}, f, indent=2)
+    written = []
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        date = pd.Timestamp(int(day[a]) * NS_PER_DAY, unit="ns").strftime("%Y-%m-%d")
+        written.append(write_partition(mid.iloc[a:b].reset_index(drop=True), root, instrument, date))
+    return written
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Partitioned tick dataset (instrument=/date=)")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    ing = sub.add_parser("ingest", help="split a tick CSV/store into day partitions")
+    ing.add_argument("--data", required=True)
+    ing.add_argument("--root", required=True)
+    ing.add_argument("--instrument", required=True)
+    ls = sub.add_parser("ls", help="list the partitions a spec selects")
+    ls.add_argument("--spec", required=True)
+    args = ap.parse_args()
+
+    if args.cmd == "ingest":
+        parts = ingest_dataset(args.data, args.root, args.instrument)
+        print(f"[dataset] wrote {len(parts)} partitions under {args.root}")
+    else:
+        spec = DatasetSpec.parse(args.spec)
+        for p in list_partitions(spec):
+            i0, i1 = row_range(p, spec)
+            print(json.dumps({"instrument": p.instrument, "date": p.date, "rows": i1 - i0,
+                              "ts_min": p.meta.get("ts_min"), "ts_max": p.meta.get("ts_max")}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+# experiments/downsample.py
+# Chart payloads: server-side downsampling + compact encodings.
+# A browser can draw ~1-2 points per pixel, so long series are reduced to `points` rows
+# before serialization:
+#   - minmax: per bucket keep the argmin and argmax of every key series (exact visual envelope)
+#   - lttb  : Largest-Triangle-Three-Buckets on one primary series (shape-preserving, fixed size)
+# All series of a payload share one x axis, so one index set is chosen and applied to all.
+# Encodings (encode_payload):
+#   json  : plain lists (ts_ns as strings, NaN -> null), the historical format
+#   b64   : JSON whose arrays are {"dtype", "shape", "b64"} little-endian typed-array buffers
+#   arrow : Arrow IPC stream of the series table; everything else in schema metadata "payload"
+import base64
+import json
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:  # optional accelerator
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:  # pragma: no cover - depends on environment
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda f: f
+
+METHODS = ("minmax", "lttb")
+FORMATS = {"json": "application/json", "b64": "application/json",
+           "arrow": "application/vnd.apache.arrow.stream"}
+
+
+# ---------------------------------------------------------------- selection
+def range_slice(x: np.ndarray, x0: Optional[float] = None, x1: Optional[float] = None) -> slice:
+    """Rows with x0 <= x <= x1 on a sorted x (None = open end)."""
+    i0 = int(np.searchsorted(x, x0, "left")) if x0 is not None else 0
+    i1 = int(np.searchsorted(x, x1, "right")) if x1 is not None else len(x)
+    return slice(i0, max(i0, i1))
+
+
+def _bucket_edges(n: int, buckets: int) -> np.ndarray:
+    return np.linspace(0, n, buckets + 1).astype(np.int64)
+
+
+def minmax_indices(y: np.ndarray, buckets: int) -> np.ndarray:
+    """Sorted unique indices of the min and max of y in each of `buckets` equal-count buckets (+ first/last)."""
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n <= 2 * buckets:
+        return np.arange(n)
+    edges = _bucket_edges(n, buckets)
+    starts = edges[:-1]
+    bucket = np.repeat(np.arange(buckets), np.diff(edges))
+    nan = np.isnan(y)
+    picks = [np.array([0, n - 1])]
+    for fill, reduce in ((np.inf, np.minimum), (-np.inf, np.maximum)):
+        v = np.where(nan, fill, y)
+        ext = reduce.reduceat(v, starts)
+        hit = np.flatnonzero(v == ext[bucket])          # every row equal to its bucket's extreme
+        _, first = np.unique(bucket[hit], return_index=True)
+        picks.append(hit[first])
+    return np.unique(np.concatenate(picks))
+
+
+@njit(cache=True)
+def _lttb(x, y, n_out, out):
+    n = x.shape[0]
+    every = (n - 2) / (n_out - 2)
+    a = 0
+    out[0] = 0
+    for i in range(n_out - 2):
+        # average of the next bucket
+        s = int((i + 1) * every) + 1
+        e = min(int((i + 2) * every) + 1, n)
+        ax = 0.0
+        ay = 0.0
+        for j in range(s, e):
+            ax += x[j]
+            ay += y[j]
+        cnt = max(e - s, 1)
+        ax /= cnt
+        ay /= cnt
+        # point of the current bucket with the largest triangle (a, j, avg)
+        s0 = int(i * every) + 1
+        e0 = int((i + 1) * every) + 1
+        best = -1.0
+        pick = s0
+        for j in range(s0, e0):
+            area = abs((x[a] - ax) * (y[j] - y[a]) - (x[a] - x[j]) * (ay - y[a]))
+            if area > best:
+                best = area
+                pick = j
+        out[i + 1] = pick
+        a = pick
+    out[n_out - 1] = n - 1
+    return out
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, points: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: `points` indices of (x, y) incl. first and last; NaN y counts as 0."""
+    n = len(y)
+    if points >= n or points < 3:
+        return np.arange(n)
+    xf = np.asarray(x, dtype=np.float64)
+    xf = xf - xf[0]                                   # ts_ns ~1e18: keep areas well conditioned
+    yf = np.nan_to_num(np.asarray(y, dtype=np.float64))
+    out = np.empty(points, dtype=np.int64)
+    if HAVE_NUMBA:
+        return _lttb(xf, yf, points, out)
+    every = (n - 2) / (points - 2)
+    a = 0
+    out[0] = 0
+    for i in range(points - 2):
+        s, e = int((i + 1) * every) + 1, min(int((i + 2) * every) + 1, n)
+        ax, ay = xf[s:e].mean(), yf[s:e].mean()
+        s0, e0 = int(i * every) + 1, int((i + 1) * every) + 1
+        area = np.abs((xf[a] - ax) * (yf[s0:e0] - yf[a]) - (xf[a] - xf[s0:e0]) * (ay - yf[a]))
+        a = s0 + int(np.argmax(area))
+        out[i + 1] = a
+    out[points - 1] = n - 1
+    return out
+
+
+def downsample_indices(x: np.ndarray, series: Dict[str, np.ndarray], points: int,
+                       method: str = "minmax", keys: Optional[Sequence[str]] = None) -> np.ndarray:
+    """
+    One index set for all series. minmax: union of per-key envelopes over points/2 buckets
+    (so up to `points` rows per key); lttb: `points` rows chosen on keys[0].
+    """
+    n = len(x)
+    if points <= 0 or n <= points:
+        return np.arange(n)
+    keys = [k for k in (keys or series.keys()) if series.get(k) is not None and len(series[k]) == n]
+    if not keys:
+        return np.unique(np.linspace(0, n - 1, points).astype(np.int64))
+    if method == "lttb":
+        return lttb_indices(x, series[keys[0]], points)
+    if method != "minmax":
+        raise ValueError(f"unknown method {method!r} ({'|'.join(METHODS)})")
+    buckets = max(points // 2, 1)
+    return np.unique(np.concatenate([minmax_indices(series[k], buckets) for k in keys]))
+
+
+def downsample(x: np.ndarray, series: Dict[str, Optional[np.ndarray]], points: int = 0,
+               method: str = "minmax", x0=None, x1=None, keys: Optional[Sequence[str]] = None
+               ) -> Tuple[np.ndarray, Dict[str, Optional[np.ndarray]], Dict[str, Any]]:
+    """Range-select on x, then reduce to ~points rows; returns (x, series, info)."""
+    x = np.asarray(x)
+    sl = range_slice(x, x0, x1) if (x0 is not None or x1 is not None) else slice(0, len(x))
+    xs = x[sl]
+    sub = {k: (None if v is None else np.asarray(v)[sl]) for k, v in series.items()}
+    idx = downsample_indices(xs, sub, points, method, keys)
+    info = {"rows": int(len(x)), "in_range": int(len(xs)), "returned": int(len(idx)),
+            "method": (method if len(idx) < len(xs) else "none"), "offset": int(sl.start or 0)}
+    if len(idx) == len(xs):
+        return xs, sub, info
+    return xs[idx], {k: (None if v is None else v[idx]) for k, v in sub.items()}, info
+
+
+def downsample_curve(curve: Optional[Dict[str, Any]], points: int, key: str) -> Optional[Dict[str, Any]]:
+    """Reduce a parametric curve (equal-length arrays, e.g. PR) to ~points rows by the minmax envelope of `key`."""
+    if not curve or points <= 0:
+        return curve
+    cols = {k: np.asarray(v, dtype=np.float64) for k, v in curve.items()}
+    idx = downsample_indices(np.arange(len(cols[key])), cols, points, "minmax", keys=(key,))
+    return {k: v[idx] for k, v in cols.items()}
+
+
+# ---------------------------------------------------------------- encoding
+def _json_array(a: np.ndarray):
+    if a.dtype.kind in "iub":
+        return a.tolist()
+    a = a.astype(np.float64, copy=False)
+    if np.isfinite(a).all():
+        return a.tolist()
+    return np.where(np.isfinite(a), a, None).tolist()
+
+
+def _b64_array(a: np.ndarray) -> dict:
+    a = np.ascontiguousarray(a)
+    if a.dtype.kind == "b":
+        a = a.astype(np.uint8)
+    elif a.dtype.kind == "f" and a.dtype != np.float32:
+        a = a.astype("<f8", copy=False)
+    elif a.dtype.kind in "iu":
+        a = a.astype("<" + a.dtype.str[1:], copy=False)
+    return {"dtype": a.dtype.str.lstrip("<|="), "shape": list(a.shape),
+            "b64": base64.b64encode(a.tobytes()).decode("ascii")}
+
+
+def _convert(obj, array_fn, ts_keys: Iterable[str] = ("ts", "x"), key: str = ""):
+    if isinstance(obj, np.ndarray):
+        if key in ts_keys and array_fn is _json_array and obj.dtype.kind in "iu":
+            return obj.astype(str).tolist()           # ns timestamps exceed JS number precision
+        return array_fn(obj)
+    if isinstance(obj, dict):
+        return {k: _convert(v, array_fn, ts_keys, k) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_convert(v, array_fn, ts_keys) for v in obj]
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, float) and not np.isfinite(obj):
+        return None
+    return obj
+
+
+def to_json_payload(payload: Any) -> Any:
+    """ndarray -> lists (ts/x int arrays -> strings, NaN -> None): the plain-JSON form."""
+    return _convert(payload, _json_array)
+
+
+def encode_payload(payload: Dict[str, Any], fmt: str = "json",
+                   table_key: Optional[str] = "series") -> Tuple[bytes, str]:
+    """
+    (body, media_type) for a payload whose arrays are NumPy arrays. For arrow the table is
+    payload[table_key], or the top-level 1-D arrays when table_key is None.
+    """
+    if fmt == "json":
+        return json.dumps(to_json_payload(payload), separators=(",", ":")).encode(), FORMATS[fmt]
+    if fmt == "b64":
+        body = _convert(payload, _b64_array)
+        body["encoding"] = "b64"
+        return json.dumps(body, separators=(",", ":")).encode(), FORMATS[fmt]
+    if fmt == "arrow":
+        import pyarrow as pa
+        if table_key is None:
+            table = {k: v for k, v in payload.items() if isinstance(v, np.ndarray) and v.ndim == 1}
+            rest = {k: v for k, v in payload.items() if k not in table}
+        else:
+            table = payload.get(table_key) or {}
+            rest = {k: v for k, v in payload.items() if k != table_key}
+        cols = {k: np.asarray(v) for k, v in table.items() if v is not None}
+        schema_meta = {"payload": json.dumps(to_json_payload(rest), separators=(",", ":"))}
+        tbl = pa.table(cols).replace_schema_metadata(schema_meta)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, tbl.schema) as writer:
+            writer.write_table(tbl)
+        return sink.getvalue().to_pybytes(), FORMATS[fmt]
+    raise ValueError(f"unknown format {fmt!r} ({'|'.join(FORMATS)})")
@@ -0,0 +1,84 @@
+# experiments/executor.py
+# Warm worker pool for the API: workers import factors/models once and keep
+# loaded tick data, then run train/backtest in-process and return results in
+# memory (no interpreter start, no CSV parse, no JSON round-trip per request).
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Sequence, Tuple
+
+import pandas as pd
+
+DEFAULT_DATA = "data/orderbook_top_ticks.csv"
+
+_POOL: Optional[ProcessPoolExecutor] = None
+
+# ---- worker-side state (one copy per worker process)
+_TICKS: Dict[str, Tuple[Tuple, pd.DataFrame]] = {}
+_MAX_TICK_FILES = 4
+
+
+def _stamp(path: str) -> Tuple:
+    from experiments.dataset import source_stamp
+    return source_stamp(path)
+
+
+def worker_ticks(path: str) -> pd.DataFrame:
+    """Tick data cached per worker; reloaded when the file changes."""
+    from experiments.tickstore import load_ticks
+    stamp = _stamp(path)
+    hit = _TICKS.get(path)
+    if hit is not None and hit[0] == stamp:
+        return hit[1]
+    df = load_ticks(path)
+    if len(_TICKS) >= _MAX_TICK_FILES:
+        _TICKS.pop(next(iter(_TICKS)))
+    _TICKS[path] = (stamp, df)
+    return df
+
+
+def _warm(preload: Sequence[str]) -> None:
+    import factors  # noqa: F401  (registration)
+    import models   # noqa: F401
+    import experiments.train      # noqa: F401
+    import experiments.backtest   # noqa: F401
+    from experiments.dataset import data_exists
+    for path in preload:
+        if data_exists(path):
+            try:
+                worker_ticks(path)
+            except Exception as e:
+                print(f"[WARN] preload {path} failed: {e}")
+
+
+def train_task(kw: dict) -> dict:
+    from experiments.train import run_train
+    return run_train(df=worker_ticks(kw["data"]), **kw)
+
+
+def backtest_task(kw: dict) -> dict:
+    from experiments.backtest import run_backtest
+    return run_backtest(ticks=worker_ticks(kw["data_path"]), **kw)
+
+
+# ---- API-side
+def get_executor(max_workers: Optional[int] = None,
+                 preload: Sequence[str] = (DEFAULT_DATA,)) -> ProcessPoolExecutor:
+    global _POOL
+    if _POOL is None:
+        if max_workers is None:
+            max_workers = int(os.environ.get("HFT_WORKERS", min(4, os.cpu_count() or 1)))
+        _POOL = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=mp.get_context("spawn"),  # no fork of the server's threads/event loop
+            initializer=_warm,
+            initargs=(tuple(preload),),
+        )
+    return _POOL
+
+
+def shutdown() -> None:
+    global _POOL
+    if _POOL is not None:
+        _POOL.shutdown(wait=False, cancel_futures=True)
+        _POOL = None
@@ -0,0 +1,150 @@
+# experiments/jobs.py
+# Job subsystem on top of the warm worker pool: submit -> job id, status /
+# result polling, cancellation, and de-duplication of identical in-flight jobs.
+import asyncio
+import itertools
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import CancelledError, Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from experiments import executor
+
+ACTIVE = ("queued", "running")
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    params: Dict[str, Any]
+    key: Tuple
+    created: float = field(default_factory=time.time)
+    finished: Optional[float] = None
+    cancelled: bool = False
+    result: Any = None
+    error: Optional[str] = None
+    future: Optional[Future] = None
+
+    @property
+    def status(self) -> str:
+        if self.cancelled:
+            return "cancelled"
+        if self.error is not None:
+            return "failed"
+        if self.finished is not None:
+            return "done"
+        return "running" if (self.future is not None and self.future.running()) else "queued"
+
+    @property
+    def progress(self) -> float:
+        # process-pool tasks report no intermediate progress: queued 0, running 0.5, finished 1
+        return {"queued": 0.0, "running": 0.5}.get(self.status, 1.0)
+
+    def info(self) -> dict:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": self.progress,
+            "params": self.params,
+            "created": self.created,
+            "finished": self.finished,
+            "error": self.error,
+        }
+
+    async def wait(self):
+        if self.finished is None and self.future is not None:
+            try:
+                # shield: a cancelled waiter must not cancel the shared (de-duplicated) job future
+                await asyncio.shield(asyncio.wrap_future(self.future))
+            except (CancelledError, Exception):
+                pass  # surfaced through status/error below
+            except asyncio.CancelledError:
+                # a cancelled job future also surfaces as asyncio.CancelledError here;
+                # only cancellation of the awaiting task itself (client gone, shutdown) propagates
+                if not self.future.cancelled():
+                    raise
+        return self
+
+
+def data_stamp(path: Optional[str]) -> Tuple:
+    """Identity of the input data for de-duplication (path + size + mtime; per partition for a dataset spec)."""
+    from experiments.dataset import source_stamp
+    if not path:
+        return ()
+    try:
+        return source_stamp(path)
+    except OSError:
+        return (os.path.abspath(path),)
+
+
+class JobManager:
+    def __init__(self, max_pending: int = 64, keep_finished: int = 200):
+        self.max_pending = max_pending
+        self.keep_finished = keep_finished
+        self._jobs: Dict[str, Job] = {}
+        self._inflight: Dict[Tuple, str] = {}
+        self._lock = threading.RLock()  # future.cancel() runs _finish synchronously
+        self._seq = itertools.count()
+
+    def submit(self, kind: str, fn: Callable[[dict], Any], params: dict, key: Tuple) -> Tuple[Job, bool]:
+        """Submit `fn(params)` to the pool; returns (job, deduplicated)."""
+        with self._lock:
+            jid = self._inflight.get(key)
+            if jid is not None and self._jobs[jid].status in ACTIVE:
+                return self._jobs[jid], True
+            pending = sum(1 for j in self._jobs.values() if j.status in ACTIVE)
+            if pending >= self.max_pending:
+                raise RuntimeError(f"Job queue full ({pending} pending)")
+            job = Job(id=f"{next(self._seq):06d}-{uuid.uuid4().hex[:8]}", kind=kind, params=params, key=key)
+            self._jobs[job.id] = job
+            self._inflight[key] = job.id
+            job.future = executor.get_executor().submit(fn, params)
+        job.future.add_done_callback(lambda fut, job=job: self._finish(job, fut))
+        return job, False
+
+    def _finish(self, job: Job, fut: Future) -> None:
+        with self._lock:
+            job.finished = time.time()
+            if not job.cancelled:
+                if fut.cancelled():
+                    job.cancelled = True
+                elif fut.exception() is not None:
+                    e = fut.exception()
+                    job.error = str(e) or e.__class__.__name__
+                else:
+                    job.result = fut.result()
+            if self._inflight.get(job.key) == job.id:
+                del self._inflight[job.key]
+            self._prune()
+
+    def _prune(self) -> None:
+        done = [j for j in self._jobs.values() if j.finished is not None]
+        for j in sorted(done, key=lambda j: j.finished)[:max(0, len(done) - self.keep_finished)]:
+            del self._jobs[j.id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Queued jobs are removed from the pool; a running job finishes in its worker but its result is dropped."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status not in ACTIVE:
+                return job
+            job.cancelled = True
+            if job.future is not None:
+                job.future.cancel()
+            if self._inflight.get(job.key) == job.id:
+                del self._inflight[job.key]
+        return job
+
+    def list(self) -> List[dict]:
+        return [j.info() for j in sorted(self._jobs.values(), key=lambda j: j.created, reverse=True)]
+
+
+JOBS = JobManager()
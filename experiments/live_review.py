@@ -0,0 +1,429 @@
+# experiments/live_review.py
+# Tail-follow review for a running simulation. CsvTail remembers a byte offset per file
+# (or keeps a named pipe open) and parses only the complete lines appended since the last
+# poll; LiveReview folds each batch of new fills into running state with vectorized NumPy
+# (bucket sums via reduceat, cumsum for position/cash, running peak for drawdown, Welford
+# merge for the step-PnL variance, a tick-binned slippage histogram), so a refresh costs
+# O(new fills) whatever the session length. Bucket semantics follow experiments/review.py;
+# the last bucket stays open (provisional) until a fill lands in a later one. Signals are
+# buffered until they fall behind the last closed bucket, so a signal file that runs ahead
+# of the trades never prices a bucket with later signals; fill-less buckets of the signal
+# span are marked to market like review() does, up to the open bucket. Slippage is
+# measured against the reference known *before* the fill (previous bucket VWAP or the last
+# signal price), i.e. causally, unlike the batch review which uses the fill's own bucket.
+#   python -m experiments.live_review --trades data/trades_executed.csv --bucket 100ms --interval 1
+import argparse
+import io
+import json
+import math
+import os
+import stat
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from experiments.review import BUCKET_SECONDS, HIT_EPS, SECONDS_PER_YEAR, normalize_signals, normalize_trades
+
+SLIP_BINS = 101          # histogram of slippage in price ticks, clipped to +-50 ticks
+TIMELINE_COLUMNS = ("ts", "mid", "net_qty", "vol", "position", "cash", "equity", "cum_pnl", "drawdown")
+
+
+class CsvTail:
+    """
+    New complete rows of a growing CSV (or a named pipe) since the last read().
+    The header is taken from the first line; a file that shrinks or is replaced starts
+    over from byte 0 and sets `reset` for that read.
+    """
+
+    def __init__(self, path: str, offset: int = 0):
+        self.path = path
+        self.offset = int(offset)
+        self.header: Optional[List[str]] = None
+        self.reset = False
+        self._ino = None
+        self._fd: Optional[int] = None       # kept open for FIFOs
+        self._pending = b""                  # partial last line (pipes only)
+
+    def _read_bytes(self) -> bytes:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return b""
+        if stat.S_ISFIFO(st.st_mode):
+            if self._fd is None:
+                self._fd = os.open(self.path, os.O_RDONLY | os.O_NONBLOCK)
+            chunks = []
+            while True:
+                try:
+                    b = os.read(self._fd, 1 << 20)
+                except BlockingIOError:
+                    break
+                if not b:
+                    break
+                chunks.append(b)
+            data, self._pending = self._pending + b"".join(chunks), b""
+            cut = data.rfind(b"\n") + 1
+            self._pending = data[cut:]
+            return data[:cut]
+        if st.st_ino != self._ino or st.st_size < self.offset:
+            if self._ino is not None:
+                self.reset = True
+            self._ino, self.offset, self.header = st.st_ino, 0, None
+        if st.st_size == self.offset:
+            return b""
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read(st.st_size - self.offset)
+        cut = data.rfind(b"\n") + 1          # leave a half-written last line for the next poll
+        self.offset += cut
+        return data[:cut]
+
+    def read(self) -> Optional[pd.DataFrame]:
+        self.reset = False
+        data = self._read_bytes()
+        if not data:
+            return None
+        if self.header is None:
+            line, _, data = data.partition(b"\n")
+            self.header = [c.strip() for c in line.decode().split(",")]
+            if not data:
+                return None
+        return pd.read_csv(io.BytesIO(data), header=None, names=self.header)
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class _Columns:
+    """Append-only column buffers with doubling capacity (amortized O(1) per row)."""
+
+    def __init__(self, names, dtypes=None):
+        self.names = tuple(names)
+        self.dtypes = dtypes or {}
+        self.n = 0
+        self._buf = {k: np.empty(1024, dtype=self.dtypes.get(k, np.float64)) for k in self.names}
+
+    def extend(self, cols: Dict[str, np.ndarray]) -> None:
+        m = len(next(iter(cols.values())))
+        need = self.n + m
+        cap = len(self._buf[self.names[0]])
+        if need > cap:
+            cap = max(need, 2 * cap)
+            for k in self.names:
+                nb = np.empty(cap, dtype=self._buf[k].dtype)
+                nb[: self.n] = self._buf[k][: self.n]
+                self._buf[k] = nb
+        for k in self.names:
+            self._buf[k][self.n:need] = cols[k]
+        self.n = need
+
+    def tail(self, rows: Optional[int] = None) -> Dict[str, np.ndarray]:
+        lo = 0 if rows is None else max(self.n - int(rows), 0)
+        return {k: self._buf[k][lo:self.n] for k in self.names}
+
+
+class LiveReview:
+    """Running position / cash / equity / drawdown / slippage over fills read by CsvTail."""
+
+    def __init__(self, trade_file: str, signal_file: Optional[str] = None, bucket: str = "100ms",
+                 tick: float = 0.01):
+        self.bucket = bucket
+        self.step = pd.Timedelta(bucket).value
+        self.tick = float(tick)
+        self.trades = CsvTail(trade_file)
+        self.signals = CsvTail(signal_file) if signal_file else None
+        self._reset_state()
+
+    def _reset_state(self) -> None:
+        self.timeline = _Columns(TIMELINE_COLUMNS, {"ts": np.int64})
+        self.open_key: Optional[int] = None
+        self.open = dict(net=0.0, cash=0.0, vol=0.0, pq=0.0, px=0.0, n=0)
+        self.position = self.cash = 0.0          # through the last closed bucket
+        self.last_mid = np.nan
+        self.last_equity = np.nan
+        self.equity0 = np.nan
+        self.peak = -np.inf
+        self.max_dd = 0.0
+        self.steps_n, self.steps_mean, self.steps_m2, self.hits = 0, 0.0, 0.0, 0
+        self.abs_pos_sum = 0.0
+        self.fills = 0
+        self.qty_total = 0.0
+        self._reset_signals()
+        self.slip_n, self.slip_sum, self.slip_sumsq = 0, 0.0, 0.0
+        self.slip_hist = np.zeros(SLIP_BINS, dtype=np.int64)
+        self.updates = 0
+
+    def _reset_signals(self) -> None:
+        # signals not yet behind the last closed bucket (the file may run ahead of the trades);
+        # sig_last = last signal price at or before the trimmed boundary
+        self.sig_ts = np.empty(0, dtype=np.int64)
+        self.sig_px = np.empty(0)
+        self.sig_last = np.nan
+        self.sig_hi = np.iinfo(np.int64).min       # newest signal ts ever read
+        self.sig_first: Optional[int] = None       # oldest signal ts (start of the signal span)
+
+    # ------------------------------------------------------------ batch update
+    def _read_signals(self) -> None:
+        s = self.signals.read()
+        if self.signals.reset:
+            self._reset_signals()
+        if s is None or not len(s):
+            return
+        s = normalize_signals(s)
+        ts = s["timestamp"].to_numpy(dtype="datetime64[ns]").astype(np.int64)
+        px = s["price"].to_numpy(dtype=float)
+        keep = ts > self.sig_hi
+        if keep.any():
+            if self.sig_first is None:
+                self.sig_first = int(ts[keep][0])
+            self.sig_ts = np.r_[self.sig_ts, ts[keep]]
+            self.sig_px = np.r_[self.sig_px, px[keep]]
+            self.sig_hi = int(ts[keep][-1])
+
+    def update(self) -> int:
+        """Read what was appended since the last call and fold it in; returns #new fills."""
+        if self.signals is not None:
+            self._read_signals()
+        df = self.trades.read()
+        if self.trades.reset:
+            self._reset_state()
+            if self.signals is not None:     # a new session re-prices from the first signal
+                self.signals.offset, self.signals.header = 0, None
+                self._read_signals()
+        self.updates += 1
+        n = 0
+        if df is not None and len(df):
+            df = normalize_trades(df)
+            n = len(df)
+            if n:
+                self._fold(df)
+        return n
+
+    def _signal_price(self, t) -> np.ndarray:
+        """Last signal price at or before t (buffered signals, else the carried one); t >= trimmed boundary."""
+        i = np.searchsorted(self.sig_ts, t, "right") - 1
+        return np.where(i >= 0, self.sig_px[np.maximum(i, 0)] if len(self.sig_px) else np.nan, self.sig_last)
+
+    def _trim_signals(self, boundary: int) -> None:
+        """Drop buffered signals at or before `boundary` (end of the last closed bucket)."""
+        k = int(np.searchsorted(self.sig_ts, boundary, "right"))
+        if k:
+            self.sig_last = float(self.sig_px[k - 1])
+            self.sig_ts, self.sig_px = self.sig_ts[k:], self.sig_px[k:]
+
+    def _fold(self, df: pd.DataFrame) -> None:
+        ts = df["ts_ns"].to_numpy(dtype="datetime64[ns]").astype(np.int64)
+        price = df["price"].to_numpy(dtype=float)
+        qty = df["qty"].to_numpy(dtype=float)
+        side = df["side"].to_numpy()
+        sign = np.where(side == "BUY", 1.0, np.where(side == "SELL", -1.0, 0.0))
+        net = sign * qty
+        key = ts - ts % self.step
+        if self.open_key is not None:
+            key = np.maximum(key, self.open_key)    # late rows join the open bucket
+        key = np.maximum.accumulate(key)            # keep buckets monotone within the batch
+
+        starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+        gkey = key[starts]
+        g = {"net": np.add.reduceat(net, starts), "cash": np.add.reduceat(-price * net, starts),
+             "vol": np.add.reduceat(qty, starts), "pq": np.add.reduceat(price * qty, starts),
+             "px": np.add.reduceat(price, starts), "n": np.diff(np.r_[starts, len(key)])}
+        o = self.open
+        if self.open_key is not None:
+            if gkey[0] == self.open_key:            # carry merges into the first group
+                for k in g:
+                    g[k][0] += o[k]
+            else:                                   # carry closes ahead of the batch
+                gkey = np.r_[self.open_key, gkey]
+                for k in g:
+                    g[k] = np.r_[o[k], g[k]]
+        # every group but the last is closed; the last becomes the open bucket
+        self.open_key = int(gkey[-1])
+        self.open = {k: (float(v[-1]) if k != "n" else int(v[-1])) for k, v in g.items()}
+        ck = gkey[:-1]
+        vwap = np.where(g["vol"] > 0, g["pq"] / np.where(g["vol"] > 0, g["vol"], 1.0), g["px"] / g["n"])
+        closed = {"net": g["net"][:-1], "cash": g["cash"][:-1], "vol": g["vol"][:-1], "vwap": vwap[:-1]}
+        if self.signals is not None:
+            ck, closed = self._with_signal_buckets(ck, closed)
+            cmid = self._signal_price(ck + self.step - 1)
+            cmid = np.where(np.isnan(cmid), closed["vwap"], cmid)
+        else:
+            cmid = closed["vwap"]
+
+        # slippage vs the reference known before each fill
+        if self.signals is not None:
+            ref = self._signal_price(ts - 1)
+        else:
+            j = np.searchsorted(ck, key, "left") - 1
+            ref = np.where(j >= 0, cmid[np.maximum(j, 0)] if len(cmid) else np.nan, self.last_mid)
+        slip = (price - ref) * np.where(sign == 0, np.nan, sign)
+        slip = slip[np.isfinite(slip)]
+        if len(slip):
+            self.slip_n += len(slip)
+            self.slip_sum += float(slip.sum())
+            self.slip_sumsq += float((slip * slip).sum())
+            b = np.clip(np.rint(slip / self.tick).astype(np.int64) + SLIP_BINS // 2, 0, SLIP_BINS - 1)
+            self.slip_hist += np.bincount(b, minlength=SLIP_BINS)
+        self.fills += len(ts)
+        self.qty_total += float(qty.sum())
+        if len(ck):
+            self._close(ck, cmid, closed["net"], closed["cash"], closed["vol"])
+            self._trim_signals(int(ck[-1]) + self.step - 1)
+
+    def _with_signal_buckets(self, ck: np.ndarray, closed: Dict[str, np.ndarray]):
+        """
+        Add the fill-less buckets of the signal span that are now final (before the open bucket),
+        as review() does: they mark the position to the signal price. Up to the newest signal read.
+        """
+        if self.sig_first is None:
+            return ck, closed
+        lo = int(self.timeline.tail(1)["ts"][0]) + self.step if self.timeline.n else -1
+        lo = max(lo, self.sig_first - self.sig_first % self.step)
+        hi = min(self.open_key, self.sig_hi - self.sig_hi % self.step + self.step)
+        if hi <= lo:
+            return ck, closed
+        keys = np.union1d(ck, np.arange(lo, hi, self.step, dtype=np.int64))
+        at = np.searchsorted(keys, ck)
+        out = {k: np.zeros(len(keys)) for k in ("net", "cash", "vol")}
+        out["vwap"] = np.full(len(keys), np.nan)
+        for k in out:
+            out[k][at] = closed[k]
+        return keys, out
+
+    def _close(self, keys, mid, net, cash, vol) -> None:
+        mid = pd.Series(mid).fillna(self.last_mid).ffill().to_numpy()
+        pos = self.position + np.cumsum(net)
+        csh = self.cash + np.cumsum(cash)
+        eq = csh + pos * mid
+        if np.isnan(self.equity0):
+            self.equity0 = float(eq[0])
+        prev = np.r_[self.last_equity if np.isfinite(self.last_equity) else eq[0], eq[:-1]]
+        steps = eq - prev
+        peak = np.fmax.accumulate(np.r_[self.peak, eq])[1:]
+        dd = eq - peak
+        # Welford merge of this batch's step moments
+        m, nb = float(np.nanmean(steps)), len(steps)
+        m2 = float(np.nansum((steps - m) ** 2))
+        tot = self.steps_n + nb
+        delta = m - self.steps_mean
+        self.steps_m2 += m2 + delta * delta * self.steps_n * nb / tot
+        self.steps_mean += delta * nb / tot
+        self.steps_n = tot
+        self.hits += int((steps > HIT_EPS).sum())
+        self.abs_pos_sum += float(np.abs(pos).sum())
+        self.position, self.cash = float(pos[-1]), float(csh[-1])
+        self.last_mid, self.last_equity = float(mid[-1]), float(eq[-1])
+        self.peak = float(peak[-1])
+        self.max_dd = min(self.max_dd, float(np.nanmin(dd)))
+        self.timeline.extend({"ts": keys, "mid": mid, "net_qty": net, "vol": vol, "position": pos,
+                              "cash": csh, "equity": eq, "cum_pnl": eq - self.equity0, "drawdown": dd})
+
+    # ------------------------------------------------------------ views
+    def _open_row(self) -> Optional[Dict[str, float]]:
+        """The open bucket as a provisional timeline row (its VWAP as mid)."""
+        if self.open_key is None:
+            return None
+        o = self.open
+        mid = o["pq"] / o["vol"] if o["vol"] > 0 else (o["px"] / o["n"] if o["n"] else self.last_mid)
+        if self.signals is not None:
+            sig = float(self._signal_price(self.open_key + self.step - 1))
+            mid = sig if np.isfinite(sig) else mid
+        pos, cash = self.position + o["net"], self.cash + o["cash"]
+        eq = cash + pos * mid
+        eq0 = self.equity0 if np.isfinite(self.equity0) else eq
+        return {"ts": self.open_key, "mid": mid, "net_qty": o["net"], "vol": o["vol"], "position": pos,
+                "cash": cash, "equity": eq, "cum_pnl": eq - eq0, "drawdown": min(eq - max(self.peak, eq), 0.0)}
+
+    def metrics(self) -> Dict[str, float]:
+        row = self._open_row()
+        n_b = self.timeline.n + (row is not None)
+        # fold the open bucket's provisional step into the Sharpe moments (not committed),
+        # so live Sharpe covers the same buckets as review() and as hit_rate below
+        n, mean, m2 = self.steps_n, self.steps_mean, self.steps_m2
+        if row is not None:
+            step = row["equity"] - self.last_equity if np.isfinite(self.last_equity) else 0.0
+            n += 1
+            delta = step - mean
+            mean += delta / n
+            m2 += delta * (step - mean)
+        sd = math.sqrt(m2 / (n - 1)) if n > 1 else 0.0
+        sec = BUCKET_SECONDS.get(self.bucket, self.step / 1e9)
+        mean_abs = (self.abs_pos_sum + (abs(row["position"]) if row else 0.0)) / n_b if n_b else 0.0
+        slip_mean = self.slip_sum / self.slip_n if self.slip_n else 0.0
+        return {
+            "position": row["position"] if row else self.position,
+            "cash": row["cash"] if row else self.cash,
+            "equity": row["equity"] if row else 0.0,
+            "final_pnl": row["cum_pnl"] if row else 0.0,
+            "max_drawdown": min(self.max_dd, row["drawdown"]) if row else self.max_dd,
+            "sharpe": (mean / sd * math.sqrt(SECONDS_PER_YEAR / sec)) if sd > 0 else 0.0,
+            "hit_rate": (self.hits + bool(row and row["equity"] - self.last_equity > HIT_EPS)) / n_b if n_b else 0.0,
+            "turnover": self.qty_total / (mean_abs + 1e-9),
+            "avg_slippage": slip_mean,
+            "slippage_std": math.sqrt(max(self.slip_sumsq / self.slip_n - slip_mean ** 2, 0.0)) if self.slip_n else 0.0,
+            "median_slippage": self.slip_median(),
+            "fills": self.fills,
+            "buckets": n_b,
+            "trade_offset": self.trades.offset,
+        }
+
+    def slip_median(self) -> float:
+        """Median of the tick-binned slippage histogram (price units)."""
+        if not self.slip_n:
+            return 0.0
+        i = int(np.searchsorted(np.cumsum(self.slip_hist), (self.slip_n + 1) / 2))
+        return (i - SLIP_BINS // 2) * self.tick
+
+    def slip_frame(self) -> pd.DataFrame:
+        centers = (np.arange(SLIP_BINS) - SLIP_BINS // 2) * self.tick
+        return pd.DataFrame({"slippage": centers, "count": self.slip_hist})
+
+    def frame(self, rows: Optional[int] = 2000) -> pd.DataFrame:
+        """Last `rows` closed buckets + the open one, ts as datetime64."""
+        df = pd.DataFrame(self.timeline.tail(rows))
+        row = self._open_row()
+        if row is not None:
+            df = pd.concat([df, pd.DataFrame([row])], ignore_index=True)
+        df["ts"] = pd.to_datetime(df["ts"].astype(np.int64), unit="ns")
+        return df
+
+    def close(self) -> None:
+        self.trades.close()
+        if self.signals is not None:
+            self.signals.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Tail trades (and signals) of a running simulation")
+    ap.add_argument("--trades", default="data/trades_executed.csv", help="CSV file or named pipe")
+    ap.add_argument("--signals", default="")
+    ap.add_argument("--bucket", default="100ms")
+    ap.add_argument("--tick", type=float, default=0.01)
+    ap.add_argument("--interval", type=float, default=1.0, help="seconds between polls")
+    ap.add_argument("--once", action="store_true", help="read what is there, print, exit")
+    args = ap.parse_args()
+
+    live = LiveReview(args.trades, args.signals or None, args.bucket, args.tick)
+    try:
+        while True:
+            t0 = time.perf_counter()
+            n = live.update()
+            if n or args.once:
+                out = live.metrics()
+                out.update(new_fills=n, update_ms=1e3 * (time.perf_counter() - t0))
+                print(json.dumps(out), flush=True)
+            if args.once:
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        live.close()
+
+
+if __name__ == "__main__":
+    main()
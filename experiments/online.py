@@ -0,0 +1,240 @@
+# experiments/online.py
+# Intraday online learning: factor rows come from the streaming factor state
+# (factors/stream.FactorStream), are labelled once their horizon has elapsed, and are fed
+# to an OnlineModel (models/base.py) in fixed-size mini-batches. Each update costs
+# O(batch · features²) or less regardless of how long the session has run.
+# Predictions are made before the row is learned from (prequential evaluation).
+# The StandardScaler is fitted on the first `scale_warmup` batches and then frozen, so the
+# model's persistent weights always see the same feature scale.
+#   python -m experiments.online --data data/orderbook_top_ticks.csv --model sgd_logit --batch 256
+import argparse
+import json
+import os
+import time
+from typing import Any, Dict, List, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+import models  # noqa: F401  (registers models)
+from experiments.pipeline import _instantiate_model
+from experiments.preprocess import FeaturePipeline
+from experiments.tickstore import align_top_of_book, load_ticks
+from experiments.train import resolve_factors
+from factors.stream import FactorStream
+from models.base import OnlineModel
+from models.fast import to_fast_predictor
+
+TICK_COLUMNS = ["midprice", "bid", "ask", "bid_qty", "ask_qty"]
+AUC_BINS = 4096          # probability histogram resolution of the running AUC
+LOG_LOSS_CLIP = 1e-15
+
+
+class PrequentialStats:
+    """
+    Running accuracy / log-loss / AUC of (prob, label) pairs in O(AUC_BINS) memory,
+    however long the session runs. AUC comes from per-class probability histograms
+    (pairs in the same bin count as ties, so it is exact up to 1/AUC_BINS resolution).
+    """
+
+    def __init__(self, bins: int = AUC_BINS):
+        self.bins = int(bins)
+        self.hist = np.zeros((2, self.bins), dtype=np.int64)   # [label, bin]
+        self.n = 0
+        self.correct = 0
+        self.log_loss_sum = 0.0
+
+    def add(self, p: float, label: int) -> None:
+        self.hist[label, min(int(p * self.bins), self.bins - 1)] += 1
+        self.n += 1
+        self.correct += int((p > 0.5) == bool(label))
+        q = min(max(p if label else 1.0 - p, LOG_LOSS_CLIP), 1.0)
+        self.log_loss_sum -= float(np.log(q))
+
+    def auc(self) -> Optional[float]:
+        neg, pos = self.hist[0], self.hist[1]
+        n_neg, n_pos = int(neg.sum()), int(pos.sum())
+        if n_neg == 0 or n_pos == 0:
+            return None
+        below = np.cumsum(neg) - neg                            # negatives in lower bins
+        return float((pos * (below + 0.5 * neg)).sum() / (n_pos * n_neg))
+
+    def summary(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"prequential_rows": self.n}
+        if self.n:
+            out["prequential_accuracy"] = self.correct / self.n
+            out["prequential_log_loss"] = self.log_loss_sum / self.n
+            out["prequential_auc"] = self.auc()
+        return out
+
+
+class OnlineLearner:
+    """
+    update(tick) -> P(up over the next `horizon` ticks) for that tick.
+    State is O(horizon · features + batch · features): a ring of the last horizon+1
+    feature rows / mids and one preallocated mini-batch.
+    """
+
+    def __init__(self, model_name: str, factor_list: List[str], horizon: int = 1, eps: float = 0.0,
+                 batch_size: Optional[int] = None, scale: bool = True, scale_warmup: int = 1):
+        task, model = _instantiate_model(model_name)
+        if not isinstance(model, OnlineModel):
+            raise ValueError(f"Model {model_name} does not implement OnlineModel (partial_fit)")
+        if horizon < 1:
+            raise ValueError("horizon must be >= 1")
+        self.model_name = model_name
+        self.model = model.reset()
+        self.stream = FactorStream(factor_list)
+        self.names = list(self.stream.names)
+        self.horizon = int(horizon)
+        self.eps = float(eps)
+        self.batch_size = int(batch_size or model.batch_size)
+        self.scaler = StandardScaler() if scale else None
+        self.scale_warmup = int(scale_warmup)   # batches the scaler learns from (0 = every batch)
+        self.preprocess = FeaturePipeline(self.names, self.names)
+
+        F = len(self.names)
+        self._feats = np.zeros((self.horizon + 1, F))
+        self._mids = np.full(self.horizon + 1, np.nan)
+        self._probs = np.full(self.horizon + 1, np.nan)
+        self._Xb = np.zeros((self.batch_size, F))
+        self._yb = np.zeros(self.batch_size, dtype=int)
+        self._nb = 0
+        self._fast = None
+        self._row = np.zeros((1, F))
+        self.t = 0
+        self.n_updates = 0
+        self.update_seconds_sum = 0.0
+        self.update_seconds_max = 0.0
+        self.evaluation = PrequentialStats()
+
+    # ---- per tick
+    def update(self, tick: Mapping[str, float]) -> float:
+        x = self.stream.update(tick)
+        mid = float(tick["midprice"]) if "midprice" in tick else (float(tick["bid"]) + float(tick["ask"])) / 2.0
+        H = self.horizon + 1
+        if self.t >= self.horizon:
+            old = (self.t - self.horizon) % H
+            prev = self._mids[old]
+            if prev > 0 and np.isfinite(mid):
+                label = int(mid / prev - 1.0 > self.eps)
+                self._Xb[self._nb] = self._feats[old]
+                self._yb[self._nb] = label
+                self._nb += 1
+                if np.isfinite(self._probs[old]):
+                    self.evaluation.add(float(self._probs[old]), label)
+                if self._nb == self.batch_size:
+                    self.flush()
+        slot = self.t % H
+        row = self._feats[slot]
+        row[:] = x
+        np.copyto(row, 0.0, where=np.isnan(row))
+        self._mids[slot] = mid
+        p = self.predict_one(row)
+        self._probs[slot] = p
+        self.t += 1
+        return p
+
+    def predict_one(self, row: np.ndarray) -> float:
+        if self.n_updates == 0:
+            return np.nan
+        if self._fast is not None:
+            return self._fast.predict_proba_one(row)
+        # models without a fast path score a (1, F) ndarray in model feature space
+        self.preprocess.transform_one(row, self._row[0])
+        return float(self.model.predict_proba(self._row)[0, 1])
+
+    # ---- per mini-batch
+    def flush(self) -> None:
+        """Learn from the pending (possibly partial) mini-batch."""
+        n = self._nb
+        if n == 0:
+            return
+        t0 = time.perf_counter()
+        X = self._Xb[:n]
+        if self.scaler is not None and (self.scale_warmup <= 0 or self.n_updates < self.scale_warmup):
+            # past warm-up the scaler is frozen: refitting it would rescale inputs under
+            # weights learned at the old scale
+            self.scaler.partial_fit(X)
+            self.preprocess = FeaturePipeline.from_training(self.names, self.names, self.scaler)
+        Xs = pd.DataFrame(self.preprocess.transform(X), columns=self.names)
+        self.model.partial_fit(Xs, self._yb[:n].copy())
+        try:
+            self._fast = to_fast_predictor(self.model, preprocess=self.preprocess)
+        except NotImplementedError:
+            self._fast = None
+        dt = time.perf_counter() - t0
+        self.update_seconds_sum += dt
+        self.update_seconds_max = max(self.update_seconds_max, dt)
+        self.n_updates += 1
+        self._nb = 0
+
+    def summary(self) -> Dict[str, Any]:
+        upd = self.n_updates
+        out: Dict[str, Any] = {
+            "model_name": self.model_name,
+            "factors": self.names,
+            "horizon": self.horizon,
+            "eps": self.eps,
+            "batch_size": self.batch_size,
+            "scale_warmup": self.scale_warmup if self.scaler is not None else None,
+            "ticks": self.t,
+            "updates": self.n_updates,
+            "update_us_mean": 1e6 * self.update_seconds_sum / upd if upd else None,
+            "update_us_max": 1e6 * self.update_seconds_max if upd else None,
+        }
+        out.update(self.evaluation.summary())
+        return out
+
+
+def replay(learner: OnlineLearner, df: pd.DataFrame) -> np.ndarray:
+    """Feed a tick frame through the learner; returns the per-tick predictions."""
+    cols = [c for c in TICK_COLUMNS if c in df.columns]
+    values = df[cols].to_numpy(dtype=float)
+    tick = dict.fromkeys(cols, 0.0)
+    out = np.empty(len(values))
+    for i in range(len(values)):
+        v = values[i]
+        for j, c in enumerate(cols):
+            tick[c] = v[j]
+        out[i] = learner.update(tick)
+    learner.flush()
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Replay ticks through an online model (prequential evaluation)")
+    ap.add_argument("--data", default="data/orderbook_top_ticks.csv")
+    ap.add_argument("--model", default="sgd_logit")
+    ap.add_argument("--factors", default="")
+    ap.add_argument("--factors_cfg", default="configs/factors.yaml")
+    ap.add_argument("--horizon", type=int, default=1)
+    ap.add_argument("--eps", type=float, default=0.0)
+    ap.add_argument("--batch", type=int, default=0, help="mini-batch size (0 = model default)")
+    ap.add_argument("--no_scale", action="store_true")
+    ap.add_argument("--scale_warmup", type=int, default=1,
+                    help="mini-batches the scaler is fitted on before it is frozen (0 = refit every batch)")
+    ap.add_argument("--outdir", default="", help="save model.joblib / preprocess.json / meta.json here")
+    args = ap.parse_args()
+
+    learner = OnlineLearner(args.model, resolve_factors(args.factors, args.factors_cfg), args.horizon,
+                            args.eps, args.batch or None, scale=not args.no_scale,
+                            scale_warmup=args.scale_warmup)
+    df = align_top_of_book(load_ticks(args.data))
+    t0 = time.perf_counter()
+    replay(learner, df)
+    summary = learner.summary()
+    summary["replay_seconds"] = time.perf_counter() - t0
+    if args.outdir:
+        import joblib
+        os.makedirs(args.outdir, exist_ok=True)
+        joblib.dump(learner.model, os.path.join(args.outdir, "model.joblib"))
+        learner.preprocess.save(args.outdir)
+        with open(os.path.join(args.outdir, "meta.json"), "w") as f:
+            json.dump({**summary, "data_path": args.data, "online": True}, f, indent=2)
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
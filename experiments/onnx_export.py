@@ -0,0 +1,221 @@
+# experiments/onnx_export.py
+# Export trained registry models to ONNX for the C++ runner (ONNX Runtime, no Python
+# in the hot path). The graph is built from the model's fast predictor
+# (models/fast.py), so anything with `to_fast_predictor()` exports:
+#   FastLinear -> MatMul + Add + Sigmoid
+#   FastTrees  -> ai.onnx.ml.TreeEnsembleRegressor (margin) + Sigmoid
+# Writes model.onnx, feature_order.json (input/output schema) and scaler.json.
+# Optional deps: `onnx` to build, `onnxruntime` (or onnx.reference) for the parity check.
+#   python -m experiments.onnx_export --artdir artifacts/<run>
+import argparse
+import json
+import os
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from experiments.preprocess import PREPROCESS_FILE, FeaturePipeline
+from models.fast import FastLinear, FastPredictor, FastTrees, to_fast_predictor
+
+ONNX_FILE = "model.onnx"
+FEATURE_ORDER_FILE = "feature_order.json"
+SCALER_FILE = "scaler.json"
+INPUT_NAME = "input"
+OUTPUT_NAME = "prob"
+OPSET = 13          # onnxruntime >= 1.8
+ML_OPSET = 1
+
+
+def scaler_params(scaler) -> Optional[Dict[str, list]]:
+    """mean/scale of a fitted StandardScaler (None if no scaler)."""
+    if scaler is None:
+        return None
+    n = len(scaler.mean_) if getattr(scaler, "mean_", None) is not None else len(scaler.scale_)
+    mean = scaler.mean_ if getattr(scaler, "mean_", None) is not None else np.zeros(n)
+    scale = scaler.scale_ if getattr(scaler, "scale_", None) is not None else np.ones(n)
+    return {"mean": np.asarray(mean, dtype=float).tolist(), "scale": np.asarray(scale, dtype=float).tolist()}
+
+
+def build_onnx(pred: FastPredictor, scaler: Optional[Dict[str, list]] = None, name: str = "hft_model",
+               fill_value: float = 0.0):
+    """
+    ONNX graph: input float64 [N, n_features] (raw features when `scaler` is given,
+    otherwise the model's own input space) -> prob float32 [N, 1] = P(y=1).
+    NaN inputs (rolling-factor warm-up rows) become `fill_value` before scaling, as in
+    FeaturePipeline, so neither the logit nor the trees' missing-value branch ever sees NaN.
+    Standardization and the linear model run in float64 like sklearn; trees see
+    float32(x) exactly as xgboost does, so split decisions match bit for bit.
+    """
+    import onnx
+    from onnx import TensorProto, helper, numpy_helper
+
+    F = pred.n_features
+    nodes, inits = [], []
+    x = INPUT_NAME
+    inits.append(numpy_helper.from_array(np.array(fill_value, dtype=np.float64), "fill_value"))
+    nodes += [helper.make_node("IsNaN", [x], ["x_isnan"]),
+              helper.make_node("Where", ["x_isnan", "fill_value", x], ["x_filled"])]
+    x = "x_filled"
+    if scaler is not None:
+        inits += [numpy_helper.from_array(np.asarray(scaler["mean"], dtype=np.float64), "scaler_mean"),
+                  numpy_helper.from_array(np.asarray(scaler["scale"], dtype=np.float64), "scaler_scale")]
+        nodes += [helper.make_node("Sub", [x, "scaler_mean"], ["x_centered"]),
+                  helper.make_node("Div", ["x_centered", "scaler_scale"], ["x_scaled"])]
+        x = "x_scaled"
+
+    if isinstance(pred, FastLinear):
+        inits += [numpy_helper.from_array(pred.coef.reshape(F, 1), "coef"),
+                  numpy_helper.from_array(np.array([pred.intercept], dtype=np.float64), "intercept")]
+        nodes += [helper.make_node("MatMul", [x, "coef"], ["xw"]),
+                  helper.make_node("Add", ["xw", "intercept"], ["margin64"]),
+                  helper.make_node("Cast", ["margin64"], ["margin"], to=TensorProto.FLOAT)]
+    elif isinstance(pred, FastTrees):
+        nodes.append(helper.make_node("Cast", [x], ["x32"], to=TensorProto.FLOAT))
+        x = "x32"
+        leaf = pred.left < 0
+        tree_id = np.repeat(np.arange(len(pred.roots)), np.diff(np.append(pred.roots, len(pred.left))))
+        local = np.arange(len(pred.left)) - pred.roots[tree_id]
+        base = pred.roots[tree_id]
+        nodes.append(helper.make_node(
+            "TreeEnsembleRegressor", [x], ["margin"], domain="ai.onnx.ml",
+            n_targets=1,
+            aggregate_function="SUM",
+            base_values=[float(pred.base_margin)],
+            nodes_treeids=tree_id.tolist(),
+            nodes_nodeids=local.tolist(),
+            nodes_featureids=np.where(leaf, 0, pred.feat).tolist(),
+            nodes_values=np.where(leaf, 0.0, pred.thr).astype(float).tolist(),
+            nodes_modes=["LEAF" if l else "BRANCH_LT" for l in leaf],
+            nodes_truenodeids=np.where(leaf, 0, pred.left - base).tolist(),
+            nodes_falsenodeids=np.where(leaf, 0, pred.right - base).tolist(),
+            nodes_missing_value_tracks_true=pred.default_left.astype(int).tolist(),
+            target_treeids=tree_id[leaf].tolist(),
+            target_nodeids=local[leaf].tolist(),
+            target_ids=[0] * int(leaf.sum()),
+            target_weights=pred.value[leaf].astype(float).tolist(),
+        ))
+    else:
+        raise NotImplementedError(f"No ONNX lowering for {type(pred).__name__}")
+
+    nodes.append(helper.make_node("Sigmoid", ["margin"], [OUTPUT_NAME]))
+    graph = helper.make_graph(
+        nodes, name,
+        [helper.make_tensor_value_info(INPUT_NAME, TensorProto.DOUBLE, ["N", F])],
+        [helper.make_tensor_value_info(OUTPUT_NAME, TensorProto.FLOAT, ["N", 1])],
+        initializer=inits,
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", OPSET),
+                                                    helper.make_opsetid("ai.onnx.ml", ML_OPSET)],
+                              producer_name="hft-research")
+    model.ir_version = 7   # readable by onnxruntime 1.8+
+    onnx.checker.check_model(model)
+    return model
+
+
+def run_onnx(path: str, X: np.ndarray) -> np.ndarray:
+    """Evaluate model.onnx with onnxruntime, falling back to onnx's reference evaluator."""
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    try:
+        import onnxruntime as ort
+        sess = ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+        out = sess.run([OUTPUT_NAME], {INPUT_NAME: X})[0]
+    except ImportError:
+        from onnx.reference import ReferenceEvaluator
+        out = ReferenceEvaluator(path).run([OUTPUT_NAME], {INPUT_NAME: X})[0]
+    return np.asarray(out, dtype=float).ravel()
+
+
+def export_onnx(model, out_dir: str, feature_order: Sequence[str], scaler=None,
+                model_name: str = "", fill_value: float = 0.0) -> Dict[str, Any]:
+    """
+    Write model.onnx + feature_order.json (+ scaler.json) into out_dir.
+    With a scaler the graph takes raw features and standardizes internally.
+    """
+    pred = to_fast_predictor(model, list(feature_order))
+    sp = scaler_params(scaler)
+    onnx_model = build_onnx(pred, sp, name=model_name or "hft_model", fill_value=fill_value)
+    with open(os.path.join(out_dir, ONNX_FILE), "wb") as f:
+        f.write(onnx_model.SerializeToString())
+    schema = {
+        "features": list(feature_order),
+        "input": INPUT_NAME,
+        "output": OUTPUT_NAME,
+        "dtype": "float64",
+        "input_space": ("raw" if sp is not None else "model"),   # model = as the estimator was fitted
+        "fill_value": float(fill_value),                          # NaN inputs are replaced by this
+        "model_name": model_name,
+        "predictor": type(pred).__name__,
+        "opset": OPSET,
+    }
+    with open(os.path.join(out_dir, FEATURE_ORDER_FILE), "w") as f:
+        json.dump(schema, f, indent=2)
+    if sp is not None:
+        with open(os.path.join(out_dir, SCALER_FILE), "w") as f:
+            json.dump({"features": list(feature_order), **sp}, f, indent=2)
+    return schema
+
+
+def onnx_parity(out_dir: str, model, X_test, scaler=None, fill_value: float = 0.0,
+                nan_rows: int = 64) -> Dict[str, Any]:
+    """
+    Compare model.onnx against model.predict_proba on X_test (the model's input space).
+    When the graph embeds the scaler, X_test is mapped back to raw features first and the
+    reference is predict_proba(scaler.transform(raw)) — the same path live scoring takes.
+    `nan_rows` extra rows with NaN cells (copies of X_test rows) check the NaN fill.
+    """
+    sp = scaler_params(scaler)
+    X_in = np.asarray(X_test, dtype=float)
+    if sp is not None:
+        X_in = X_in * np.asarray(sp["scale"]) + np.asarray(sp["mean"])
+    if nan_rows and len(X_in):
+        rng = np.random.default_rng(0)
+        extra = X_in[rng.integers(0, len(X_in), nan_rows)].copy()
+        mask = rng.random(extra.shape) < 0.5
+        mask[:, 0] |= ~mask.any(axis=1)                      # at least one NaN per row
+        extra[mask] = np.nan
+        X_in = np.vstack([X_in, extra])
+    X_ref = pd.DataFrame(np.where(np.isnan(X_in), fill_value, X_in), columns=X_test.columns)
+    if sp is not None:
+        X_ref = pd.DataFrame(scaler.transform(X_ref), columns=X_test.columns)
+    ref = np.asarray(model.predict_proba(X_ref))
+    ref = ref[:, 1] if ref.ndim == 2 else ref.ravel()
+    got = run_onnx(os.path.join(out_dir, ONNX_FILE), X_in)
+    diff = np.abs(got - ref) if len(ref) else np.zeros(0)
+    return {
+        "rows": int(len(ref)),
+        "nan_rows": int(len(ref) - len(X_test)),
+        "max_abs_diff": float(diff.max()) if len(diff) else 0.0,
+        "mean_abs_diff": float(diff.mean()) if len(diff) else 0.0,
+        "ok": bool(len(diff) == 0 or diff.max() < 1e-4),   # float32 output vs float64 reference
+    }
+
+
+def main():
+    from experiments.artifacts import load_model, load_test_set
+    ap = argparse.ArgumentParser(description="Export an artifacts dir to ONNX and check parity on X_test")
+    ap.add_argument("--artdir", default="artifacts/latest")
+    ap.add_argument("--no_check", action="store_true")
+    args = ap.parse_args()
+
+    model = load_model(args.artdir)
+    X_test, _ = load_test_set(args.artdir)
+    scaler = None
+    scaler_path = os.path.join(args.artdir, "scaler.joblib")
+    if os.path.exists(scaler_path):
+        import joblib
+        scaler = joblib.load(scaler_path)
+    meta_path = os.path.join(args.artdir, "meta.json")
+    meta = json.load(open(meta_path)) if os.path.exists(meta_path) else {}
+    fill_value = 0.0
+    if os.path.exists(os.path.join(args.artdir, PREPROCESS_FILE)):
+        fill_value = FeaturePipeline.load(args.artdir).fill_value
+    schema = export_onnx(model, args.artdir, list(X_test.columns), scaler, meta.get("model_name", ""), fill_value)
+    out = {"schema": schema}
+    if not args.no_check:
+        out["parity"] = onnx_parity(args.artdir, model, X_test, scaler, fill_value)
+    print(json.dumps(out))
+
+
+if __name__ == "__main__":
+    main()
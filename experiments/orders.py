@@ -0,0 +1,312 @@
+# experiments/orders.py
+# Per-order lifecycle analytics over fills in the trades.csv schema (ts_ns,buy_id,sell_id,
+# price,qty[,aggressor]). Each id column gets an OrderIndex: one stable argsort groups the
+# fill rows of every order (time order kept), a pandas Index over the unique ids is the
+# hash lookup id -> segment, and every per-order statistic is a reduceat over the segments,
+# so tens of millions of fills never hit a Python-level loop.
+# Per order (side, order_id): fills, qty, VWAP, first/last fill ts, time to complete
+# (first -> last fill), maker share, and queue-position proxies for resting orders:
+#   arrival_ts  earliest fill ts at which an id >= order_id had been seen (ids are issued in
+#               arrival order by the matching engine), a lower bound of the order's arrival
+#   wait_ns     first maker fill ts - arrival_ts
+#   id_lag      ids issued between the order and its first maker fill
+#   queue_ahead maker qty filled at the same side/price between arrival and the first fill
+# The maker of a fill is the side opposite `aggressor` when present (lobsim output), else
+# the smaller id (arrived first, so it was resting).
+#   python -m experiments.orders --trades trades.csv [--orders orders.csv] [--out orders.parquet]
+import argparse
+import json
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from experiments.review import _to_datetime
+
+FILL_COLUMNS = ["ts_ns", "buy_id", "sell_id", "price", "qty"]
+BUY, SELL = 0, 1
+SIDES = ["BUY", "SELL"]
+
+try:  # optional: multi-threaded CSV parser for very large fill files
+    import pyarrow  # noqa: F401
+    HAVE_ARROW = True
+except ImportError:  # pragma: no cover - depends on environment
+    HAVE_ARROW = False
+
+
+def load_fills(path: str) -> pd.DataFrame:
+    """trades.csv -> time-sorted fills (only the columns order analytics needs)."""
+    head = pd.read_csv(path, nrows=0).columns
+    cols = [c for c in FILL_COLUMNS + ["aggressor"] if c in head]
+    missing = set(FILL_COLUMNS) - set(cols)
+    if missing:
+        raise ValueError(f"{path}: missing columns {sorted(missing)} (need {FILL_COLUMNS})")
+    df = pd.read_csv(path, usecols=cols, engine="pyarrow" if HAVE_ARROW else "c")
+    if not pd.api.types.is_integer_dtype(df["ts_ns"]):
+        # same conversion as review.normalize_trades; explicit ns unit (pandas 3 may infer us)
+        ts = _to_datetime(df["ts_ns"])
+        df = df[ts.notna().to_numpy()].copy()
+        df["ts_ns"] = ts[ts.notna()].to_numpy(dtype="datetime64[ns]").astype(np.int64)
+    for c in ("buy_id", "sell_id", "price", "qty"):
+        if not pd.api.types.is_numeric_dtype(df[c]):
+            df[c] = pd.to_numeric(df[c], errors="coerce")
+    df = df.dropna(subset=["buy_id", "sell_id", "price", "qty"])
+    if not df["ts_ns"].is_monotonic_increasing:
+        df = df.sort_values("ts_ns", kind="stable")
+    return df.reset_index(drop=True)
+
+
+class OrderIndex:
+    """order id -> its fill rows (time order), built once from one id column."""
+
+    def __init__(self, ids: np.ndarray):
+        ids = np.asarray(ids, dtype=np.int64)
+        self.perm = np.argsort(ids, kind="stable")      # rows grouped by id, time order inside
+        sid = ids[self.perm]
+        self.starts = np.flatnonzero(np.r_[True, sid[1:] != sid[:-1]]) if len(sid) else np.empty(0, np.int64)
+        self.counts = np.diff(np.r_[self.starts, len(sid)])
+        self.ids = sid[self.starts]
+        self.index = pd.Index(self.ids)                 # hash lookup id -> segment
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def segment(self, order_ids) -> np.ndarray:
+        """Segment number of each id (-1 if it has no fills)."""
+        return self.index.get_indexer(np.atleast_1d(order_ids))
+
+    def rows(self, order_id: int) -> np.ndarray:
+        """Fill row numbers of one order, in time order (empty if unknown)."""
+        k = self.segment(order_id)[0]
+        if k < 0:
+            return np.empty(0, dtype=np.int64)
+        s = self.starts[k]
+        return self.perm[s:s + self.counts[k]]
+
+    def reduce(self, values: np.ndarray, how: str = "sum") -> np.ndarray:
+        """Per-order sum / min / max / first / last of a per-fill array."""
+        v = np.asarray(values)[self.perm]
+        if how == "sum":
+            return np.add.reduceat(v, self.starts) if len(v) else v
+        if how == "min":
+            return np.minimum.reduceat(v, self.starts) if len(v) else v
+        if how == "max":
+            return np.maximum.reduceat(v, self.starts) if len(v) else v
+        if how == "first":
+            return v[self.starts]
+        if how == "last":
+            return v[self.starts + self.counts - 1]
+        raise ValueError(f"unknown reduction {how!r}")
+
+
+class FillIndex:
+    """Both id indexes of a fill table plus the per-fill maker side."""
+
+    def __init__(self, fills: pd.DataFrame):
+        self.fills = fills
+        self.buy = OrderIndex(fills["buy_id"].to_numpy())
+        self.sell = OrderIndex(fills["sell_id"].to_numpy())
+        if "aggressor" in fills.columns:
+            aggr = fills["aggressor"].astype(str).str.upper().to_numpy()
+            self.maker_side = np.where(aggr == "BUY", SELL, BUY)
+        else:
+            b = fills["buy_id"].to_numpy(dtype=np.int64)
+            s = fills["sell_id"].to_numpy(dtype=np.int64)
+            self.maker_side = np.where(b < s, BUY, SELL)
+
+    def fills_of(self, order_id: int) -> pd.DataFrame:
+        """All fills an order took part in (either side), time order."""
+        rows = np.union1d(self.buy.rows(order_id), self.sell.rows(order_id))
+        return self.fills.iloc[rows]
+
+
+class _LevelTape:
+    """Cumulative qty per price level (maker side, price) in row order: O(1) / O(log n) range sums."""
+
+    def __init__(self, level: np.ndarray, qty: np.ndarray):
+        n = len(level)
+        self.span = n + 1
+        order = np.argsort(level, kind="stable")             # by level, rows ascending inside
+        self.rank = np.empty(n, dtype=np.int64)
+        self.rank[order] = np.arange(n)
+        self.level = level[order]
+        self.keys = self.level.astype(np.int64) * self.span + order
+        self.qty = qty[order].astype(np.float64)
+        cq = np.cumsum(self.qty)
+        start = np.flatnonzero(np.r_[True, self.level[1:] != self.level[:-1]]) if n else np.empty(0, np.int64)
+        base = np.r_[0.0, cq][start]                         # running total before each level
+        self.cum = cq - np.repeat(base, np.diff(np.r_[start, n]))
+
+    def before(self, row: np.ndarray) -> np.ndarray:
+        """Qty traded at each row's own level strictly before that row."""
+        k = self.rank[row]
+        return self.cum[k] - self.qty[k]
+
+    def upto(self, level: np.ndarray, row: np.ndarray) -> np.ndarray:
+        """Qty traded at `level` over rows <= row (0 when row < 0 or nothing traded yet)."""
+        if not len(self.keys):
+            return np.zeros(len(level))
+        i = np.searchsorted(self.keys, level.astype(np.int64) * self.span + row, "right") - 1
+        i0 = np.maximum(i, 0)
+        return np.where((i >= 0) & (self.level[i0] == level), self.cum[i0], 0.0)
+
+
+def order_stats(fills: pd.DataFrame, index: Optional[FillIndex] = None,
+                orders: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    One row per (side, order_id) that has fills. `orders` (order_id|id, qty[, ts_ns, side]) adds
+    fill_rate / complete and submit-relative latencies when the submitted orders are known.
+    """
+    idx = index or FillIndex(fills)
+    n = len(fills)
+    ts = fills["ts_ns"].to_numpy(dtype=np.int64)
+    price = fills["price"].to_numpy(dtype=float)
+    qty = fills["qty"].to_numpy(dtype=float)
+    # largest id issued so far at each fill row (ids are handed out in arrival order)
+    seen = np.maximum(fills["buy_id"].to_numpy(dtype=np.int64), fills["sell_id"].to_numpy(dtype=np.int64))
+    seen = np.maximum.accumulate(seen) if n else seen
+    level = pd.factorize(price)[0] * 2 + idx.maker_side   # (maker side, price) level code
+    tape = _LevelTape(level, qty)
+    row_no = np.arange(n, dtype=np.int64)
+
+    frames = []
+    for side, oi in ((BUY, idx.buy), (SELL, idx.sell)):
+        if not len(oi):
+            continue
+        is_maker = idx.maker_side == side
+        q = oi.reduce(qty)
+        notional = oi.reduce(price * qty)
+        first_ts, last_ts = oi.reduce(ts, "first"), oi.reduce(ts, "last")
+        maker_qty = oi.reduce(np.where(is_maker, qty, 0.0))
+        # queue proxies only for orders that rested: first fill where they were the maker
+        first_maker_row = oi.reduce(np.where(is_maker, row_no, n), "min")
+        rest = np.flatnonzero(first_maker_row < n)
+        r1 = first_maker_row[rest]
+        r0 = np.minimum(np.searchsorted(seen, oi.ids[rest], "left"), r1)
+        arrival_ts = np.full(len(oi), -1, dtype=np.int64)
+        wait_ns = np.full(len(oi), -1, dtype=np.int64)
+        id_lag = np.full(len(oi), -1, dtype=np.int64)
+        ahead = np.full(len(oi), np.nan)
+        arrival_ts[rest] = ts[r0]
+        wait_ns[rest] = ts[r1] - ts[r0]
+        id_lag[rest] = seen[r1] - oi.ids[rest]
+        ahead[rest] = tape.before(r1) - tape.upto(level[r1], r0 - 1)
+        frames.append(pd.DataFrame({
+            "side": pd.Categorical.from_codes(np.full(len(oi), side, dtype=np.int8), SIDES),
+            "order_id": oi.ids,
+            "fills": oi.counts,
+            "qty": q,
+            "vwap": notional / np.where(q > 0, q, np.nan),
+            "first_ts": first_ts,
+            "last_ts": last_ts,
+            "time_to_complete_ns": last_ts - first_ts,
+            "first_price": oi.reduce(price, "first"),
+            "last_price": oi.reduce(price, "last"),
+            "min_price": oi.reduce(price, "min"),
+            "max_price": oi.reduce(price, "max"),
+            "maker_share": maker_qty / np.where(q > 0, q, np.nan),
+            "arrival_ts": arrival_ts,
+            "wait_ns": wait_ns,
+            "id_lag": id_lag,
+            "queue_ahead": ahead,
+        }))
+    out = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    if orders is not None and len(out):
+        out = _join_orders(out, orders)
+    return out
+
+
+def _join_orders(stats: pd.DataFrame, orders: pd.DataFrame) -> pd.DataFrame:
+    id_col = "order_id" if "order_id" in orders.columns else "id"
+    n = len(stats)
+    sub_qty = np.full(n, np.nan)
+    sub_ts = np.full(n, -1, dtype=np.int64)
+    has_ts = "ts_ns" in orders.columns
+    # with a side column ids only need to be unique per side
+    parts = orders.groupby(orders["side"].astype(str).str.upper()) if "side" in orders.columns else [(None, orders)]
+    for side, o in parts:
+        o = o.drop_duplicates(id_col).set_index(id_col)
+        rows = np.arange(n) if side is None else np.flatnonzero((stats["side"] == side).to_numpy())
+        pos = o.index.get_indexer(stats["order_id"].to_numpy()[rows])
+        hit = rows[pos >= 0]
+        sub_qty[hit] = o["qty"].to_numpy(dtype=float)[pos[pos >= 0]]
+        if has_ts:
+            sub_ts[hit] = o["ts_ns"].to_numpy(dtype=np.int64)[pos[pos >= 0]]
+    stats["order_qty"] = sub_qty
+    stats["fill_rate"] = stats["qty"] / sub_qty
+    stats["complete"] = stats["fill_rate"] >= 1.0 - 1e-12
+    if has_ts:
+        known = sub_ts >= 0
+        stats["submit_ts"] = sub_ts
+        stats["first_fill_latency_ns"] = np.where(known, stats["first_ts"] - sub_ts, -1)
+        stats["complete_latency_ns"] = np.where(known, stats["last_ts"] - sub_ts, -1)
+    return stats
+
+
+def summarize_orders(stats: pd.DataFrame) -> Dict[str, Any]:
+    """Headline numbers for the dashboard / CLI."""
+    if stats.empty:
+        return {"orders": 0}
+    ttc = stats["time_to_complete_ns"].to_numpy(dtype=float)
+    multi = stats["fills"] > 1
+    resting = stats["queue_ahead"].notna()
+    out = {
+        "orders": int(len(stats)),
+        "buy_orders": int((stats["side"] == "BUY").sum()),
+        "sell_orders": int((stats["side"] == "SELL").sum()),
+        "fills_per_order": float(stats["fills"].mean()),
+        "partial_fill_share": float(multi.mean()),
+        "ttc_median_ms": float(np.median(ttc[multi]) / 1e6) if multi.any() else 0.0,
+        "ttc_p95_ms": float(np.percentile(ttc[multi], 95) / 1e6) if multi.any() else 0.0,
+        "maker_share": float((stats["maker_share"] * stats["qty"]).sum() / stats["qty"].sum()),
+        "wait_median_ms": float(stats.loc[resting, "wait_ns"].median() / 1e6) if resting.any() else 0.0,
+        "queue_ahead_median": float(stats.loc[resting, "queue_ahead"].median()) if resting.any() else 0.0,
+    }
+    if "fill_rate" in stats.columns:
+        known = stats["order_qty"].notna()
+        out["matched_orders"] = int(known.sum())
+        out["fill_rate_mean"] = float(stats.loc[known, "fill_rate"].mean()) if known.any() else float("nan")
+        out["complete_share"] = float(stats.loc[known, "complete"].mean()) if known.any() else float("nan")
+    return out
+
+
+_MEMO: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+
+
+def order_review(trade_file: str, orders_file: Optional[str] = None) -> Dict[str, Any]:
+    """{fills, index, stats, summary}; memoized on (path, size, mtime) of the inputs."""
+    from experiments.dataset import source_stamp
+    key = (source_stamp(trade_file), source_stamp(orders_file) if orders_file else None)
+    hit = _MEMO.get(key)
+    if hit is not None:
+        _MEMO.move_to_end(key)
+        return hit
+    fills = load_fills(trade_file)
+    index = FillIndex(fills)
+    orders = pd.read_csv(orders_file) if orders_file else None
+    stats = order_stats(fills, index, orders)
+    out = {"fills": fills, "index": index, "stats": stats, "summary": summarize_orders(stats)}
+    _MEMO[key] = out
+    while len(_MEMO) > 4:
+        _MEMO.popitem(last=False)
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Per-order fill lifecycle from trades.csv buy_id/sell_id")
+    ap.add_argument("--trades", default="trades.csv")
+    ap.add_argument("--orders", default="", help="optional submitted orders: order_id|id, qty[, ts_ns, side]")
+    ap.add_argument("--out", default="", help="write the per-order table (.parquet or .csv)")
+    args = ap.parse_args()
+    res = order_review(args.trades, args.orders or None)
+    if args.out:
+        if args.out.endswith(".parquet"):
+            res["stats"].to_parquet(args.out, index=False)
+        else:
+            res["stats"].to_csv(args.out, index=False)
+    print(json.dumps(res["summary"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,11 @@
 # experiments/pipeline.py
+import hashlib
+import inspect
 import json
 import os
+import sys
 from dataclasses import dataclass
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Callable, Optional, Tuple
 
 import numpy as np
 import pandas as pd
@@ -12,6 +15,9 @@ from sklearn.preprocessing import StandardScaler
 import joblib
 
 from factors.engine import compute_factors
+from factors.cache import cached_factors, get_factor_cache
+from experiments.tickstore import align_top_of_book, load_ticks
+from experiments.preprocess import FeaturePipeline
 from models.base import get_all_models
 
 @dataclass
@@ -25,40 +31,67 @@ class TrainResult:
     y_test: pd.Series
     y_pred: np.ndarray
     y_prob: Optional[np.ndarray]
+    scaler: Optional[StandardScaler] = None
+    preprocess: Optional[FeaturePipeline] = None
 
 def _build_midprice(df: pd.DataFrame) -> pd.DataFrame:
-    """处理多种输入格式，构造 midprice 与兼容列 close。"""
-    if "midprice" in df.columns:
-        mid = df.copy()
-    elif {"bid", "ask"}.issubset(df.columns):
-        mid = df.copy()
-        mid["midprice"] = (df["bid"] + df["ask"]) / 2.0
-    elif {"side", "price"}.issubset(df.columns):
-        buy = df[df["side"] == "BUY"].reset_index(drop=True)
-        sell = df[df["side"] == "SELL"].reset_index(drop=True)
-        if len(buy) != len(sell):
-            raise ValueError("BUY/SELL 行数不匹配，无法对齐构造 midprice")
-        mid = pd.DataFrame({"ts_ns": buy["ts_ns"].values})
-        mid["midprice"] = (buy["price"].values + sell["price"].values) / 2.0
-    elif "price" in df.columns:
-        mid = df.rename(columns={"price": "midprice"}).copy()
-    else:
-        raise ValueError("无法从输入构造 midprice（缺少 bid/ask 或 side/price）")
-
-    if "ts_ns" not in mid.columns and "timestamp" in mid.columns:
-        mid = mid.rename(columns={"timestamp": "ts_ns"})
-
+    """处理多种输入格式，构造 midprice 与兼容列 close（对齐逻辑见 experiments/tickstore.py）。"""
+    mid = align_top_of_book(df)
     mid["close"] = mid["midprice"]
     return mid
 
+def _forward_returns(mid: pd.DataFrame, horizons: List[int]) -> np.ndarray:
+    """一次遍历 midprice 得到多个 horizon 的未来收益矩阵 (n, H)；列 j == pct_change(h_j).shift(-h_j)。"""
+    p = mid["midprice"].to_numpy(dtype=float)
+    R = np.full((len(p), len(horizons)), np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for j, h in enumerate(horizons):
+            if 0 < h < len(p):
+                R[:-h, j] = p[h:] / p[:-h] - 1.0
+    return R
+
+def cached_forward_returns(data_path: Optional[str], horizons: List[int],
+                           load_mid: Callable[[], pd.DataFrame]) -> np.ndarray:
+    """
+    未来收益矩阵 (n, H)，与因子矩阵一起存在 factors/cache.py 的磁盘缓存里，
+    训练与回测读同一份数组；只在缺失的 horizon 上调用 load_mid 计算。
+    """
+    if not data_path:
+        return _forward_returns(load_mid(), horizons)
+    cache = get_factor_cache()
+    code = hashlib.sha1(inspect.getsource(_forward_returns).encode()).hexdigest()[:16]
+    paths = [cache.path_for(data_path, f"fwdret_h{h}", code) for h in horizons]
+    cols = [cache.load(p) for p in paths]
+    missing = [j for j, c in enumerate(cols) if c is None]
+    if missing:
+        R = _forward_returns(load_mid(), [horizons[j] for j in missing])
+        for k, j in enumerate(missing):
+            cols[j] = R[:, k]
+            cache.store(paths[j], R[:, k])
+    return np.column_stack(cols) if cols else np.empty((0, 0))
+
+def _make_labels(R: np.ndarray, eps_list: List[float], drop_equal: bool = False) -> np.ndarray:
+    """
+    向量化多标签：R (n, H) 未来收益 × eps_list (E) -> Y (n, H, E)，>eps 记 1 否则 0；
+    未来收益缺失（或 drop_equal 时 |ret|<=eps）记 NaN。
+    """
+    eps = np.asarray(eps_list, dtype=float)[None, None, :]
+    ret = R[:, :, None]
+    Y = (ret > eps).astype(float)
+    drop = ~np.isfinite(ret)
+    if drop_equal:
+        drop = drop | ((eps > 0) & (np.abs(ret) <= eps))
+    Y[np.broadcast_to(drop, Y.shape)] = np.nan
+    return Y
+
 def _make_label(mid: pd.DataFrame, horizon: int = 1, eps: float = 0.0,
-                drop_equal: bool = False) -> pd.Series:
-    """未来 horizon 步收益率阈值标签；>eps 记作 1，否则 0；可选丢弃小于等于 eps 的样本。"""
-    ret = mid["midprice"].pct_change(horizon).shift(-horizon)
-    if drop_equal and eps > 0:
-        ret = ret.where(ret.abs() > eps, np.nan)
-    y = (ret > eps).astype(float)  # 先 float，后面再 dropna 再转 int
-    return y
+                drop_equal: bool = False, R: Optional[np.ndarray] = None) -> pd.Series:
+    """未来 horizon 步收益率阈值标签；>eps 记作 1，否则 0；可选丢弃小于等于 eps 的样本。
+    R 可传入已算好的 (n, 1) 未来收益（如 cached_forward_returns 的结果）。"""
+    if R is None:
+        R = _forward_returns(mid, [horizon])
+    y = _make_labels(R, [eps], drop_equal)[:, 0, 0]  # 先 float，后面再 dropna 再转 int
+    return pd.Series(y, index=mid.index)
 
 def _split_ts(X: pd.DataFrame, y: pd.Series, test_size: float = 0.2
               ) -> Tuple[pd.DataFrame, pd.DataFrame, pd.Series, pd.Series]:
@@ -73,39 +106,31 @@ def _instantiate_model(model_name: str):
     meta = reg[model_name]
     return meta["task"], meta["class"]()
 
-def train_once(
-    df_ticks: pd.DataFrame,
-    factor_names: List[str],
-    model_name: str,
-    horizon: int = 1,
-    eps: float = 0.0,
-    drop_equal: bool = False,
-    test_size: float = 0.2,
-    scale: bool = True
-) -> TrainResult:
-    """核心训练流程：返回指标、ROC、模型与测试集产物。"""
+def _build_features(df_ticks: pd.DataFrame, factor_names: List[str], data_path: Optional[str] = None,
+                    return_inputs: bool = False):
+    """构造 midprice 与因子矩阵（丢弃近似常数因子）；返回 (mid, X)。
+    return_inputs=True 时另返回丢弃前的原始因子列序（FeaturePipeline.inputs）。"""
     mid = _build_midprice(df_ticks)
-    X = compute_factors(mid, factor_names).astype(float).fillna(0)
+    if data_path:
+        X = cached_factors(data_path, factor_names, lambda: mid)
+        X.index = mid.index
+    else:
+        X = compute_factors(mid, factor_names)
+    X = X.astype(float).fillna(0)
+    inputs = list(X.columns)
 
     # 丢掉近似常数因子（防止无效特征污染）
     keep = X.std() > 1e-12
     X = X.loc[:, keep]
     if X.shape[1] == 0:
         raise ValueError("没有有效因子（方差≈0），请检查 factors 实现或选择。")
+    if return_inputs:
+        return mid, X, inputs
+    return mid, X
 
-    y = _make_label(mid, horizon=horizon, eps=eps, drop_equal=drop_equal)
-
-    X_train, X_test, y_train, y_test = _split_ts(X, y, test_size=test_size)
-
-    scaler = None
-    if scale:
-        scaler = StandardScaler()
-        X_train = pd.DataFrame(scaler.fit_transform(X_train), index=X_train.index, columns=X_train.columns)
-        X_test = pd.DataFrame(scaler.transform(X_test), index=X_test.index, columns=X_test.columns)
-
-    task, clf = _instantiate_model(model_name)
-    clf.fit(X_train, y_train)
-
+def _evaluate(task: str, clf, X_test, y_test
+              ) -> Tuple[Dict[str, float], Optional[Dict[str, List[float]]], np.ndarray, Optional[np.ndarray]]:
+    """测试集评估：返回 (metrics, roc, y_pred, y_prob)。"""
     y_pred = clf.predict(X_test)
     y_prob = None
     roc = None
@@ -119,7 +144,7 @@ def train_once(
             y_prob = y_pred
 
         # 退化检查（单一类别或概率常数）
-        if y_test.nunique() < 2 or float(np.std(y_prob)) == 0.0:
+        if len(np.unique(y_test)) < 2 or float(np.std(y_prob)) == 0.0:
             metrics["accuracy"] = float((y_pred == y_test).mean())
             metrics["auc"] = 0.5
             roc = {"fpr": [0.0, 1.0], "tpr": [0.0, 1.0]}
@@ -129,10 +154,46 @@ def train_once(
             fpr, tpr, _ = roc_curve(y_test, y_prob)
             roc = {"fpr": fpr.tolist(), "tpr": tpr.tolist()}
     else:  # regression
-        from numpy import ravel
-        y_pred = ravel(y_pred)
+        y_pred = np.ravel(y_pred)
         metrics["mse"] = mean_squared_error(y_test, y_pred)
         metrics["r2"] = r2_score(y_test, y_pred)
+    return metrics, roc, y_pred, y_prob
+
+def train_once(
+    df_ticks: Optional[pd.DataFrame],
+    factor_names: List[str],
+    model_name: str,
+    horizon: int = 1,
+    eps: float = 0.0,
+    drop_equal: bool = False,
+    test_size: float = 0.2,
+    scale: bool = True,
+    data_path: Optional[str] = None
+) -> TrainResult:
+    """核心训练流程：返回指标、ROC、模型与测试集产物。
+    给定 data_path（df_ticks 的来源文件）时，因子走磁盘缓存（factors/cache.py）。
+    data_path 也可以是分区数据集 spec（experiments/dataset.py，如 `root?instrument=X&start=..&end=..`）；
+    df_ticks 为 None 时按 data_path 加载。"""
+    if df_ticks is None:
+        df_ticks = load_ticks(data_path)
+    mid, X, inputs = _build_features(df_ticks, factor_names, data_path, return_inputs=True)
+    R = cached_forward_returns(data_path, [horizon], lambda: mid)
+    y = _make_label(mid, horizon=horizon, eps=eps, drop_equal=drop_equal, R=R)
+
+    X_train, X_test, y_train, y_test = _split_ts(X, y, test_size=test_size)
+
+    scaler = None
+    if scale:
+        scaler = StandardScaler()
+        X_train = pd.DataFrame(scaler.fit_transform(X_train), index=X_train.index, columns=X_train.columns)
+        X_test = pd.DataFrame(scaler.transform(X_test), index=X_test.index, columns=X_test.columns)
+
+    task, clf = _instantiate_model(model_name)
+    clf.fit(X_train, y_train)
+    metrics, roc, y_pred, y_prob = _evaluate(task, clf, X_test, y_test)
+
+    # 推理时复用的预处理：原始因子列序 -> 丢常数列 -> 标准化（与上面训练完全一致）
+    preprocess = FeaturePipeline.from_training(inputs, list(X.columns), scaler)
 
     return TrainResult(
         model_name=model_name,
@@ -143,19 +204,174 @@ def train_once(
         X_test=X_test,
         y_test=y_test,
         y_pred=y_pred,
-        y_prob=y_prob
+        y_prob=y_prob,
+        scaler=scaler,
+        preprocess=preprocess
     )
 
+# -----------------------------------------------------------------------------
+# Walk-forward
+# -----------------------------------------------------------------------------
+@dataclass
+class WalkForwardResult:
+    model_name: str
+    task: str
+    mode: str
+    folds: List[Dict[str, Any]]
+    aggregate: Dict[str, Dict[str, float]]
+
+def walk_forward_splits(n: int, n_folds: int, mode: str = "expanding",
+                        train_size: Optional[int] = None, gap: int = 0) -> List[Tuple[int, int, int, int]]:
+    """
+    把 n 个有效样本切成 n_folds 个前推窗口，返回 [(train_lo, train_hi, test_lo, test_hi)]。
+    - test 窗口等长、首尾相接，第一段（长度同 test）只作训练
+    - expanding：训练集从 0 开始；rolling：训练集长度固定为 train_size（默认 = 一个 test 窗口）
+    - gap：训练集末尾与测试集之间留空的样本数（= horizon，避免标签前视泄漏）
+    """
+    if mode not in ("expanding", "rolling"):
+        raise ValueError(f"Unknown walk-forward mode {mode}; use expanding or rolling")
+    block = n // (n_folds + 1)
+    if block <= gap:
+        raise ValueError(f"样本太少：{n} 行无法切成 {n_folds} 个 walk-forward 窗口")
+    train_size = train_size or block
+    out = []
+    for k in range(n_folds):
+        test_lo = (k + 1) * block
+        test_hi = n if k == n_folds - 1 else test_lo + block
+        train_hi = test_lo - gap
+        train_lo = 0 if mode == "expanding" else max(0, train_hi - train_size)
+        out.append((train_lo, train_hi, test_lo, test_hi))
+    return out
+
+def _wf_fold(task_spec: Dict[str, Any]) -> Dict[str, Any]:
+    """单个 fold（可在进程池中执行）：映射共享矩阵，切片视图训练并评估。"""
+    import time
+    from experiments.shared import open_shared
+
+    t0 = time.time()
+    arrs = open_shared(task_spec["arrays"])
+    X, y, ts = arrs["X"], arrs["y"], arrs["ts"]
+    tr_lo, tr_hi, te_lo, te_hi = task_spec["bounds"]
+    X_train, y_train = X[tr_lo:tr_hi], y[tr_lo:tr_hi]  # views into the memmap
+    X_test, y_test = X[te_lo:te_hi], y[te_lo:te_hi]
+
+    if task_spec["scale"]:
+        scaler = StandardScaler()
+        X_train = scaler.fit_transform(X_train)
+        X_test = scaler.transform(X_test)
+    cols = task_spec["columns"]
+    X_train = pd.DataFrame(X_train, columns=cols)
+    X_test = pd.DataFrame(X_test, columns=cols)
+
+    task, clf = _instantiate_model(task_spec["model_name"])
+    clf.fit(X_train, np.asarray(y_train))
+    metrics, _roc, _y_pred, _y_prob = _evaluate(task, clf, X_test, np.asarray(y_test))
+    return {
+        "fold": task_spec["fold"],
+        "train": [int(tr_lo), int(tr_hi)],
+        "test": [int(te_lo), int(te_hi)],
+        "test_ts_ns": [int(ts[te_lo]), int(ts[te_hi - 1])],
+        "n_train": int(tr_hi - tr_lo),
+        "n_test": int(te_hi - te_lo),
+        "metrics": {k: float(v) for k, v in metrics.items()},
+        "seconds": time.time() - t0,
+    }
+
+def walk_forward(
+    df_ticks: Optional[pd.DataFrame],
+    factor_names: List[str],
+    model_name: str,
+    horizon: int = 1,
+    eps: float = 0.0,
+    drop_equal: bool = False,
+    n_folds: int = 5,
+    mode: str = "expanding",
+    train_size: Optional[int] = None,
+    scale: bool = True,
+    n_jobs: Optional[int] = None,
+    data_path: Optional[str] = None
+) -> WalkForwardResult:
+    """
+    Walk-forward 验证：因子只在全序列上算一次，写入共享内存映射；
+    每个 fold 取连续切片（视图，不复制），各 fold 在进程池中并行训练/评估。
+    df_ticks 为 None 时按 data_path（文件或数据集 spec）加载。
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from experiments.shared import SharedArrays
+
+    if df_ticks is None:
+        df_ticks = load_ticks(data_path)
+    mid, X = _build_features(df_ticks, factor_names, data_path)
+    R = cached_forward_returns(data_path, [horizon], lambda: mid)
+    y = _make_label(mid, horizon=horizon, eps=eps, drop_equal=drop_equal, R=R)
+    valid = y.notna().to_numpy()
+    if "ts_ns" in mid.columns:
+        ts = mid["ts_ns"].to_numpy()[valid]
+    else:
+        ts = np.flatnonzero(valid)
+
+    splits = walk_forward_splits(int(valid.sum()), n_folds, mode, train_size, gap=horizon)
+    task, _ = _instantiate_model(model_name)  # fail fast on unknown model names
+
+    with SharedArrays({"X": X.to_numpy()[valid], "y": y.to_numpy()[valid].astype(int), "ts": ts}) as shm:
+        specs = [{
+            "fold": k,
+            "bounds": b,
+            "arrays": shm.specs,
+            "columns": list(X.columns),
+            "model_name": model_name,
+            "scale": scale,
+        } for k, b in enumerate(splits)]
+        n_jobs = n_jobs or min(len(specs), os.cpu_count() or 1)
+        if n_jobs <= 1:
+            folds = [_wf_fold(s) for s in specs]
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+                folds = list(pool.map(_wf_fold, specs))
+
+    aggregate: Dict[str, Dict[str, float]] = {}
+    for key in folds[0]["metrics"]:
+        vals = np.array([f["metrics"][key] for f in folds], dtype=float)
+        aggregate[key] = {
+            "mean": float(vals.mean()),
+            "std": float(vals.std()),
+            "min": float(vals.min()),
+            "max": float(vals.max()),
+        }
+    return WalkForwardResult(model_name=model_name, task=task, mode=mode, folds=folds, aggregate=aggregate)
+
+def save_walk_forward(out_dir: str, res: WalkForwardResult, extra_meta: Optional[Dict[str, Any]] = None) -> dict:
+    """写 walk_forward.json（逐 fold 指标 + 聚合指标）。"""
+    os.makedirs(out_dir, exist_ok=True)
+    meta = {
+        "model_name": res.model_name,
+        "task": res.task,
+        "mode": res.mode,
+        "folds": res.folds,
+        "aggregate": res.aggregate,
+    }
+    if extra_meta:
+        meta.update(extra_meta)
+    with open(os.path.join(out_dir, "walk_forward.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
 def save_artifacts(
     out_dir: str,
     res: TrainResult,
     extra_meta: Optional[Dict[str, Any]] = None,
-    scaler: Optional[StandardScaler] = None
+    scaler: Optional[StandardScaler] = None,
+    onnx: bool = False
 ) -> None:
+    """落盘 model.joblib / scaler.joblib / preprocess.json / 测试集 / meta.json（scaler 默认取 res.scaler）；
+    onnx=True 时另导出 model.onnx + feature_order.json（+ scaler.json）并做一致性校验。"""
     os.makedirs(out_dir, exist_ok=True)
+    scaler = scaler if scaler is not None else res.scaler
     joblib.dump(res.clf, os.path.join(out_dir, "model.joblib"))
     if scaler is not None:
         joblib.dump(scaler, os.path.join(out_dir, "scaler.joblib"))
+    if res.preprocess is not None:
+        res.preprocess.save(out_dir)
     res.X_test.to_parquet(os.path.join(out_dir, "X_test.parquet"))
     pd.Series(res.y_test).to_frame("y_test").to_parquet(os.path.join(out_dir, "y_test.parquet"))
     np.save(os.path.join(out_dir, "y_pred.npy"), res.y_pred)
@@ -169,5 +385,21 @@ def save_artifacts(
     }
     if extra_meta:
         meta.update(extra_meta)
+    if onnx:
+        meta["onnx"] = _export_onnx_artifacts(out_dir, res, scaler)
     with open(os.path.join(out_dir, "meta.json"), "w") as f:
         json.dump(meta, f, indent=2)
+
+
+def _export_onnx_artifacts(out_dir: str, res: TrainResult, scaler: Optional[StandardScaler]) -> Dict[str, Any]:
+    """ONNX 导出 + 与 predict_proba 的一致性；缺少 onnx 依赖或模型不支持时只记录错误，不影响训练产物。"""
+    from experiments.onnx_export import export_onnx, onnx_parity
+    try:
+        fill_value = res.preprocess.fill_value if res.preprocess is not None else 0.0
+        schema = export_onnx(res.clf, out_dir, list(res.X_test.columns), scaler, res.model_name, fill_value)
+        return {"file": "model.onnx", "input_space": schema["input_space"],
+                "parity": onnx_parity(out_dir, res.clf, res.X_test, scaler, fill_value)}
+    except (ImportError, NotImplementedError) as e:
+        print(f"[WARN] ONNX export skipped: {e}", file=sys.stderr)  # stdout 留给 CLI 的 JSON
+        return {"error": str(e)}
+
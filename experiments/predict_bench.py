@@ -0,0 +1,48 @@
+# experiments/predict_bench.py
+# Parity + latency of a run's fast single-row predictor (models/fast.py) against
+# the model's own predict_proba on X_test. --raw feeds un-preprocessed factor rows
+# through the run's saved preprocessing (preprocess.json) instead.
+#   python -m experiments.predict_bench --artdir artifacts/<run> [--raw]
+import argparse
+import json
+
+import numpy as np
+
+import models  # noqa: F401  (registration)
+from models.fast import bench, to_fast_predictor
+from experiments.artifacts import load_model, load_preprocess, load_test_set
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Parity + latency of the fast predictor for an artifacts dir")
+    ap.add_argument("--artdir", default="artifacts/latest")
+    ap.add_argument("--repeat", type=int, default=20000)
+    ap.add_argument("--raw", action="store_true", help="score raw factors through preprocess.json")
+    args = ap.parse_args()
+
+    model = load_model(args.artdir)
+    X_test, _ = load_test_set(args.artdir)
+    X_in = X_test.to_numpy()
+    if args.raw:
+        pipe = load_preprocess(args.artdir)
+        if pipe is None:
+            raise SystemExit(f"No preprocess.json in {args.artdir}; retrain to persist preprocessing")
+        pred = to_fast_predictor(model, preprocess=pipe)
+        # back to raw factor space (inverse scaling; dropped constant columns stay 0)
+        X_in = np.zeros((len(X_test), len(pipe.inputs)))
+        X_in[:, pipe.index] = X_test.to_numpy() * pipe.scale + pipe.mean
+        X_test = pipe.transform(X_in, as_frame=True)
+    else:
+        pred = to_fast_predictor(model, list(X_test.columns))
+    ref = np.asarray(model.predict_proba(X_test))
+    ref = ref[:, 1] if ref.ndim == 2 else ref
+    fast = pred.predict_proba(X_in)
+    print(json.dumps({
+        "type": type(pred).__name__,
+        "max_abs_diff": float(np.max(np.abs(fast - ref))) if len(ref) else 0.0,
+        **bench(pred, X_in, args.repeat),
+    }))
+
+
+if __name__ == "__main__":
+    main()
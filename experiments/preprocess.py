@@ -0,0 +1,121 @@
+# experiments/preprocess.py
+# The training-time feature preprocessing as one serializable stage:
+#   raw factor matrix (columns = `inputs`, as compute_factor_matrix / FactorStream emit them)
+#   -> NaN to 0 -> keep non-constant columns (`columns`, model order) -> (x - mean) / scale
+# Applied as a single fused gather/subtract/divide at inference time, so backtests on
+# new data, fast predictors and the ONNX graph all see exactly what the model was fit on.
+import json
+import os
+from typing import Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+try:  # optional accelerator
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:  # pragma: no cover - depends on environment
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda f: f
+
+PREPROCESS_FILE = "preprocess.json"
+
+
+@njit(cache=True)
+def _transform_row(x, index, mean, scale, fill_value, out):
+    for j in range(index.shape[0]):
+        v = x[index[j]]
+        if v != v:
+            v = fill_value
+        out[j] = (v - mean[j]) / scale[j]
+    return out
+
+
+class FeaturePipeline:
+    def __init__(self, inputs: Sequence[str], columns: Sequence[str],
+                 mean: Optional[Sequence[float]] = None, scale: Optional[Sequence[float]] = None,
+                 fill_value: float = 0.0):
+        self.inputs = list(inputs)
+        self.columns = list(columns)
+        pos = {name: i for i, name in enumerate(self.inputs)}
+        missing = [c for c in self.columns if c not in pos]
+        if missing:
+            raise ValueError(f"columns not in inputs: {missing}")
+        self.index = np.array([pos[c] for c in self.columns], dtype=np.intp)
+        k = len(self.columns)
+        self.mean = np.zeros(k) if mean is None else np.asarray(mean, dtype=np.float64).copy()
+        self.scale = np.ones(k) if scale is None else np.asarray(scale, dtype=np.float64).copy()
+        self.scale[self.scale == 0.0] = 1.0          # same convention as StandardScaler
+        self.fill_value = float(fill_value)
+        self.scaled = mean is not None or scale is not None
+
+    @classmethod
+    def from_training(cls, inputs: Sequence[str], columns: Sequence[str], scaler=None) -> "FeaturePipeline":
+        """Capture the drop mask / column order and a fitted StandardScaler (or none)."""
+        if scaler is None:
+            return cls(inputs, columns)
+        mean = getattr(scaler, "mean_", None)
+        scale = getattr(scaler, "scale_", None)
+        return cls(inputs, columns, mean, scale)
+
+    # ---- inference
+    def transform(self, X: Union[pd.DataFrame, np.ndarray], as_frame: bool = False):
+        """(n, len(inputs)) raw factors -> (n, len(columns)) model features."""
+        if isinstance(X, pd.DataFrame):
+            index = X.index
+            raw = X.reindex(columns=self.inputs).to_numpy(dtype=np.float64, copy=False)
+        else:
+            index = None
+            raw = np.asarray(X, dtype=np.float64)
+        out = raw[:, self.index]                              # gather -> new buffer
+        np.copyto(out, self.fill_value, where=np.isnan(out))
+        np.subtract(out, self.mean, out=out)
+        np.divide(out, self.scale, out=out)
+        if as_frame:
+            return pd.DataFrame(out, index=index, columns=self.columns)
+        return out
+
+    def transform_one(self, x: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """One raw row (len(inputs)) into `out` (len(columns)); no allocation when out is given."""
+        if out is None:
+            out = np.empty(len(self.columns))
+        if HAVE_NUMBA:
+            return _transform_row(x, self.index, self.mean, self.scale, self.fill_value, out)
+        np.take(x, self.index, out=out)
+        np.copyto(out, self.fill_value, where=np.isnan(out))
+        np.subtract(out, self.mean, out=out)
+        np.divide(out, self.scale, out=out)
+        return out
+
+    # ---- persistence
+    def to_dict(self) -> dict:
+        return {
+            "inputs": self.inputs,
+            "columns": self.columns,
+            "fill_value": self.fill_value,
+            "scaled": self.scaled,
+            "mean": self.mean.tolist(),
+            "scale": self.scale.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "FeaturePipeline":
+        scaled = d.get("scaled", True)
+        return cls(d["inputs"], d["columns"],
+                   d["mean"] if scaled else None, d["scale"] if scaled else None,
+                   d.get("fill_value", 0.0))
+
+    def save(self, out_dir: str) -> str:
+        path = os.path.join(out_dir, PREPROCESS_FILE)
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        return path
+
+    @classmethod
+    def load(cls, out_dir: str) -> "FeaturePipeline":
+        with open(os.path.join(out_dir, PREPROCESS_FILE)) as f:
+            return cls.from_dict(json.load(f))
@@ -0,0 +1,86 @@
+# experiments/pyramid.py
+# Multi-resolution pyramid for zoomable charts. Level k holds, for every series, the
+# min / max / last of each aligned block of 2^k rows (level 0 = the raw rows). Levels are
+# built pairwise from the one below, so the whole pyramid costs O(n) time. Memory: levels
+# >= 1 hold 3 stats x (n/2 + n/4 + ...) ~= 3n values per series on top of the raw n
+# (level 0 shares the input arrays), i.e. ~4x the raw series plus the x axis (`nbytes`).
+# A range query is two binary searches on the sorted x axis plus a slice of the coarsest
+# level that still has >= `points` buckets in the window: O(log n + points), independent
+# of the total row count.
+#   pyr = SeriesPyramid(ts_ns, {"pnl_net": cum_net, "drawdown": dd})
+#   pyr.query(start_ns, end_ns, points=1500)  # -> {"series": {ts, ts_end, pnl_net_min, ...}, level, ...}
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+STATS = ("min", "max", "last")
+
+
+def _pairwise(a: np.ndarray, how: str) -> np.ndarray:
+    """Reduce adjacent pairs (an odd tail stays a bucket of its own)."""
+    m = len(a)
+    head, tail = a[0:m - 1:2], a[1:m:2]
+    if how == "min":
+        out = np.fmin(head, tail)          # fmin/fmax: NaN only if both rows are NaN
+    elif how == "max":
+        out = np.fmax(head, tail)
+    else:
+        out = np.ascontiguousarray(tail)
+    return np.concatenate([out, a[-1:]]) if m % 2 else out
+
+
+class SeriesPyramid:
+    """min/max/last per 2^k-row bucket for several series sharing one sorted int64 x axis."""
+
+    def __init__(self, x, series: Dict[str, Optional[np.ndarray]], min_buckets: int = 1):
+        self.x = np.ascontiguousarray(x, dtype=np.int64)
+        n = len(self.x)
+        self.names: List[str] = [k for k, v in series.items() if v is not None and len(v) == n]
+        raw = {k: np.ascontiguousarray(series[k], dtype=np.float64) for k in self.names}
+        # levels[k][name] = (min, max, last), each of length ceil(n / 2^k)
+        self.levels: List[Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]]] = [
+            {k: (v, v, v) for k, v in raw.items()}
+        ]
+        size = n
+        while size > max(int(min_buckets), 1):
+            prev = self.levels[-1]
+            self.levels.append({k: tuple(_pairwise(a, s) for a, s in zip(prev[k], STATS)) for k in self.names})
+            size = (size + 1) // 2
+
+    @property
+    def n(self) -> int:
+        return len(self.x)
+
+    @property
+    def nbytes(self) -> int:
+        raw = sum(t[0].nbytes for t in self.levels[0].values())      # level 0 shares one array per series
+        upper = sum(a.nbytes for lvl in self.levels[1:] for t in lvl.values() for a in t)
+        return int(self.x.nbytes + raw + upper)
+
+    def level_for(self, rows: int, points: int) -> int:
+        """Finest level whose buckets over `rows` rows number at most `points`."""
+        if points <= 0 or rows <= points:
+            return 0
+        k = int(np.ceil(np.log2(rows / points)))
+        return min(max(k, 0), len(self.levels) - 1)
+
+    def query(self, x0=None, x1=None, points: int = 1000) -> Dict[str, Any]:
+        """
+        Buckets covering x0 <= x <= x1 at the level that gives <= points buckets. Buckets are
+        aligned to absolute row blocks, so the first/last one may reach slightly outside the
+        window. series: ts (first x of bucket), ts_end (last x), <name>_min/_max/_last.
+        """
+        i0 = int(np.searchsorted(self.x, x0, "left")) if x0 is not None else 0
+        i1 = int(np.searchsorted(self.x, x1, "right")) if x1 is not None else self.n
+        rows = max(i1 - i0, 0)
+        k = self.level_for(rows, points)
+        step = 1 << k
+        b0, b1 = i0 >> k, ((i1 - 1) >> k) + 1 if rows else i0 >> k
+        first = np.arange(b0, b1, dtype=np.int64) * step
+        out = {"ts": self.x[first], "ts_end": self.x[np.minimum(first + step, self.n) - 1]}
+        lvl = self.levels[k]
+        for name in self.names:
+            for s, a in zip(STATS, lvl[name]):
+                out[f"{name}_{s}"] = a[b0:b1]
+        return {"series": out, "level": k, "bucket_rows": step, "rows": self.n,
+                "in_range": rows, "returned": int(b1 - b0), "offset": i0}
@@ -0,0 +1,283 @@
+# experiments/review.py
+# Post-trade review pipeline behind dashboard.py, usable without Streamlit:
+#   signals / fills / quotes -> reference price per bucket -> position, cash, equity timeline
+#   -> slippage per fill -> summary metrics.
+# Everything is vectorized on int64 ns bucket keys: the VWAP reference is sum(price*qty) /
+# sum(qty) per bucket, timeline and reference are aligned by a sorted-key union + reindex,
+# and fills are matched to the prevailing bid/ask with merge_asof. review() is memoized on
+# (path, size, mtime) of every input + bucket, so a dashboard rerun with the same files and
+# bucket is a dictionary lookup.
+#   python -m experiments.review --trades data/trades_executed.csv --quotes data/orderbook_top_ticks.csv --bucket 10ms
+import argparse
+import json
+import math
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from experiments.downsample import downsample_indices
+
+BUCKETS = ["10ms", "100ms", "1s", "1min"]
+BUCKET_SECONDS = {"10ms": 0.01, "100ms": 0.1, "1s": 1.0, "1min": 60.0}
+SECONDS_PER_YEAR = 31_536_000
+SIGNAL_MAP = {0: "BUY", 1: "SELL", 2: "HOLD"}
+HIT_EPS = 1e-9           # a step counts as a hit above this (flat buckets carry cumsum rounding noise)
+
+
+# ---------------------------------------------------------------- loading
+def _to_datetime(s: pd.Series) -> pd.Series:
+    """ns integers or time strings -> datetime64[ns] (unparseable -> NaT)."""
+    if pd.api.types.is_numeric_dtype(s):
+        return pd.to_datetime(s, unit="ns", errors="coerce")
+    return pd.to_datetime(s, errors="coerce")
+
+
+def load_signals(path: str) -> pd.DataFrame:
+    """timestamp,price,signal(0/1/2) -> sorted, de-duplicated, with signal_txt."""
+    if not path or not os.path.exists(path):
+        return pd.DataFrame(columns=["timestamp", "price", "signal", "signal_txt"])
+    return normalize_signals(pd.read_csv(path))
+
+
+def normalize_signals(df: pd.DataFrame) -> pd.DataFrame:
+    df["timestamp"] = _to_datetime(df["timestamp"])
+    df = df[df["timestamp"].notna()].sort_values("timestamp", kind="stable")
+    if "signal" in df.columns:
+        df["signal_txt"] = df["signal"].map(SIGNAL_MAP).fillna(df["signal"].astype(str))
+    else:
+        df["signal_txt"] = "NA"
+    return df.drop_duplicates(subset=["timestamp"]).reset_index(drop=True)
+
+
+def load_trades(path: str) -> pd.DataFrame:
+    """ts_ns,side,price,qty[,buy_id,sell_id] -> sorted fills with upper-case side."""
+    if not path or not os.path.exists(path):
+        return pd.DataFrame(columns=["ts_ns", "side", "price", "qty", "buy_id", "sell_id"])
+    return normalize_trades(pd.read_csv(path))
+
+
+def normalize_trades(df: pd.DataFrame) -> pd.DataFrame:
+    df["ts_ns"] = _to_datetime(df["ts_ns"])
+    df = df[df["ts_ns"].notna()].sort_values("ts_ns", kind="stable")
+    df["side"] = df["side"].astype(str).str.upper().str.strip() if "side" in df.columns else "UNKNOWN"
+    for c in ("price", "qty"):
+        if c in df.columns:
+            df[c] = pd.to_numeric(df[c], errors="coerce")
+    return df.dropna(subset=["price", "qty"]).reset_index(drop=True)
+
+
+def load_quotes(path: Optional[str]) -> pd.DataFrame:
+    """Top of book (ts, bid, ask, mid) from a tick CSV / store / dataset spec; empty if absent."""
+    from experiments.dataset import data_exists
+    from experiments.tickstore import align_top_of_book, load_ticks
+    if not data_exists(path):
+        return pd.DataFrame(columns=["ts", "bid", "ask", "mid"])
+    top = align_top_of_book(load_ticks(path))
+    q = pd.DataFrame({"ts": pd.to_datetime(top["ts_ns"].to_numpy(dtype=np.int64), unit="ns"),
+                      "bid": top["bid"].to_numpy(dtype=float), "ask": top["ask"].to_numpy(dtype=float)})
+    q["mid"] = (q["bid"] + q["ask"]) / 2.0
+    return q.dropna(subset=["ts"]).sort_values("ts", kind="stable").reset_index(drop=True)
+
+
+# ---------------------------------------------------------------- pipeline
+def auto_bucket(seconds: float) -> str:
+    """Aggregation step for a data span."""
+    if seconds <= 2.0:
+        return "10ms"
+    if seconds <= 60.0:
+        return "100ms"
+    if seconds <= 3600.0:
+        return "1s"
+    return "1min"
+
+
+def _bucket_keys(ts: pd.Series, bucket: str) -> np.ndarray:
+    """datetime64 -> int64 ns of the bucket start (same as dt.floor for positive epochs)."""
+    step = pd.Timedelta(bucket).value
+    ns = ts.to_numpy(dtype="datetime64[ns]").astype(np.int64)
+    return ns - ns % step
+
+
+def vwap_reference(trades: pd.DataFrame, bucket: str) -> pd.DataFrame:
+    """(ts, mid) per non-empty bucket: sum(price*qty)/sum(qty), plain mean price where qty sums to 0."""
+    if trades.empty:
+        return pd.DataFrame(columns=["ts", "mid"])
+    key = _bucket_keys(trades["ts_ns"], bucket)
+    price = trades["price"].to_numpy(dtype=float)
+    qty = trades["qty"].to_numpy(dtype=float)
+    g = pd.DataFrame({"key": key, "pq": price * qty, "qty": qty, "price": price}).groupby("key", sort=True)
+    s = g.sum()
+    n = g.size()
+    mid = np.where(s["qty"] > 0, s["pq"] / s["qty"].where(s["qty"] > 0, 1.0), s["price"] / n)
+    return pd.DataFrame({"ts": pd.to_datetime(s.index.to_numpy(), unit="ns"), "mid": mid}).dropna()
+
+
+def signal_reference(signals: pd.DataFrame, bucket: str) -> pd.DataFrame:
+    """(ts, mid) on every bucket of the signal span: last signal price, forward-filled."""
+    ref = signals[["timestamp", "price"]].rename(columns={"timestamp": "ts", "price": "mid"})
+    ref = ref.set_index("ts").sort_index().resample(bucket).last().ffill()
+    return ref.reset_index().dropna(subset=["ts", "mid"])
+
+
+def signed_fills(trades: pd.DataFrame, bucket: str) -> pd.DataFrame:
+    """Fills + bucket key, signed_qty (BUY +, SELL -, other 0) and cash_flow."""
+    trd = trades.copy()
+    trd["bucket_ts"] = pd.to_datetime(_bucket_keys(trd["ts_ns"], bucket), unit="ns")
+    side = trd["side"].to_numpy()
+    sign = np.where(side == "BUY", 1.0, np.where(side == "SELL", -1.0, 0.0))
+    trd["signed_qty"] = sign * trd["qty"].to_numpy(dtype=float)
+    trd["cash_flow"] = -trd["price"] * trd["signed_qty"]      # buys pay cash, sells receive
+    return trd
+
+
+def build_timeline(ref: pd.DataFrame, trd: pd.DataFrame) -> pd.DataFrame:
+    """
+    One row per bucket present in either the reference or the fills: volume / net qty / cash
+    per bucket, then position, cash, equity = cash + position * mid, per-bucket and cumulative PnL.
+    mid is forward-filled onto fill-only buckets.
+    """
+    key = trd["bucket_ts"].to_numpy(dtype="datetime64[ns]").astype(np.int64)
+    if len(key):
+        g = pd.DataFrame({"key": key, "net_qty": trd["signed_qty"].to_numpy(), "cash_delta": trd["cash_flow"].to_numpy(),
+                          "vol": trd["qty"].to_numpy(dtype=float), "avg_price": trd["price"].to_numpy(dtype=float)})
+        agg = g.groupby("key", sort=True).agg(net_qty=("net_qty", "sum"), cash_delta=("cash_delta", "sum"),
+                                               vol=("vol", "sum"), avg_price=("avg_price", "mean"))
+    else:
+        agg = pd.DataFrame(columns=["net_qty", "cash_delta", "vol", "avg_price"], dtype=float)
+    ref_key = ref["ts"].to_numpy(dtype="datetime64[ns]").astype(np.int64)
+    keys = np.union1d(ref_key, agg.index.to_numpy(dtype=np.int64))
+    tl = agg.reindex(keys).fillna(0.0)
+    tl.insert(0, "mid", pd.Series(ref["mid"].to_numpy(dtype=float), index=ref_key).reindex(keys).ffill().to_numpy())
+    tl.insert(0, "ts", pd.to_datetime(keys, unit="ns"))
+    tl = tl.reset_index(drop=True)
+    tl["position"] = tl["net_qty"].cumsum()
+    tl["cash"] = tl["cash_delta"].cumsum()
+    tl["equity"] = tl["cash"] + tl["position"] * tl["mid"]
+    tl["pnl_step"] = tl["equity"].diff().fillna(0.0)
+    tl["cum_pnl"] = tl["equity"] - (tl["equity"].iloc[0] if len(tl) else 0.0)
+    return tl
+
+
+def fill_slippage(trd: pd.DataFrame, quotes: pd.DataFrame, ref: pd.DataFrame) -> pd.DataFrame:
+    """
+    Per-fill slippage, positive = worse than reference, matched to the last quote at or before
+    the fill (merge_asof): slippage = (price - mid) * side, slippage_touch = price - ask (BUY)
+    or bid - price (SELL). Without quotes the bucket reference price stands in for mid.
+    Fills with unknown side get NaN.
+    """
+    cols = ["ts_ns", "side", "price", "qty", "signed_qty"]
+    fills = trd[cols].sort_values("ts_ns", kind="stable")
+    sign = np.sign(fills["signed_qty"].to_numpy()).astype(float)
+    sign[sign == 0] = np.nan
+    if not quotes.empty:
+        q = quotes.rename(columns={"ts": "ts_ns"})
+        m = pd.merge_asof(fills, q, on="ts_ns", direction="backward")
+        m["slippage_touch"] = np.where(sign > 0, m["price"] - m["ask"], m["bid"] - m["price"]) * np.abs(sign)
+    else:
+        m = pd.merge_asof(fills, ref.rename(columns={"ts": "ts_ns"})[["ts_ns", "mid"]], on="ts_ns", direction="backward")
+        m["slippage_touch"] = np.nan
+    m["side_sign"] = sign
+    m["slippage"] = (m["price"] - m["mid"]) * sign
+    return m
+
+
+def max_drawdown(series: pd.Series) -> float:
+    if series.empty:
+        return 0.0
+    return float((series - series.cummax()).min())
+
+
+def sharpe_from_steps(steps: pd.Series, seconds_per_bucket: float) -> float:
+    """mean/std of per-bucket PnL, annualised by the number of buckets per year."""
+    sd = steps.std(ddof=1)
+    if not sd or not np.isfinite(sd):
+        return 0.0
+    ann = math.sqrt(SECONDS_PER_YEAR / seconds_per_bucket) if seconds_per_bucket > 0 else 0.0
+    return float(steps.mean() / sd * ann)
+
+
+def summarize(tl: pd.DataFrame, trd: pd.DataFrame, slip: pd.DataFrame, bucket: str) -> Dict[str, float]:
+    s = slip["slippage"].dropna()
+    t = slip["slippage_touch"].dropna()
+    return {
+        "final_pnl": float(tl["cum_pnl"].iloc[-1]) if len(tl) else 0.0,
+        "max_drawdown": max_drawdown(tl["cum_pnl"]),
+        "sharpe": sharpe_from_steps(tl["pnl_step"], BUCKET_SECONDS.get(bucket, pd.Timedelta(bucket).total_seconds())),
+        "turnover": float(trd["qty"].sum() / (tl["position"].abs().mean() + 1e-9)) if len(tl) else 0.0,
+        "hit_rate": float((tl["pnl_step"] > HIT_EPS).mean()) if len(tl) else 0.0,
+        "avg_slippage": float(s.mean()) if len(s) else 0.0,
+        "median_slippage": float(s.median()) if len(s) else 0.0,
+        "avg_slippage_touch": float(t.mean()) if len(t) else float("nan"),
+        "fills": int(len(trd)),
+        "buckets": int(len(tl)),
+    }
+
+
+# ---------------------------------------------------------------- memoized entry point
+def _stamp(path: Optional[str]):
+    from experiments.dataset import data_exists, source_stamp
+    return source_stamp(path) if data_exists(path) else (path, None)
+
+
+_MEMO: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+MEMO_SIZE = 8
+
+
+def review(trade_file: str, signal_file: Optional[str] = None, quote_file: Optional[str] = None,
+           bucket: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Full review: {trades, signals, ref, timeline, slippage, metrics, bucket, span_sec}.
+    bucket=None picks auto_bucket(span). Results are kept for the last MEMO_SIZE
+    (file stamps, bucket) combinations; treat the returned frames as read-only.
+    """
+    key = (_stamp(trade_file), _stamp(signal_file), _stamp(quote_file), bucket)
+    hit = _MEMO.get(key)
+    if hit is not None:
+        _MEMO.move_to_end(key)
+        return hit
+
+    trades = load_trades(trade_file)
+    signals = load_signals(signal_file)
+    quotes = load_quotes(quote_file)
+    t0, t1 = (trades["ts_ns"].min(), trades["ts_ns"].max()) if len(trades) else (pd.NaT, pd.NaT)
+    span = (t1 - t0).total_seconds() if pd.notna(t0) and pd.notna(t1) else 0.0
+    bk = bucket or auto_bucket(span)
+
+    ref = vwap_reference(trades, bk) if signals.empty else signal_reference(signals, bk)
+    trd = signed_fills(trades, bk)
+    tl = build_timeline(ref, trd)
+    slip = fill_slippage(trd, quotes, ref)
+    out = {"trades": trades, "signals": signals, "ref": ref, "timeline": tl, "slippage": slip,
+           "metrics": summarize(tl, trd, slip, bk), "bucket": bk, "span_sec": span,
+           "has_quotes": not quotes.empty}
+    _MEMO[key] = out
+    _MEMO[key[:3] + (bk,)] = out          # an auto-bucket call also answers the explicit bucket
+    while len(_MEMO) > MEMO_SIZE:
+        _MEMO.popitem(last=False)
+    return out
+
+
+def chart_frame(df: pd.DataFrame, keys: Sequence[str], points: int = 2000) -> pd.DataFrame:
+    """Rows of df kept by a min/max envelope of `keys` (experiments/downsample.py) for plotting."""
+    if len(df) <= points:
+        return df
+    idx = downsample_indices(np.arange(len(df)), {k: df[k].to_numpy(dtype=float) for k in keys}, points)
+    return df.iloc[idx]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Post-trade review metrics (same pipeline as dashboard.py)")
+    ap.add_argument("--trades", default="data/trades_executed.csv")
+    ap.add_argument("--signals", default="data/signals_buy.csv")
+    ap.add_argument("--quotes", default="", help="tick CSV / store / dataset spec for bid/ask slippage")
+    ap.add_argument("--bucket", default="", help=f"{'|'.join(BUCKETS)}; empty = auto from the data span")
+    args = ap.parse_args()
+    res = review(args.trades, args.signals, args.quotes or None, args.bucket or None)
+    print(json.dumps({"bucket": res["bucket"], "span_sec": res["span_sec"], **res["metrics"]}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+# experiments/shared.py
+# Hand large arrays to pool workers through memory-mapped .npy files:
+# the parent writes each array once, workers map it read-only and slice views.
+import os
+import shutil
+import tempfile
+from typing import Dict, Optional
+
+import numpy as np
+
+
+class SharedArrays:
+    """Write arrays to a scratch dir; `specs` (name -> path) is what gets pickled to workers."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray], root: Optional[str] = None):
+        self.dir = tempfile.mkdtemp(prefix="hft-shm-", dir=root)
+        self.specs: Dict[str, str] = {}
+        for name, arr in arrays.items():
+            path = os.path.join(self.dir, f"{name}.npy")
+            np.save(path, np.ascontiguousarray(arr))
+            self.specs[name] = path
+
+    def close(self) -> None:
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_shared(specs: Dict[str, str]) -> Dict[str, np.ndarray]:
+    """Worker side: map every array read-only (no copy until a slice is written to)."""
+    return {name: np.load(path, mmap_mode="r") for name, path in specs.items()}
@@ -0,0 +1,206 @@
+# experiments/sweep.py
+# Hyper-parameter / factor-subset sweep: build the full factor matrix and the
+# forward returns for every horizon once (both disk-cached), share them with pool workers through
+# memory maps, train every (subset, model, horizon, eps) combination across all
+# cores, and write a single leaderboard.
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from experiments.pipeline import (
+    _build_features, _evaluate, _instantiate_model, _make_labels, cached_forward_returns
+)
+from experiments.shared import SharedArrays, open_shared
+from experiments.tickstore import load_ticks
+from experiments.train import resolve_factors
+
+_SHARED: Dict[str, np.ndarray] = {}
+
+
+def factor_subsets(names: List[str], spec: str) -> List[List[str]]:
+    """
+    spec: "all" (every non-empty subset) | "singles" | "k=2" (all size-2 subsets)
+          | explicit "a,b;c" (subsets separated by ';').
+    """
+    spec = spec.strip()
+    if spec == "all":
+        return [list(c) for k in range(1, len(names) + 1) for c in itertools.combinations(names, k)]
+    if spec == "singles":
+        return [[n] for n in names]
+    if spec.startswith("k="):
+        return [list(c) for c in itertools.combinations(names, int(spec[2:]))]
+    return [[s.strip() for s in part.split(",") if s.strip()] for part in spec.split(";") if part.strip()]
+
+
+def _init_worker(specs: Dict[str, str]) -> None:
+    global _SHARED
+    _SHARED = open_shared(specs)
+
+
+def _run_combo(c: Dict[str, Any]) -> Dict[str, Any]:
+    t0 = time.time()
+    X, R = _SHARED["X"], _SHARED["R"]
+    y = _make_labels(R[:, [c["h_idx"]]], [c["eps"]], c["drop_equal"])[:, 0, 0]
+    rows = np.flatnonzero(~np.isnan(y))
+    tr, te = train_test_split(rows, shuffle=False, test_size=c["test_size"])
+    X_train, X_test = X[tr][:, c["cols"]], X[te][:, c["cols"]]
+    y_train, y_test = y[tr].astype(int), y[te].astype(int)
+
+    out = {k: c[k] for k in ("factors", "model", "horizon", "eps")}
+    try:
+        if c["scale"]:
+            scaler = StandardScaler()
+            X_train = scaler.fit_transform(X_train)
+            X_test = scaler.transform(X_test)
+        X_train = pd.DataFrame(X_train, columns=c["factors"])
+        X_test = pd.DataFrame(X_test, columns=c["factors"])
+        task, clf = _instantiate_model(c["model"])
+        clf.fit(X_train, y_train)
+        metrics, _roc, _pred, _prob = _evaluate(task, clf, X_test, y_test)
+        out["metrics"] = {k: float(v) for k, v in metrics.items()}
+        out["error"] = None
+    except Exception as e:
+        out["metrics"] = {}
+        out["error"] = str(e) or e.__class__.__name__
+    out["n_train"], out["n_test"] = int(len(tr)), int(len(te))
+    out["seconds"] = time.time() - t0
+    return out
+
+
+def run_sweep(
+    df_ticks: pd.DataFrame,
+    factor_names: List[str],
+    subsets: str = "singles",
+    models: Optional[List[str]] = None,
+    horizons: Optional[List[int]] = None,
+    eps_list: Optional[List[float]] = None,
+    search: str = "grid",
+    n_iter: int = 50,
+    seed: int = 0,
+    drop_equal: bool = False,
+    test_size: float = 1.0 / 6.0,
+    scale: bool = False,
+    n_jobs: Optional[int] = None,
+    data_path: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Returns {"leaderboard": [...sorted best first], "build_seconds", "train_seconds", "n_combos"}."""
+    models = models or ["logit"]
+    horizons = horizons or [5]
+    eps_list = eps_list or [0.0]
+
+    t0 = time.time()
+    mid, X = _build_features(df_ticks, factor_names, data_path)
+    R = cached_forward_returns(data_path, horizons, lambda: mid)
+    build_seconds = time.time() - t0
+
+    col_idx = {n: i for i, n in enumerate(X.columns)}
+    grid = []
+    seen = set()
+    for subset, model, (h_idx, h), eps in itertools.product(
+            factor_subsets(factor_names, subsets), models, enumerate(horizons), eps_list):
+        kept = [f for f in subset if f in col_idx]  # constant factors were dropped
+        key = (tuple(kept), model, h, float(eps))
+        if not kept or key in seen:
+            continue
+        seen.add(key)
+        grid.append({
+            "factors": kept, "cols": [col_idx[f] for f in kept],
+            "model": model, "horizon": h, "h_idx": h_idx, "eps": float(eps),
+            "drop_equal": drop_equal, "test_size": test_size, "scale": scale,
+        })
+    if search == "random" and n_iter < len(grid):
+        rng = np.random.default_rng(seed)
+        grid = [grid[i] for i in sorted(rng.choice(len(grid), size=n_iter, replace=False))]
+
+    t1 = time.time()
+    with SharedArrays({"X": X.to_numpy(), "R": R}) as shm:
+        n_jobs = n_jobs or (os.cpu_count() or 1)
+        if n_jobs <= 1:
+            _init_worker(shm.specs)
+            rows = [_run_combo(c) for c in grid]
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(shm.specs,)) as pool:
+                rows = list(pool.map(_run_combo, grid, chunksize=max(1, len(grid) // (4 * n_jobs))))
+    train_seconds = time.time() - t1
+
+    def score(r):
+        m = r["metrics"]
+        v = m.get("auc", m.get("r2", -np.inf))
+        # NaN (e.g. single-class test split) would make the sort order undefined: rank it last
+        return v if v is not None and np.isfinite(v) else -np.inf
+    rows.sort(key=score, reverse=True)
+    for rank, r in enumerate(rows, 1):
+        r["rank"] = rank
+    return {"leaderboard": rows, "n_combos": len(rows),
+            "build_seconds": build_seconds, "train_seconds": train_seconds}
+
+
+def save_leaderboard(out_dir: str, res: Dict[str, Any], extra_meta: Optional[Dict[str, Any]] = None) -> None:
+    """leaderboard.json（完整）+ leaderboard.csv（扁平，方便排序筛选）。"""
+    os.makedirs(out_dir, exist_ok=True)
+    meta = dict(res)
+    if extra_meta:
+        meta.update(extra_meta)
+    with open(os.path.join(out_dir, "leaderboard.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    flat = [{
+        "rank": r["rank"], "factors": ",".join(r["factors"]), "model": r["model"],
+        "horizon": r["horizon"], "eps": r["eps"], **r["metrics"],
+        "n_train": r["n_train"], "n_test": r["n_test"], "seconds": r["seconds"], "error": r["error"],
+    } for r in res["leaderboard"]]
+    pd.DataFrame(flat).to_csv(os.path.join(out_dir, "leaderboard.csv"), index=False)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--data", default="data/orderbook_top_ticks.csv")
+    ap.add_argument("--factors", default="", help="候选因子（逗号分隔）；留空则读 YAML")
+    ap.add_argument("--factors_cfg", default="configs/factors.yaml")
+    ap.add_argument("--subsets", default="singles", help='all | singles | k=2 | "a,b;c"')
+    ap.add_argument("--models", default="logit", help="逗号分隔，MODEL_REGISTRY 中的名字")
+    ap.add_argument("--horizons", default="5", help="逗号分隔")
+    ap.add_argument("--eps", default="0.0", help="逗号分隔")
+    ap.add_argument("--search", default="grid", choices=["grid", "random"])
+    ap.add_argument("--n_iter", type=int, default=50, help="random 搜索的组合数")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--drop_equal", action="store_true")
+    ap.add_argument("--scale", action="store_true")
+    ap.add_argument("--test_size", type=float, default=1.0/6.0)
+    ap.add_argument("--n_jobs", type=int, default=0, help="0 = 全部 CPU")
+    ap.add_argument("--outdir", default="artifacts/sweep")
+    args = ap.parse_args()
+
+    factor_names = resolve_factors(args.factors, args.factors_cfg)
+    res = run_sweep(
+        df_ticks=load_ticks(args.data),
+        factor_names=factor_names,
+        subsets=args.subsets,
+        models=[s.strip() for s in args.models.split(",") if s.strip()],
+        horizons=[int(s) for s in args.horizons.split(",") if s.strip()],
+        eps_list=[float(s) for s in args.eps.split(",") if s.strip()],
+        search=args.search,
+        n_iter=args.n_iter,
+        seed=args.seed,
+        drop_equal=args.drop_equal,
+        test_size=args.test_size,
+        scale=args.scale,
+        n_jobs=args.n_jobs or None,
+        data_path=args.data,
+    )
+    save_leaderboard(args.outdir, res, extra_meta={"data": args.data, "subsets": args.subsets})
+    top = res["leaderboard"][:10]
+    print(json.dumps({"n_combos": res["n_combos"], "build_seconds": res["build_seconds"],
+                      "train_seconds": res["train_seconds"], "top": top}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+# experiments/thresholds.py
+# Threshold sweep engine: sort y_prob once, then every threshold (or long/short
+# pair) is answered from cumulative sums + searchsorted instead of a new backtest.
+#   long  if p > t_long
+#   short if p < t_short      (t_short <= t_long; else flat)
+# PnL / exposure / cost-weighted turnover / F1 are exact O(log n) lookups;
+# drawdown is path-dependent and is evaluated on a (chunked) grid of paths.
+# Semantics match experiments/bt_kernel.backtest_kernel in "target" mode.
+import os
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+
+def sweep_file(horizon: int, latency_ticks: int = 0, rescore: bool = False) -> str:
+    """File name of the sweep run_backtest writes into the artifacts dir."""
+    return f"threshold_sweep_h{int(horizon)}_l{int(latency_ticks)}{'_rescore' if rescore else ''}.npz"
+
+
+class _SortedSum:
+    """Sorted keys + prefix sums of one or more weight columns: sum of w where key <= t / key < t."""
+
+    def __init__(self, keys: np.ndarray, weights: np.ndarray):
+        order = np.argsort(keys, kind="mergesort")
+        self.keys = keys[order]
+        w = weights[order]
+        if w.ndim == 1:
+            w = w[:, None]
+        self.csum = np.vstack([np.zeros((1, w.shape[1])), np.cumsum(w, axis=0)])
+
+    def below(self, t: np.ndarray, inclusive: bool) -> np.ndarray:
+        k = np.searchsorted(self.keys, t, side=("right" if inclusive else "left"))
+        return self.csum[k]
+
+    def total(self) -> np.ndarray:
+        return self.csum[-1]
+
+
+class ThresholdSweep:
+    """
+    y_prob: model scores on the test set; ret: step return for holding one unit
+    (same array run_backtest uses); rate: per-step cost rate (fees + slippage
+    [+ half spread]) charged on |Δposition|; latency_ticks delays signals like
+    CostModel.latency_ticks. Classification metrics use the undelayed long signal.
+    """
+
+    def __init__(self, y_prob, ret, y_true=None, rate=None, latency_ticks: int = 0):
+        p = np.asarray(y_prob, dtype=float)
+        n = len(p)
+        L = max(int(latency_ticks), 0)
+        ret = np.nan_to_num(np.asarray(ret, dtype=float))
+        rate = np.zeros(n) if rate is None else np.nan_to_num(np.asarray(rate, dtype=float))
+        self.y_prob, self.ret, self.rate, self.latency_ticks, self.n = p, ret, rate, L, n
+        self.y_true = None if y_true is None else np.asarray(y_true, dtype=float)
+        self.ts: Optional[np.ndarray] = None     # set by load() when the sweep file carries it
+
+        # signal j is held at step j+L: shift ret/rate into signal-index space
+        live = np.zeros(n)
+        live[: max(n - L, 0)] = 1.0
+        ret_eff = np.zeros(n)
+        rate_eff = np.zeros(n)
+        if n > L:
+            ret_eff[: n - L] = ret[L:]
+            rate_eff[: n - L] = rate[L:]
+        self.ret_eff, self.rate_eff, self.live = ret_eff, rate_eff, live
+
+        y = np.zeros(n) if self.y_true is None else self.y_true
+        # columns: ret_eff, live, y
+        self._by_p = _SortedSum(p, np.column_stack([ret_eff, live, y]))
+        # position flips between signal j-1 and j happen when the threshold lies between p[j-1] and p[j]
+        if n > 1:
+            lo = np.minimum(p[:-1], p[1:])
+            hi = np.maximum(p[:-1], p[1:])
+            w = np.column_stack([live[1:], rate_eff[1:]])
+        else:
+            lo = hi = np.zeros(0)
+            w = np.zeros((0, 2))
+        self._lo = _SortedSum(lo, w)
+        self._hi = _SortedSum(hi, w)
+
+    # ---------- per-leg building blocks (vectorized over thresholds) ----------
+    def _long_leg(self, t: np.ndarray) -> Dict[str, np.ndarray]:
+        tot = self._by_p.total()
+        le = self._by_p.below(t, inclusive=True)
+        above = tot - le                                     # p > t
+        # flips: lo <= t < hi  ->  #(lo <= t) - #(hi <= t)
+        flips = self._lo.below(t, True) - self._hi.below(t, True)
+        entry = (self.y_prob[0] > t) if self.n else np.zeros_like(t, dtype=bool)
+        return {
+            "ret": above[:, 0], "held": above[:, 1], "count": self.n - self._count_le(t),
+            "tp": above[:, 2],
+            "turnover": flips[:, 0] + entry * (self.live[0] if self.n else 0.0),
+            "cost": np.maximum(flips[:, 1] + entry * (self.rate_eff[0] if self.n else 0.0), 0.0),
+        }
+
+    def _short_leg(self, t: np.ndarray) -> Dict[str, np.ndarray]:
+        lt = self._by_p.below(t, inclusive=False)            # p < t
+        # flips: lo < t <= hi  ->  #(lo < t) - #(hi < t)
+        flips = self._lo.below(t, False) - self._hi.below(t, False)
+        entry = (self.y_prob[0] < t) if self.n else np.zeros_like(t, dtype=bool)
+        return {
+            "ret": -lt[:, 0], "held": lt[:, 1],
+            "turnover": flips[:, 0] + entry * (self.live[0] if self.n else 0.0),
+            "cost": np.maximum(flips[:, 1] + entry * (self.rate_eff[0] if self.n else 0.0), 0.0),
+        }
+
+    def _count_le(self, t: np.ndarray) -> np.ndarray:
+        return np.searchsorted(self._by_p.keys, t, side="right")
+
+    def _classification(self, t: np.ndarray, leg: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        if self.y_true is None:
+            nan = np.full(len(t), np.nan)
+            return {"precision": nan, "recall": nan, "f1": nan}
+        pos_total = float(self.y_true.sum())
+        tp = leg["tp"]
+        precision = tp / (leg["count"] + 1e-12)
+        recall = tp / (pos_total + 1e-12)
+        f1 = 2 * precision * recall / (precision + recall + 1e-12)
+        return {"precision": precision, "recall": recall, "f1": f1}
+
+    # ---------- public API ----------
+    def long_only(self, thresholds: Sequence[float], with_drawdown: bool = True) -> Dict[str, np.ndarray]:
+        """Metrics for the 0/1 strategy `p > t` at every t in thresholds (same semantics as run_backtest)."""
+        t = np.asarray(thresholds, dtype=float).ravel()
+        leg = self._long_leg(t)
+        out = {
+            "threshold": t,
+            "pnl": leg["ret"],
+            "cost": leg["cost"],
+            "pnl_net": leg["ret"] - leg["cost"],
+            "exposure": leg["held"] / max(self.n, 1),
+            "turnover": leg["turnover"],
+        }
+        out.update(self._classification(t, leg))
+        if with_drawdown:
+            out["max_drawdown"] = self.max_drawdown(t)
+        return out
+
+    def long_short(self, t_long: Sequence[float], t_short: Sequence[float],
+                   with_drawdown: bool = False) -> Dict[str, np.ndarray]:
+        """
+        Grid over (t_long[i], t_short[j]) -> 2-D arrays of shape (len(t_long), len(t_short)).
+        Legs are disjoint, so gross PnL, exposure and turnover add; pairs with t_short > t_long are NaN.
+        """
+        tl = np.asarray(t_long, dtype=float).ravel()
+        ts = np.asarray(t_short, dtype=float).ravel()
+        a, b = self._long_leg(tl), self._short_leg(ts)
+        valid = ts[None, :] <= tl[:, None]
+
+        def grid(x, y):
+            g = x[:, None] + y[None, :]
+            return np.where(valid, g, np.nan)
+
+        out = {
+            "t_long": tl,
+            "t_short": ts,
+            "pnl": grid(a["ret"], b["ret"]),
+            "cost": grid(a["cost"], b["cost"]),
+            "exposure": grid(a["held"], b["held"]) / max(self.n, 1),
+            "turnover": grid(a["turnover"], b["turnover"]),
+        }
+        out["pnl_net"] = out["pnl"] - out["cost"]
+        if with_drawdown:
+            TL, TS = np.meshgrid(tl, ts, indexing="ij")
+            dd = self.max_drawdown(TL.ravel(), TS.ravel()).reshape(TL.shape)
+            out["max_drawdown"] = np.where(valid, dd, np.nan)
+        return out
+
+    def positions(self, t_long: np.ndarray, t_short: Optional[np.ndarray] = None) -> np.ndarray:
+        """(k, n) target positions in signal-index space for k threshold (pairs)."""
+        p = self.y_prob[None, :]
+        pos = (p > np.asarray(t_long, dtype=float).reshape(-1, 1)).astype(float)
+        if t_short is not None:
+            pos -= (p < np.asarray(t_short, dtype=float).reshape(-1, 1))
+        return pos
+
+    def _net_steps(self, pos: np.ndarray) -> np.ndarray:
+        trade = np.abs(np.diff(pos, axis=1, prepend=0.0))
+        return pos * self.ret_eff - trade * self.rate_eff
+
+    def max_drawdown(self, t_long, t_short=None, budget: int = 1 << 22) -> np.ndarray:
+        """Max drawdown of the net path per threshold (pair); chunked so k*n stays under `budget`."""
+        tl = np.asarray(t_long, dtype=float).ravel()
+        ts = None if t_short is None else np.asarray(t_short, dtype=float).ravel()
+        out = np.zeros(len(tl))
+        if self.n == 0:
+            return out
+        step = max(1, budget // self.n)
+        for i in range(0, len(tl), step):
+            pos = self.positions(tl[i:i + step], None if ts is None else ts[i:i + step])
+            cum = np.cumsum(self._net_steps(pos), axis=1)
+            peak = np.maximum.accumulate(cum, axis=1)
+            if self.latency_ticks > 0:          # the delayed path starts with flat (0) steps
+                peak = np.maximum(peak, 0.0)
+            out[i:i + step] = (cum - peak).min(axis=1)
+        return out
+
+    def at(self, t_long: float, t_short: Optional[float] = None, with_path: bool = False) -> dict:
+        """Scalar metrics for one threshold (pair); with_path adds the cumulative gross/net PnL arrays."""
+        tl = np.array([float(t_long)])
+        if t_short is None:
+            row = {k: float(v[0]) for k, v in self.long_only(tl, with_drawdown=False).items()}
+            row.pop("threshold")
+        else:
+            g = self.long_short(tl, np.array([float(t_short)]))
+            row = {k: float(v[0, 0]) for k, v in g.items() if k not in ("t_long", "t_short")}
+        row.update({"t_long": float(t_long), "t_short": (None if t_short is None else float(t_short))})
+        row["max_drawdown"] = float(self.max_drawdown(tl, None if t_short is None else [t_short])[0])
+        if with_path:
+            pos = self.positions(tl, None if t_short is None else np.array([float(t_short)]))[0]
+            L = self.latency_ticks
+            gross = np.zeros(self.n)
+            net = np.zeros(self.n)
+            if self.n > L:       # back to time-index space (step j+L)
+                gross[L:] = (pos * self.ret_eff)[: self.n - L]
+                net[L:] = self._net_steps(pos[None, :])[0][: self.n - L]
+            row["series"] = {
+                "signals": pos,
+                "pnl": np.cumsum(gross),
+                "pnl_net": np.cumsum(net),
+            }
+        return row
+
+    def default_grid(self, points: int = 101) -> np.ndarray:
+        """Candidate thresholds at quantiles of y_prob (deduplicated)."""
+        if self.n == 0:
+            return np.array([0.5])
+        return np.unique(np.quantile(self.y_prob, np.linspace(0.0, 1.0, points)))
+
+    # ---------- persistence ----------
+    def save(self, path: str, ts=None, **meta) -> str:
+        """ts: optional int64 time axis of the test rows (kept for chart payloads)."""
+        np.savez(
+            path, y_prob=self.y_prob, ret=self.ret, rate=self.rate,
+            y_true=(self.y_true if self.y_true is not None else np.zeros(0)),
+            latency_ticks=self.latency_ticks,
+            ts=(np.asarray(ts, dtype=np.int64) if ts is not None else np.zeros(0, dtype=np.int64)),
+            **{f"meta_{k}": np.asarray(v) for k, v in meta.items()},
+        )
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "ThresholdSweep":
+        with np.load(path) as z:
+            y_true = z["y_true"]
+            sw = cls(z["y_prob"], z["ret"], y_true=(y_true if len(y_true) else None),
+                     rate=z["rate"], latency_ticks=int(z["latency_ticks"]))
+            sw.meta = {k[5:]: z[k].item() for k in z.files if k.startswith("meta_")}
+            ts = z["ts"] if "ts" in z.files else np.zeros(0)
+            sw.ts = ts if len(ts) == sw.n else None
+        return sw
+
+
+def load_sweep(artdir: str, horizon: int = 5, latency_ticks: int = 0, rescore: bool = False) -> ThresholdSweep:
+    """Load the sweep written by run_backtest; kept in the process artifact cache until the file changes."""
+    from experiments.artifacts import get_artifact_cache
+    name = sweep_file(horizon, latency_ticks, rescore)
+    path = os.path.join(artdir, name)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No {name} in {artdir}; run a backtest first")
+
+    def _nbytes(sw: ThresholdSweep) -> int:
+        return 17 * 8 * sw.n   # inputs + shifted copies + three sorted prefix-sum tables
+
+    return get_artifact_cache().get_or_load(artdir, "threshold_sweep", [name],
+                                            lambda: ThresholdSweep.load(path), nbytes=_nbytes)
+
+
+def to_jsonable(d: Dict[str, np.ndarray]) -> dict:
+    """ndarray -> (nested) lists with NaN -> None (JSON has no NaN)."""
+    out = {}
+    for k, v in d.items():
+        a = np.asarray(v, dtype=float)
+        out[k] = np.where(np.isfinite(a), a, None).tolist()
+    return out
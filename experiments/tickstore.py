@@ -0,0 +1,144 @@
+# experiments/tickstore.py
+# Binary columnar tick store: one-time ingest of the `ts_ns,side,price,qty` CSV
+# into aligned top-of-book columns (ts_ns, bid, ask, bid_qty, ask_qty, midprice),
+# saved as .npy files and loaded back memory-mapped.
+import argparse
+import json
+import os
+import shutil
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+STORE_SUFFIX = ".ticks"
+STORE_COLUMNS = ["ts_ns", "bid", "ask", "bid_qty", "ask_qty", "midprice"]
+
+
+def align_top_of_book(df: pd.DataFrame) -> pd.DataFrame:
+    """处理多种输入格式，对齐 BUY/SELL 行并构造 midprice（不加 close 列）。"""
+    if "midprice" in df.columns:
+        mid = df.copy()
+    elif {"bid", "ask"}.issubset(df.columns):
+        mid = df.copy()
+        mid["midprice"] = (df["bid"] + df["ask"]) / 2.0
+    elif {"side", "price"}.issubset(df.columns):
+        is_buy = (df["side"] == "BUY").to_numpy()
+        is_sell = (df["side"] == "SELL").to_numpy()
+        if is_buy.sum() != is_sell.sum():
+            raise ValueError("BUY/SELL 行数不匹配，无法对齐构造 midprice")
+        price = df["price"].to_numpy(dtype=float)
+        mid = pd.DataFrame({"ts_ns": df["ts_ns"].to_numpy()[is_buy]})
+        mid["bid"] = price[is_buy]
+        mid["ask"] = price[is_sell]
+        if "qty" in df.columns:
+            qty = df["qty"].to_numpy(dtype=float)
+            mid["bid_qty"] = qty[is_buy]
+            mid["ask_qty"] = qty[is_sell]
+        mid["midprice"] = (mid["bid"].to_numpy() + mid["ask"].to_numpy()) / 2.0
+    elif "price" in df.columns:
+        mid = df.rename(columns={"price": "midprice"}).copy()
+    else:
+        raise ValueError("无法从输入构造 midprice（缺少 bid/ask 或 side/price）")
+
+    if "ts_ns" not in mid.columns and "timestamp" in mid.columns:
+        mid = mid.rename(columns={"timestamp": "ts_ns"})
+    return mid
+
+
+def default_store_path(csv_path: str) -> str:
+    """data/orderbook_top_ticks.csv -> data/orderbook_top_ticks.ticks"""
+    return os.path.splitext(csv_path)[0] + STORE_SUFFIX
+
+
+def _source_stamp(path: str) -> dict:
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def is_store(path: str) -> bool:
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, "meta.json"))
+
+
+def write_store(mid: pd.DataFrame, out_dir: str, source: Optional[str] = None) -> str:
+    """Write numeric columns of an aligned frame as .npy files (atomic directory swap)."""
+    cols = [c for c in STORE_COLUMNS if c in mid.columns]
+    cols += [c for c in mid.columns if c not in cols and pd.api.types.is_numeric_dtype(mid[c])]
+    tmp = f"{out_dir}.tmp-{os.getpid()}"
+    os.makedirs(tmp, exist_ok=True)
+    for c in cols:
+        np.save(os.path.join(tmp, f"{c}.npy"), np.ascontiguousarray(mid[c].to_numpy()))
+    meta = {"n_rows": int(len(mid)), "columns": cols}
+    if "ts_ns" in cols and len(mid):
+        # used by experiments/dataset.py to prune partitions / binary-search rows on ts_ns
+        ts = mid["ts_ns"].to_numpy()
+        meta.update(ts_min=int(ts.min()), ts_max=int(ts.max()), ts_sorted=bool((np.diff(ts) >= 0).all()))
+    if source:
+        meta["source"] = os.path.abspath(source)
+        meta["source_stamp"] = _source_stamp(source)
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    if os.path.exists(out_dir):
+        shutil.rmtree(out_dir)
+    os.replace(tmp, out_dir)
+    return out_dir
+
+
+def ingest_ticks(csv_path: str, out_dir: Optional[str] = None) -> str:
+    """Parse the tick CSV once and write the aligned columnar store; returns its path."""
+    out_dir = out_dir or default_store_path(csv_path)
+    df = pd.read_csv(csv_path)
+    return write_store(align_top_of_book(df), out_dir, source=csv_path)
+
+
+def _is_fresh(store_dir: str, csv_path: str) -> bool:
+    try:
+        with open(os.path.join(store_dir, "meta.json")) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return meta.get("source_stamp") == _source_stamp(csv_path)
+
+
+def read_store(store_dir: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Load a store directory; arrays are memory-mapped, so unused columns cost nothing."""
+    with open(os.path.join(store_dir, "meta.json")) as f:
+        meta = json.load(f)
+    cols = [c for c in meta["columns"] if columns is None or c in columns]
+    return pd.DataFrame({c: np.load(os.path.join(store_dir, f"{c}.npy"), mmap_mode="r") for c in cols})
+
+
+def load_ticks(path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Single loader for every entry point. Accepts either a store directory or
+    the raw CSV; a CSV is ingested on first use (and again whenever it changes)
+    into the sibling `<name>.ticks/` store, which is read from then on. A partitioned
+    dataset spec (`root?instrument=..&start=..&end=..`, experiments/dataset.py) loads the
+    selected partitions of one instrument.
+    """
+    from experiments.dataset import is_dataset_spec, load_dataset
+    if is_dataset_spec(path):
+        return load_dataset(path, columns, single_instrument=True)
+    if is_store(path):
+        return read_store(path, columns)
+    store = default_store_path(path)
+    if not _is_fresh(store, path):
+        try:
+            ingest_ticks(path, store)
+        except OSError:
+            # read-only data dir: fall back to parsing the CSV every time
+            return align_top_of_book(pd.read_csv(path))
+    return read_store(store, columns)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--csv", default="data/orderbook_top_ticks.csv")
+    ap.add_argument("--out", default="", help="store directory; default <csv>.ticks next to the CSV")
+    args = ap.parse_args()
+    out = ingest_ticks(args.csv, args.out or None)
+    print(f"[tickstore] wrote {out}")
+
+
+if __name__ == "__main__":
+    main()
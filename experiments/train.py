@@ -1,12 +1,119 @@
 # experiments/train.py
 import argparse, os, json
+from typing import List, Optional
+
 import pandas as pd
 import yaml
-from experiments.pipeline import train_once, save_artifacts  # 仅在 experiments 内部复用
+from experiments.pipeline import train_once, save_artifacts, walk_forward, save_walk_forward  # 仅在 experiments 内部复用
+from experiments.dataset import dataset_spec, is_dataset_spec
+from experiments.tickstore import load_ticks
+
+
+def resolve_factors(factors: str, factors_cfg: str = "configs/factors.yaml") -> List[str]:
+    """逗号分隔因子名；留空则读 YAML（读失败回退 momentum_5）。"""
+    if factors.strip():
+        return [s.strip() for s in factors.split(",") if s.strip()]
+    try:
+        cfg = yaml.safe_load(open(factors_cfg))
+        return [f["name"] for f in cfg["factors"]]
+    except Exception:
+        return ["momentum_5"]
+
+
+def run_train(
+    data: str,
+    model: str,
+    factors: str,
+    outdir: str,
+    horizon: int = 5,
+    eps: float = 0.0,
+    drop_equal: bool = False,
+    scale: bool = False,
+    test_size: float = 1.0 / 6.0,
+    factors_cfg: str = "configs/factors.yaml",
+    df: Optional[pd.DataFrame] = None,
+    onnx: bool = False,
+) -> dict:
+    """训练 + 落盘 artifacts，返回 meta（CLI 与 API worker 共用）。df 可传入已加载的 ticks；onnx=True 另导出 model.onnx。"""
+    if df is None:
+        df = load_ticks(data)
+    factor_names = resolve_factors(factors, factors_cfg)
+
+    res = train_once(
+        df_ticks=df,
+        factor_names=factor_names,
+        model_name=model,
+        horizon=horizon,
+        eps=eps,
+        drop_equal=drop_equal,
+        test_size=test_size,
+        scale=scale,
+        data_path=data,
+    )
+
+    os.makedirs(outdir, exist_ok=True)
+    save_artifacts(outdir, res, extra_meta={
+        "factors": factor_names,
+        "horizon": horizon,
+        "eps": eps,
+        "drop_equal": drop_equal,
+        "scale": scale,
+        "test_size": test_size
+    }, scaler=res.scaler, onnx=onnx)
+
+    with open(os.path.join(outdir, "meta.json"), "r") as f:
+        return json.load(f)
+
+
+def run_walk_forward(
+    data: str,
+    model: str,
+    factors: str,
+    outdir: str,
+    n_folds: int,
+    mode: str = "expanding",
+    train_size: Optional[int] = None,
+    n_jobs: Optional[int] = None,
+    horizon: int = 5,
+    eps: float = 0.0,
+    drop_equal: bool = False,
+    scale: bool = False,
+    factors_cfg: str = "configs/factors.yaml",
+    df: Optional[pd.DataFrame] = None,
+) -> dict:
+    """Walk-forward 训练评估，写 outdir/walk_forward.json 并返回其内容。"""
+    if df is None:
+        df = load_ticks(data)
+    factor_names = resolve_factors(factors, factors_cfg)
+    res = walk_forward(
+        df_ticks=df,
+        factor_names=factor_names,
+        model_name=model,
+        horizon=horizon,
+        eps=eps,
+        drop_equal=drop_equal,
+        n_folds=n_folds,
+        mode=mode,
+        train_size=train_size,
+        scale=scale,
+        n_jobs=n_jobs,
+        data_path=data,
+    )
+    return save_walk_forward(outdir, res, extra_meta={
+        "factors": factor_names,
+        "horizon": horizon,
+        "eps": eps,
+        "n_folds": n_folds,
+        "train_size": train_size,
+    })
+
 
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--data", default="data/orderbook_top_ticks.csv")
+    ap.add_argument("--data", default="data/orderbook_top_ticks.csv", help="CSV / tick store / 分区数据集根目录或 spec")
+    ap.add_argument("--instrument", default="", help="分区数据集：品种（experiments/dataset.py）")
+    ap.add_argument("--start", default="", help="分区数据集：起始日期（含）")
+    ap.add_argument("--end", default="", help="分区数据集：结束日期（含）")
     ap.add_argument("--model", default="logit")
     ap.add_argument("--factors", default="", help="逗号分隔因子名；留空则读 YAML")
     ap.add_argument("--factors_cfg", default="configs/factors.yaml")
@@ -16,41 +123,49 @@ def main():
     ap.add_argument("--scale", action="store_true")
     ap.add_argument("--test_size", type=float, default=1.0/6.0, help="默认 5:1 切分 → 1/6")
     ap.add_argument("--outdir", default="artifacts/latest")
+    ap.add_argument("--onnx", action="store_true", help="另导出 model.onnx + feature_order.json，并校验与 predict_proba 一致")
+    ap.add_argument("--walk_forward", type=int, default=0, help="K>0：改为 K 折 walk-forward（忽略 test_size）")
+    ap.add_argument("--wf_mode", default="expanding", choices=["expanding", "rolling"])
+    ap.add_argument("--wf_train_size", type=int, default=0, help="rolling 训练窗口（样本数）；0=一个 test 窗口")
+    ap.add_argument("--n_jobs", type=int, default=0, help="并行 fold 数；0=min(K, CPU)")
     args = ap.parse_args()
+    if is_dataset_spec(args.data):
+        args.data = dataset_spec(args.data, args.instrument, args.start, args.end)
 
-    df = pd.read_csv(args.data)
+    if args.walk_forward > 0:
+        meta = run_walk_forward(
+            data=args.data,
+            model=args.model,
+            factors=args.factors,
+            outdir=args.outdir,
+            n_folds=args.walk_forward,
+            mode=args.wf_mode,
+            train_size=args.wf_train_size or None,
+            n_jobs=args.n_jobs or None,
+            horizon=args.horizon,
+            eps=args.eps,
+            drop_equal=args.drop_equal,
+            scale=args.scale,
+            factors_cfg=args.factors_cfg,
+        )
+        print(json.dumps(meta))
+        return
 
-    if args.factors.strip():
-        factor_names = [s.strip() for s in args.factors.split(",") if s.strip()]
-    else:
-        try:
-            cfg = yaml.safe_load(open(args.factors_cfg))
-            factor_names = [f["name"] for f in cfg["factors"]]
-        except Exception:
-            factor_names = ["momentum_5"]
-
-    res = train_once(
-        df_ticks=df,
-        factor_names=factor_names,
-        model_name=args.model,
+    meta = run_train(
+        data=args.data,
+        model=args.model,
+        factors=args.factors,
+        outdir=args.outdir,
         horizon=args.horizon,
         eps=args.eps,
         drop_equal=args.drop_equal,
-        test_size=args.test_size,
         scale=args.scale,
+        test_size=args.test_size,
+        factors_cfg=args.factors_cfg,
+        onnx=args.onnx,
     )
 
-    os.makedirs(args.outdir, exist_ok=True)
-    save_artifacts(args.outdir, res, extra_meta={
-        "factors": factor_names,
-        "horizon": args.horizon,
-        "eps": args.eps,
-        "test_size": args.test_size
-    })
-
     # 训练结果简报（给 API 读取）
-    with open(os.path.join(args.outdir, "meta.json"), "r") as f:
-        meta = json.load(f)
     print(json.dumps(meta))  # stdout 打印 JSON，API 可忽略也可解析
 
 if __name__ == "__main__":
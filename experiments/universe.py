@@ -0,0 +1,226 @@
+# experiments/universe.py
+# Universe-level factor job: the factor engine over every (instrument, date) partition a
+# dataset spec selects (experiments/dataset.py), one partition per pool task. The parent
+# preallocates the output panel as .npy files (row counts are known from partition meta)
+# and workers write their row slice in place through memory maps, so only small timing
+# records travel back over the pool. Layout of <outdir>:
+#   factors.npy   float64 (rows, n_factors)      ts_ns.npy  int64 (rows,)
+#   instrument.npy int32 codes (rows,)           panel.json names / instruments / partitions + timing
+#   python -m experiments.universe --data data/ticks_ds --start 2024-01-02 --end 2024-01-31 \
+#       --factors momentum_5,spread --outdir cache/panel --n_jobs 0
+import argparse
+import json
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from experiments.dataset import DatasetSpec, dataset_spec, list_partitions, row_range
+from experiments.tickstore import read_store
+from experiments.train import resolve_factors
+
+PANEL_FILE = "panel.json"
+
+
+def _factor_partition(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Worker: compute one partition's factors and write them into the shared panel files."""
+    import factors  # noqa: F401  (registration in spawned workers)
+    from factors.cache import cached_factors
+    from factors.engine import compute_factor_matrix
+
+    t0 = time.perf_counter()
+    out = {"index": task["index"], "error": None, "failed": []}
+    names = task["factors"]
+    try:
+        df = read_store(task["path"])
+        i0, i1, w = task["i0"], task["i1"], 0
+        if task["prev_path"] and task["warmup_rows"] > 0:
+            prev = read_store(task["prev_path"])
+            prev = prev.iloc[max(0, len(prev) - task["warmup_rows"]):]
+            w = len(prev)
+            df = pd.concat([prev, df.iloc[i0:i1]], ignore_index=True)
+        else:
+            df = df.iloc[i0:i1].reset_index(drop=True)
+        t1 = time.perf_counter()
+        if task["cache_spec"]:
+            X = cached_factors(task["cache_spec"], names, lambda: df)
+            mat, ok = X.to_numpy(dtype=float), list(X.columns)
+        else:
+            mat, ok = compute_factor_matrix(df, names)
+        t2 = time.perf_counter()
+
+        panel = np.load(task["factors_path"], mmap_mode="r+")
+        ts = np.load(task["ts_path"], mmap_mode="r+")
+        lo, hi = task["offset"], task["offset"] + task["rows"]
+        block = panel[lo:hi]
+        pos = {n: j for j, n in enumerate(ok)}
+        for j, name in enumerate(names):
+            block[:, j] = mat[w:, pos[name]] if name in pos else np.nan
+        ts[lo:hi] = df["ts_ns"].to_numpy()[w:]
+        panel.flush()
+        ts.flush()
+        del panel, ts
+        out["failed"] = [n for n in names if n not in pos]
+        out.update(load_s=t1 - t0, compute_s=t2 - t1, write_s=time.perf_counter() - t2)
+    except Exception as e:
+        out["error"] = str(e) or e.__class__.__name__
+    out["seconds"] = time.perf_counter() - t0
+    out["pid"] = os.getpid()
+    return out
+
+
+def run_universe(
+    data: str,
+    factor_names: List[str],
+    outdir: str,
+    n_jobs: Optional[int] = None,
+    warmup_rows: int = 0,
+    use_cache: bool = True,
+) -> Dict[str, Any]:
+    """
+    Factors for every selected partition -> memory-mapped panel in outdir; returns panel.json.
+    warmup_rows > 0 prepends that many rows of the previous day of the same instrument so
+    rolling factors do not restart at the day boundary (those rows are not written; the
+    per-partition factor cache is bypassed in that case).
+    """
+    import factors  # noqa: F401
+    from factors.base import FACTOR_REGISTRY
+    unknown = [n for n in factor_names if n not in FACTOR_REGISTRY]
+    if unknown:
+        raise ValueError(f"unknown factors: {unknown}")
+
+    spec = DatasetSpec.parse(data)
+    parts = list_partitions(spec)
+    if not parts:
+        raise ValueError(f"dataset spec {spec} selects no partitions")
+    # previous day of the same instrument, looked up over the unfiltered date range
+    prev_of: Dict[str, Optional[str]] = {}
+    if warmup_rows > 0:
+        for inst in {p.instrument for p in parts}:
+            every = list_partitions(DatasetSpec(spec.root, (inst,)))
+            for a, b in zip([None] + every[:-1], every):
+                prev_of[b.path] = a.path if a is not None else None
+
+    instruments = sorted({p.instrument for p in parts})
+    code = {s: i for i, s in enumerate(instruments)}
+    tasks, offset = [], 0
+    os.makedirs(outdir, exist_ok=True)
+    factors_path = os.path.join(outdir, "factors.npy")
+    ts_path = os.path.join(outdir, "ts_ns.npy")
+    for p in parts:
+        i0, i1 = row_range(p, spec)
+        rows = i1 - i0
+        single = DatasetSpec(spec.root, (p.instrument,), p.date, p.date, spec.ts_start, spec.ts_end)
+        tasks.append({
+            "index": len(tasks), "instrument": p.instrument, "date": p.date, "path": p.path,
+            "i0": i0, "i1": i1, "rows": rows, "offset": offset, "factors": list(factor_names),
+            "prev_path": prev_of.get(p.path), "warmup_rows": int(warmup_rows),
+            "cache_spec": str(single) if use_cache and warmup_rows <= 0 else None,
+            "factors_path": factors_path, "ts_path": ts_path,
+        })
+        offset += rows
+
+    F = len(factor_names)
+    np.lib.format.open_memmap(factors_path, mode="w+", dtype=np.float64, shape=(offset, F)).flush()
+    np.lib.format.open_memmap(ts_path, mode="w+", dtype=np.int64, shape=(offset,)).flush()
+    inst_codes = np.repeat(np.array([code[t["instrument"]] for t in tasks], dtype=np.int32),
+                           [t["rows"] for t in tasks])
+    np.save(os.path.join(outdir, "instrument.npy"), inst_codes)
+
+    n_jobs = n_jobs or min(len(tasks), os.cpu_count() or 1)
+    t0 = time.perf_counter()
+    work = [t for t in tasks if t["rows"] > 0]
+    if n_jobs > 1 and len(work) > 1:
+        # largest partitions first: fewer stragglers at the end
+        order = sorted(work, key=lambda t: -t["rows"])
+        # spawn like experiments/executor.py: no fork of a calling server's threads/event loop
+        with ProcessPoolExecutor(max_workers=n_jobs, mp_context=mp.get_context("spawn")) as pool:
+            results = list(pool.map(_factor_partition, order))
+    else:
+        results = [_factor_partition(t) for t in work]
+    wall = time.perf_counter() - t0
+
+    by_index = {r["index"]: r for r in results}
+    partitions = []
+    for t in tasks:
+        r = by_index.get(t["index"], {"seconds": 0.0, "error": None, "failed": []})
+        rec = {k: t[k] for k in ("instrument", "date", "offset", "rows")}
+        rec.update({k: r.get(k) for k in ("seconds", "load_s", "compute_s", "write_s", "pid", "error", "failed")})
+        partitions.append(rec)
+    busy = sum(p["seconds"] or 0.0 for p in partitions)
+    panel = {
+        "data": str(spec),
+        "factors": list(factor_names),
+        "instruments": instruments,
+        "rows": int(offset),
+        "n_partitions": len(tasks),
+        "n_jobs": int(n_jobs),
+        "warmup_rows": int(warmup_rows),
+        "wall_seconds": wall,
+        "busy_seconds": busy,
+        "parallel_efficiency": (busy / (wall * n_jobs)) if wall > 0 else None,
+        "errors": sum(1 for p in partitions if p["error"]),
+        "partitions": partitions,
+    }
+    with open(os.path.join(outdir, PANEL_FILE), "w") as f:
+        json.dump(panel, f, indent=2)
+    return panel
+
+
+class FactorPanel:
+    """Read side: memory-mapped (rows, factors) matrix + ts_ns + instrument codes."""
+
+    def __init__(self, outdir: str):
+        with open(os.path.join(outdir, PANEL_FILE)) as f:
+            self.meta = json.load(f)
+        self.names: List[str] = self.meta["factors"]
+        self.instruments: List[str] = self.meta["instruments"]
+        self.values = np.load(os.path.join(outdir, "factors.npy"), mmap_mode="r")
+        self.ts_ns = np.load(os.path.join(outdir, "ts_ns.npy"), mmap_mode="r")
+        self.instrument = np.load(os.path.join(outdir, "instrument.npy"), mmap_mode="r")
+
+    def rows_of(self, instrument: str) -> slice:
+        """Contiguous row block of one instrument (partitions are written instrument-major)."""
+        parts = [p for p in self.meta["partitions"] if p["instrument"] == instrument]
+        if not parts:
+            raise KeyError(instrument)
+        return slice(parts[0]["offset"], parts[-1]["offset"] + parts[-1]["rows"])
+
+    def frame(self, instrument: Optional[str] = None) -> pd.DataFrame:
+        """(instrument, ts_ns, factor...) long frame; one instrument reads only its rows."""
+        rows = self.rows_of(instrument) if instrument is not None else slice(None)
+        df = pd.DataFrame(np.asarray(self.values[rows]), columns=self.names)
+        df.insert(0, "ts_ns", np.asarray(self.ts_ns[rows]))
+        codes = np.asarray(self.instrument[rows])
+        df.insert(0, "instrument", pd.Categorical.from_codes(codes, categories=self.instruments))
+        return df
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Factor panel for every instrument x date partition of a dataset")
+    ap.add_argument("--data", required=True, help="dataset root or spec (experiments/dataset.py)")
+    ap.add_argument("--instrument", default="", help="comma-separated; empty = all")
+    ap.add_argument("--start", default="")
+    ap.add_argument("--end", default="")
+    ap.add_argument("--factors", default="")
+    ap.add_argument("--factors_cfg", default="configs/factors.yaml")
+    ap.add_argument("--outdir", default="cache/panel")
+    ap.add_argument("--n_jobs", type=int, default=0, help="0 = min(#partitions, CPU)")
+    ap.add_argument("--warmup_rows", type=int, default=0, help="rows of the previous day prepended per partition")
+    ap.add_argument("--no_cache", action="store_true", help="bypass the per-partition factor cache")
+    args = ap.parse_args()
+
+    panel = run_universe(
+        dataset_spec(args.data, args.instrument, args.start, args.end),
+        resolve_factors(args.factors, args.factors_cfg), args.outdir,
+        n_jobs=args.n_jobs or None, warmup_rows=args.warmup_rows, use_cache=not args.no_cache,
+    )
+    print(json.dumps({k: v for k, v in panel.items() if k != "partitions"}))
+
+
+if __name__ == "__main__":
+    main()
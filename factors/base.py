@@ -1,14 +1,21 @@
 # factors/base.py
 
-FACTOR_REGISTRY = {}  # name -> {func, category, desc, formula, explanation}
+FACTOR_REGISTRY = {}  # name -> {func, batch, stream, category, desc, formula, explanation}
 
-def register_factor(name: str, category: str, desc: str, formula: str = None, explanation: str = None):
+def register_factor(name: str, category: str, desc: str, formula: str = None, explanation: str = None,
+                    batch=None, stream=None):
     """
     Decorator: register a factor with metadata
+    - batch: optional kernel `batch(ctx) -> np.ndarray` used by the batch engine
+      (see factors/engine.py::FactorContext); falls back to `func(df)` if absent
+    - stream: optional zero-arg factory returning a per-tick state object with
+      `update(tick) -> value` (see factors/stream.py)
     """
     def decorator(func):
         FACTOR_REGISTRY[name] = {
             "func": func,
+            "batch": batch,
+            "stream": stream,
             "category": category,
             "desc": desc,
             "formula": formula,
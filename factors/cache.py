@@ -0,0 +1,160 @@
+# factors/cache.py
+# Content-addressed on-disk factor store:
+#   key = (input file fingerprint, factor name, hash of the factor's source code + factors/engine.py)
+# One .npy column per key; LRU eviction by total size (hits refresh mtime).
+import hashlib
+import inspect
+import os
+import tempfile
+from typing import Callable, List, Optional
+
+import numpy as np
+import pandas as pd
+from factors.base import FACTOR_REGISTRY
+from factors import engine
+from factors.engine import compute_factor_matrix
+
+DEFAULT_CACHE_DIR = os.environ.get("HFT_FACTOR_CACHE", os.path.join("cache", "factors"))
+DEFAULT_MAX_BYTES = 2 << 30  # 2 GiB
+
+
+def file_fingerprint(path: str) -> str:
+    """
+    Cheap identity of an input file: absolute path + size + mtime (ns).
+    A partitioned dataset spec (experiments/dataset.py) hashes its filters and the
+    stamps of every selected partition instead.
+    """
+    if "?" in path or not os.path.isfile(path):
+        from experiments.dataset import dataset_stamp, is_dataset_spec
+        if is_dataset_spec(path):
+            return hashlib.sha1(repr(dataset_stamp(path)).encode()).hexdigest()
+    st = os.stat(path)
+    return f"{os.path.abspath(path)}:{st.st_size}:{st.st_mtime_ns}"
+
+
+_ENGINE_HASH: Optional[str] = None
+
+
+def engine_code_hash() -> str:
+    """Hash of factors/engine.py: batch kernels call FactorContext helpers, so engine edits change results too."""
+    global _ENGINE_HASH
+    if _ENGINE_HASH is None:
+        try:
+            src = inspect.getsource(engine)
+        except (OSError, TypeError):
+            src = getattr(engine, "__file__", "factors.engine")
+        _ENGINE_HASH = hashlib.sha1(src.encode()).hexdigest()
+    return _ENGINE_HASH
+
+
+def factor_code_hash(name: str) -> str:
+    """Hash of the factor's registered code (func + batch kernel) and of the engine; changes invalidate the cache."""
+    meta = FACTOR_REGISTRY[name]
+    h = hashlib.sha1(engine_code_hash().encode())
+    for fn in (meta.get("func"), meta.get("batch")):
+        if fn is None:
+            continue
+        try:
+            src = inspect.getsource(fn)
+        except (OSError, TypeError):
+            src = getattr(fn, "__qualname__", repr(fn))
+        h.update(src.encode())
+    return h.hexdigest()[:16]
+
+
+class FactorCache:
+    def __init__(self, root: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    def path_for(self, data_path: str, name: str, code_hash: str) -> str:
+        digest = hashlib.sha1(f"{file_fingerprint(data_path)}|{name}|{code_hash}".encode()).hexdigest()[:20]
+        return os.path.join(self.root, f"{name}-{digest}.npy")
+
+    def load(self, path: str) -> Optional[np.ndarray]:
+        try:
+            arr = np.load(path)
+        except (OSError, ValueError):
+            return None
+        os.utime(path)  # LRU: mark as recently used
+        return arr
+
+    def store(self, path: str, arr: np.ndarray) -> None:
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, arr)
+        os.replace(tmp, path)  # atomic: concurrent readers never see half a file
+        self.evict()
+
+    def get_or_build(self, data_path: str, name: str, code_hash: str,
+                     build: Callable[[], np.ndarray]) -> np.ndarray:
+        path = self.path_for(data_path, name, code_hash)
+        arr = self.load(path)
+        if arr is None:
+            arr = np.asarray(build())
+            self.store(path, arr)
+        return arr
+
+    def evict(self) -> None:
+        """Drop least-recently-used entries until the store fits in max_bytes."""
+        entries = []
+        total = 0
+        for e in os.scandir(self.root):
+            if e.is_file() and e.name.endswith(".npy"):
+                st = e.stat()
+                entries.append((st.st_mtime_ns, st.st_size, e.path))
+                total += st.st_size
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        for e in os.scandir(self.root):
+            if e.is_file() and e.name.endswith(".npy"):
+                os.remove(e.path)
+
+
+_default_cache: Optional[FactorCache] = None
+
+
+def get_factor_cache() -> FactorCache:
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = FactorCache()
+    return _default_cache
+
+
+def cached_factors(data_path: str, factor_list: List[str], load_df: Callable[[], pd.DataFrame],
+                   cache: Optional[FactorCache] = None) -> pd.DataFrame:
+    """
+    Like compute_factors(load_df(), factor_list), but served from the on-disk
+    cache when possible. `load_df` is only called on a miss, so a fully cached
+    request never parses the input file. Rows are positional (RangeIndex).
+    """
+    cache = cache or get_factor_cache()
+    cols = {}
+    missing = []
+    for name in factor_list:
+        if name not in FACTOR_REGISTRY:
+            print(f"[WARN] Factor {name} failed: unknown factor")
+            continue
+        arr = cache.load(cache.path_for(data_path, name, factor_code_hash(name)))
+        if arr is None:
+            missing.append(name)
+        else:
+            cols[name] = arr
+
+    if missing:
+        mat, names = compute_factor_matrix(load_df(), missing)
+        for j, name in enumerate(names):
+            cols[name] = mat[:, j]
+            cache.store(cache.path_for(data_path, name, factor_code_hash(name)), mat[:, j])
+
+    names = [n for n in factor_list if n in cols]
+    return pd.DataFrame({n: cols[n] for n in names}, columns=names)
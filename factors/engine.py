@@ -1,20 +1,141 @@
 # factors/engine.py
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
 import pandas as pd
 from factors.base import FACTOR_REGISTRY
 
-def compute_factors(df: pd.DataFrame, factor_list=None) -> pd.DataFrame:
+
+class FactorContext:
     """
-    Compute a matrix of factors based on the given factor list.
-    If factor_list is None, compute all registered factors.
+    Shared intermediate cache for one batch computation.
+    Every intermediate (input column, k-lag return, rolling std, ...) is built
+    once as a float64 NumPy array and reused by all factors that ask for it.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.n = len(df)
+        self._cache = {}
+
+    def _get(self, key, build):
+        arr = self._cache.get(key)
+        if arr is None:
+            arr = build()
+            self._cache[key] = arr
+        return arr
+
+    def col(self, name: str) -> np.ndarray:
+        """Raw input column as float64 (KeyError if missing)."""
+        return self._get(("col", name), lambda: self.df[name].to_numpy(dtype=float))
+
+    def pct_change(self, k: int = 1, col: str = "midprice") -> np.ndarray:
+        """Same as df[col].pct_change(k) on a gap-free series."""
+        def build():
+            p = self.col(col)
+            out = np.full(self.n, np.nan)
+            if self.n > k:
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    out[k:] = p[k:] / p[:-k] - 1.0
+            return out
+        return self._get(("pct", col, k), build)
+
+    def rolling_std(self, k: int, window: int, col: str = "midprice") -> np.ndarray:
+        """
+        df[col].pct_change(k).rolling(window).std() (ddof=1) in O(n). Windows without a change
+        of value are exactly 0; elsewhere the variance is within ~1e-16 * var(x) of the exact one
+        (a near-zero std can be off by ~1e-9 * std(x)), independent of session length.
+        """
+        def build():
+            x = self.pct_change(k, col)
+            valid = np.isfinite(x)
+            out = np.full(self.n, np.nan)
+            if window < 2 or valid.sum() < window:
+                return out
+            # de-mean before summing to keep the S2 - S1^2/w difference well conditioned
+            x0 = np.where(valid, x - x[valid].mean(), 0.0)
+            s1 = _window_sums(x0, window)
+            s2 = _window_sums(x0 * x0, window)
+            cnt = _window_sums(valid.astype(np.int64), window)
+            var = np.maximum((s2 - s1 * s1 / window) / (window - 1), 0.0)
+            # windows without a single change of value: exact zero (integer counts, no rounding)
+            changed = np.r_[0, (x0[1:] != x0[:-1]).astype(np.int64)]
+            var[_window_sums(changed, window - 1)[1:] == 0] = 0.0
+            out[window - 1:] = np.where(cnt == window, np.sqrt(var), np.nan)
+            return out
+        return self._get(("rstd", col, k, window), build)
+
+    def spread(self) -> np.ndarray:
+        return self._get(("spread",), lambda: self.col("ask") - self.col("bid"))
+
+    def imbalance(self) -> np.ndarray:
+        """(bid_qty - ask_qty) / (bid_qty + ask_qty); NaN where the book is empty."""
+        def build():
+            bq, aq = self.col("bid_qty"), self.col("ask_qty")
+            denom = bq + aq
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return np.where(denom != 0, (bq - aq) / denom, np.nan)
+        return self._get(("imbalance",), build)
+
+
+def _window_sums(x: np.ndarray, window: int, block: int = 4096) -> np.ndarray:
+    """
+    Sums of every length-`window` run (n - window + 1 values). Prefix sums restart at each
+    block, so a window sum carries the rounding of at most two blocks, not of the whole series.
+    """
+    n = len(x)
+    block = max(block, window)
+    nb = -(-n // block)
+    padded = np.zeros(nb * block, dtype=x.dtype)
+    padded[:n] = x
+    local = np.cumsum(padded.reshape(nb, block), axis=1).ravel()   # per-block inclusive prefix
+    lo = np.arange(n - window + 1)                                  # first row of each window
+    hi = lo + window - 1                                            # last row
+    before = np.where(lo % block, local[np.maximum(lo - 1, 0)], 0)  # prefix up to lo-1 in lo's block
+    block_end = (lo // block + 1) * block - 1                       # a window spans at most two blocks
+    return np.where(lo // block == hi // block, local[hi] - before, local[block_end] - before + local[hi])
+
+
+def _eval_factor(name: str, df: pd.DataFrame, ctx: FactorContext) -> np.ndarray:
+    meta = FACTOR_REGISTRY[name]
+    if meta.get("batch") is not None:
+        return meta["batch"](ctx)
+    res = meta["func"](df)
+    return pd.Series(res, index=df.index).to_numpy(dtype=float, na_value=np.nan)
+
+
+def compute_factor_matrix(df: pd.DataFrame, factor_list: Optional[List[str]] = None
+                          ) -> Tuple[np.ndarray, List[str]]:
+    """
+    Batch engine: evaluate factors against one shared FactorContext and write
+    them into a preallocated (n_rows, n_factors) float64 matrix.
+    Returns (matrix, names); failed factors are warned about and left out.
     """
     if factor_list is None:
         factor_list = list(FACTOR_REGISTRY.keys())
 
-    out = pd.DataFrame(index=df.index)
-    for name in factor_list:
+    ctx = FactorContext(df)
+    out = np.empty((len(df), len(factor_list)), dtype=float)
+    ok = []
+    for j, name in enumerate(factor_list):
         try:
-            func = FACTOR_REGISTRY[name]["func"]
-            out[name] = func(df)
+            out[:, j] = _eval_factor(name, df, ctx)
+            ok.append(j)
         except Exception as e:
             print(f"[WARN] Factor {name} failed: {e}")
-    return out
+    if len(ok) < len(factor_list):
+        out = out[:, ok]
+    return out, [factor_list[j] for j in ok]
+
+
+def compute_factors(df: Union[pd.DataFrame, str], factor_list=None) -> pd.DataFrame:
+    """
+    Compute a matrix of factors based on the given factor list.
+    If factor_list is None, compute all registered factors.
+    `df` may also be a data path or partitioned dataset spec (experiments/dataset.py).
+    """
+    if isinstance(df, str):
+        from experiments.tickstore import load_ticks
+        df = load_ticks(df)
+    mat, names = compute_factor_matrix(df, factor_list)
+    return pd.DataFrame(mat, index=df.index, columns=names)
@@ -1,13 +1,16 @@
 # factors/liquidity/spread.py
 import pandas as pd
 from factors.base import register_factor
+from factors.stream import SpreadState, ImbalanceState
 
 @register_factor(
     name="spread",
     category="liquidity",
     desc="Bid-ask spread",
     formula=r"Spread(t) = Ask_1(t) - Bid_1(t)",
-    explanation="The price difference between the best ask and best bid, reflecting market liquidity."
+    explanation="The price difference between the best ask and best bid, reflecting market liquidity.",
+    batch=lambda ctx: ctx.spread(),
+    stream=SpreadState,
 )
 def spread(df: pd.DataFrame) -> pd.Series:
     return df["ask"] - df["bid"]
@@ -18,7 +21,9 @@ def spread(df: pd.DataFrame) -> pd.Series:
     category="liquidity",
     desc="Order book imbalance",
     formula=r"OI(t) = \frac{Q_{bid}(t) - Q_{ask}(t)}{Q_{bid}(t) + Q_{ask}(t)}",
-    explanation="Measures the imbalance between bid and ask order quantities, indicating buy/sell pressure."
+    explanation="Measures the imbalance between bid and ask order quantities, indicating buy/sell pressure.",
+    batch=lambda ctx: ctx.imbalance(),
+    stream=ImbalanceState,
 )
 def order_imbalance(df: pd.DataFrame) -> pd.Series:
     denom = (df["bid_qty"] + df["ask_qty"]).replace(0, pd.NA)
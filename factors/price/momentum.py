@@ -1,13 +1,16 @@
 # factors/price/momentum.py
 import pandas as pd
 from factors.base import register_factor
+from factors.stream import MomentumState
 
 @register_factor(
     name="momentum_5",
     category="price",
     desc="5-tick momentum",
     formula=r"Momentum_5(t) = \frac{P_t}{P_{t-5}} - 1",
-    explanation="Measures the percentage price change over the past 5 ticks."
+    explanation="Measures the percentage price change over the past 5 ticks.",
+    batch=lambda ctx: ctx.pct_change(5),
+    stream=lambda: MomentumState(5),
 )
 def momentum_5(df: pd.DataFrame) -> pd.Series:
     return df["midprice"].pct_change(5)
@@ -18,7 +21,9 @@ def momentum_5(df: pd.DataFrame) -> pd.Series:
     category="price",
     desc="20-tick momentum",
     formula=r"Momentum_20(t) = \frac{P_t}{P_{t-20}} - 1",
-    explanation="Measures the percentage price change over the past 20 ticks."
+    explanation="Measures the percentage price change over the past 20 ticks.",
+    batch=lambda ctx: ctx.pct_change(20),
+    stream=lambda: MomentumState(20),
 )
 def momentum_20(df: pd.DataFrame) -> pd.Series:
     return df["midprice"].pct_change(20)
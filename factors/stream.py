@@ -0,0 +1,151 @@
+# factors/stream.py
+# Streaming (tick-by-tick) factor evaluation: one O(1) state object per factor.
+# Values match the batch path in factors/engine.py (NaN during warm-up).
+import math
+from typing import Dict, List, Mapping, Optional
+
+import numpy as np
+from factors.base import FACTOR_REGISTRY
+
+NAN = float("nan")
+
+
+class RingBuffer:
+    """Fixed-capacity float ring; `push` returns the value that fell out (NaN while filling)."""
+
+    def __init__(self, capacity: int):
+        self.buf = np.full(capacity, np.nan)
+        self.capacity = capacity
+        self.head = 0
+        self.count = 0
+
+    def push(self, x: float) -> float:
+        old = float(self.buf[self.head])
+        self.buf[self.head] = x
+        self.head = (self.head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+            return NAN
+        return old
+
+    @property
+    def full(self) -> bool:
+        return self.count == self.capacity
+
+
+class FactorState:
+    """Base class: `update(tick) -> value`, where tick maps midprice/bid/ask/bid_qty/ask_qty."""
+
+    def update(self, tick: Mapping[str, float]) -> float:
+        raise NotImplementedError
+
+
+class MomentumState(FactorState):
+    """P_t / P_{t-k} - 1 with a k-slot ring of past prices."""
+
+    def __init__(self, k: int, col: str = "midprice"):
+        self.col = col
+        self.ring = RingBuffer(k)
+
+    def update(self, tick):
+        p = float(tick[self.col])
+        lag = self.ring.push(p)
+        if lag != lag:  # still warming up
+            return NAN
+        if lag == 0:  # mirror NumPy division: x/0 -> +-inf, 0/0 -> NaN
+            return math.copysign(math.inf, p) if p != 0 else NAN
+        return p / lag - 1.0
+
+
+class RollingVolState(FactorState):
+    """
+    Rolling std (ddof=1) of k-lag returns over `window` samples.
+    Welford add/remove keeps mean/M2 of the finite samples in the window in O(1); non-finite
+    returns still occupy their slot and make the value NaN until they leave, like the
+    batch path (pandas `rolling` semantics). A window of identical returns is exactly 0.
+    """
+
+    def __init__(self, k: int, window: int, col: str = "midprice"):
+        self.mom = MomentumState(k, col)
+        self.window = window
+        self.rets = RingBuffer(window)
+        self.n = 0            # finite samples in the window
+        self.n_bad = 0        # NaN / inf samples in the window
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.run = 0          # length of the current run of identical returns
+        self.last = NAN
+
+    def update(self, tick):
+        r = self.mom.update(tick)
+        full = self.rets.full
+        old = self.rets.push(r)
+        if full:  # drop the sample leaving the window
+            if math.isfinite(old):
+                self.n -= 1
+                if self.n == 0:
+                    self.mean = self.m2 = 0.0
+                else:
+                    d = old - self.mean
+                    self.mean -= d / self.n
+                    self.m2 -= d * (old - self.mean)
+            else:
+                self.n_bad -= 1
+        if math.isfinite(r):
+            self.n += 1
+            d = r - self.mean
+            self.mean += d / self.n
+            self.m2 += d * (r - self.mean)
+            self.run = self.run + 1 if r == self.last else 1
+        else:
+            self.n_bad += 1
+            self.run = 0
+        self.last = r
+        if self.n < self.window or self.n_bad:
+            return NAN
+        if self.run >= self.window:
+            return 0.0
+        return math.sqrt(max(self.m2 / (self.n - 1), 0.0))
+
+
+class SpreadState(FactorState):
+    def update(self, tick):
+        return float(tick["ask"]) - float(tick["bid"])
+
+
+class ImbalanceState(FactorState):
+    def update(self, tick):
+        bq, aq = float(tick["bid_qty"]), float(tick["ask_qty"])
+        denom = bq + aq
+        return (bq - aq) / denom if denom != 0 else NAN
+
+
+class FactorStream:
+    """
+    Evaluate several factors tick by tick.
+    `update(tick)` returns a reused float64 buffer ordered like `names`.
+    """
+
+    def __init__(self, factor_list: Optional[List[str]] = None):
+        if factor_list is None:
+            factor_list = [n for n, m in FACTOR_REGISTRY.items() if m.get("stream") is not None]
+        self.names: List[str] = []
+        self.states: List[FactorState] = []
+        for name in factor_list:
+            meta = FACTOR_REGISTRY.get(name)
+            if meta is None or meta.get("stream") is None:
+                raise ValueError(f"Factor {name} has no streaming implementation")
+            self.names.append(name)
+            self.states.append(meta["stream"]())
+        self.out = np.full(len(self.names), np.nan)
+
+    def update(self, tick: Mapping[str, float]) -> np.ndarray:
+        if "midprice" not in tick and "bid" in tick and "ask" in tick:
+            tick = dict(tick)
+            tick["midprice"] = (float(tick["bid"]) + float(tick["ask"])) / 2.0
+        for j, st in enumerate(self.states):
+            self.out[j] = st.update(tick)
+        return self.out
+
+    def as_dict(self) -> Dict[str, float]:
+        return dict(zip(self.names, self.out.tolist()))
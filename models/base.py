@@ -1,7 +1,42 @@
 # models/base.py
 # Model registry for HFTSim
+import numpy as np
+
 MODEL_REGISTRY = {}
 
+
+class OnlineModel:
+    """
+    Incremental-model interface (intraday updates without refitting on the full history).
+    - partial_fit(X, y): consume one mini-batch; cost depends on batch size and #features only
+    - reset(): forget everything (fresh weights)
+    - fit(X, y): reset + partial_fit over `batch_size` chunks, so online models also run
+      through the regular train/backtest pipeline
+    Subclasses implement reset / partial_fit / predict_proba ((n, 2) like sklearn).
+    """
+    batch_size = 1024
+
+    def reset(self):
+        raise NotImplementedError
+
+    def partial_fit(self, X, y):
+        raise NotImplementedError
+
+    def predict_proba(self, X):
+        raise NotImplementedError
+
+    def fit(self, X, y):
+        self.reset()
+        y = np.asarray(y)
+        for i in range(0, len(y), self.batch_size):
+            rows = X.iloc[i:i + self.batch_size] if hasattr(X, "iloc") else X[i:i + self.batch_size]
+            self.partial_fit(rows, y[i:i + self.batch_size])
+        return self
+
+    def predict(self, X):
+        return (self.predict_proba(X)[:, 1] > 0.5).astype(int)
+
+
 def register_model(name: str, desc: str, task: str = "classification"):
     """
     Decorator to register a model class.
@@ -14,6 +49,7 @@ def register_model(name: str, desc: str, task: str = "classification"):
             "name": name,
             "desc": desc,
             "task": task,
+            "online": issubclass(cls, OnlineModel),
             "class": cls
         }
         return cls
@@ -23,3 +59,8 @@ def register_model(name: str, desc: str, task: str = "classification"):
 def get_all_models():
     """Return all registered models (with class objects)"""
     return MODEL_REGISTRY
+
+
+def get_online_models():
+    """Registered models that implement OnlineModel (partial_fit)"""
+    return {name: meta for name, meta in MODEL_REGISTRY.items() if meta.get("online")}
@@ -0,0 +1,225 @@
+# models/fast.py
+# Low-latency single-row inference. Registered models expose `to_fast_predictor()`
+# which extracts the fitted parameters into plain NumPy arrays:
+#   - linear: coef · x + b -> sigmoid
+#   - trees : all trees flattened into node arrays (feature / threshold / children /
+#             default direction / leaf value), walked by a JIT kernel (numba optional)
+# Callers fill a preallocated float64 buffer in `feature_order` and call
+# `predict_proba_one(buf)`: no DataFrame, no validation, no per-call allocation.
+import json
+import math
+import time
+from typing import Dict, Mapping, Optional, Sequence
+
+import numpy as np
+
+try:  # optional accelerator
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:  # pragma: no cover - depends on environment
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda f: f
+
+
+class FastPredictor:
+    """Base: feature order + reusable row buffer; subclasses implement `margin_one`."""
+
+    def __init__(self, feature_order: Sequence[str]):
+        self.feature_order = list(feature_order)
+        self.n_features = len(self.feature_order)
+        self._index = {name: i for i, name in enumerate(self.feature_order)}
+        self.buffer = np.zeros(self.n_features, dtype=np.float64)
+
+    def fill(self, row: Mapping[str, float], out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Write a {feature: value} mapping into `out` (default: self.buffer) in feature order."""
+        buf = self.buffer if out is None else out
+        for name, i in self._index.items():
+            buf[i] = row[name]
+        return buf
+
+    def margin_one(self, x: np.ndarray) -> float:
+        raise NotImplementedError
+
+    def predict_proba_one(self, x: np.ndarray) -> float:
+        """P(y=1) for one float64 row already in feature order."""
+        z = self.margin_one(x)
+        if z >= 0:
+            return 1.0 / (1.0 + math.exp(-z))
+        e = math.exp(z)
+        return e / (1.0 + e)
+
+    def predict_one(self, x: np.ndarray, threshold: float = 0.5) -> int:
+        return int(self.predict_proba_one(x) > threshold)
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Batch helper (parity checks): (n, n_features) -> (n,) probabilities."""
+        X = np.ascontiguousarray(np.asarray(X, dtype=np.float64))
+        return np.array([self.predict_proba_one(X[i]) for i in range(X.shape[0])])
+
+
+class FastLinear(FastPredictor):
+    def __init__(self, coef: np.ndarray, intercept: float, feature_order: Sequence[str]):
+        super().__init__(feature_order)
+        self.coef = np.ascontiguousarray(np.asarray(coef, dtype=np.float64).ravel())
+        self.intercept = float(intercept)
+        if self.coef.shape[0] != self.n_features:
+            raise ValueError(f"coef has {self.coef.shape[0]} entries, feature_order has {self.n_features}")
+
+    def margin_one(self, x: np.ndarray) -> float:
+        return float(self.coef.dot(x)) + self.intercept
+
+    def predict_proba(self, X) -> np.ndarray:
+        z = np.asarray(X, dtype=np.float64) @ self.coef + self.intercept
+        return 1.0 / (1.0 + np.exp(-z))
+
+
+@njit(cache=True)
+def _trees_margin(x, roots, feat, thr, left, right, default_left, value, base):
+    z = base
+    for t in range(roots.shape[0]):
+        node = roots[t]
+        while left[node] >= 0:
+            v = x[feat[node]]
+            if v != v:                                  # NaN -> default direction
+                node = left[node] if default_left[node] else right[node]
+            elif np.float32(v) < thr[node]:             # xgboost compares in float32
+                node = left[node]
+            else:
+                node = right[node]
+        z += value[node]
+    return z
+
+
+class FastTrees(FastPredictor):
+    """
+    Flat tree ensemble. Node arrays are global (tree t starts at roots[t]); leaves have left == -1.
+    Decision rule (xgboost): go left if float32(x[f]) < thr, missing -> default_left.
+    """
+
+    def __init__(self, roots, feat, thr, left, right, default_left, value, base_margin: float,
+                 feature_order: Sequence[str]):
+        super().__init__(feature_order)
+        self.roots = np.ascontiguousarray(roots, dtype=np.int64)
+        self.feat = np.ascontiguousarray(feat, dtype=np.int64)
+        self.thr = np.ascontiguousarray(thr, dtype=np.float32)
+        self.left = np.ascontiguousarray(left, dtype=np.int64)
+        self.right = np.ascontiguousarray(right, dtype=np.int64)
+        self.default_left = np.ascontiguousarray(default_left, dtype=np.bool_)
+        self.value = np.ascontiguousarray(value, dtype=np.float64)
+        self.base_margin = float(base_margin)
+        self._x32 = np.zeros(self.n_features, dtype=np.float32)   # numpy fallback scratch
+        self._nodes = self.roots.copy()
+
+    def margin_one(self, x: np.ndarray) -> float:
+        if HAVE_NUMBA:
+            return _trees_margin(x, self.roots, self.feat, self.thr, self.left, self.right,
+                                 self.default_left, self.value, self.base_margin)
+        return self._margin_numpy(x)
+
+    def _margin_numpy(self, x: np.ndarray) -> float:
+        # level-synchronous walk of all trees at once (no per-node Python loop)
+        x32 = self._x32
+        x32[:] = x
+        nodes = self._nodes
+        nodes[:] = self.roots
+        while True:
+            inner = self.left[nodes] >= 0
+            if not inner.any():
+                break
+            cur = nodes[inner]
+            v = x32[self.feat[cur]]
+            go_left = np.where(np.isnan(v), self.default_left[cur], v < self.thr[cur])
+            nodes[inner] = np.where(go_left, self.left[cur], self.right[cur])
+        return float(self.value[nodes].sum()) + self.base_margin
+
+    @classmethod
+    def from_xgboost(cls, booster, feature_order: Sequence[str]) -> "FastTrees":
+        """Parse a binary:logistic xgboost Booster (JSON model) into flat arrays."""
+        model = json.loads(booster.save_raw("json"))
+        learner = model["learner"]
+        objective = learner["objective"]["name"]
+        if objective != "binary:logistic":
+            raise NotImplementedError(f"FastTrees supports binary:logistic, got {objective}")
+        trees = learner["gradient_booster"]["model"]["trees"]
+        roots, feat, thr, left, right, dleft, value = [], [], [], [], [], [], []
+        offset = 0
+        for tree in trees:
+            if any(tree.get("split_type", [])):
+                raise NotImplementedError("categorical splits are not supported")
+            lc = np.asarray(tree["left_children"], dtype=np.int64)
+            rc = np.asarray(tree["right_children"], dtype=np.int64)
+            leaf = lc < 0
+            roots.append(offset)
+            feat.append(np.asarray(tree["split_indices"], dtype=np.int64))
+            cond = np.asarray(tree["split_conditions"], dtype=np.float64)
+            thr.append(np.where(leaf, 0.0, cond))
+            value.append(np.where(leaf, cond, 0.0))     # leaf weight is stored in split_conditions
+            left.append(np.where(leaf, -1, lc + offset))
+            right.append(np.where(leaf, -1, rc + offset))
+            dleft.append(np.asarray(tree["default_left"], dtype=bool))
+            offset += len(lc)
+        base_score = float(str(learner["learner_model_param"]["base_score"]).strip("[]"))
+        base_margin = math.log(base_score / (1.0 - base_score))
+        return cls(np.asarray(roots), np.concatenate(feat), np.concatenate(thr), np.concatenate(left),
+                   np.concatenate(right), np.concatenate(dleft), np.concatenate(value),
+                   base_margin, feature_order)
+
+
+class PreprocessedPredictor(FastPredictor):
+    """
+    Scores raw factor rows (e.g. FactorStream.update output): the run's preprocessing
+    stage (experiments/preprocess.FeaturePipeline: NaN fill, column selection, scaling)
+    is applied into an internal buffer, then the inner predictor runs.
+    """
+
+    def __init__(self, inner: FastPredictor, preprocess):
+        super().__init__(preprocess.inputs)
+        if list(preprocess.columns) != inner.feature_order:
+            raise ValueError("preprocess.columns must match the predictor's feature_order")
+        self.inner = inner
+        self.preprocess = preprocess
+        self._features = np.zeros(inner.n_features, dtype=np.float64)
+
+    def margin_one(self, x: np.ndarray) -> float:
+        return self.inner.margin_one(self.preprocess.transform_one(x, self._features))
+
+    def predict_proba(self, X) -> np.ndarray:
+        return self.inner.predict_proba(self.preprocess.transform(np.asarray(X, dtype=np.float64)))
+
+
+def to_fast_predictor(model, feature_order: Optional[Sequence[str]] = None, preprocess=None) -> FastPredictor:
+    """
+    Fast path of any registered model that implements `to_fast_predictor`.
+    With `preprocess` (a FeaturePipeline) the predictor takes raw factors in preprocess.inputs order.
+    """
+    fn = getattr(model, "to_fast_predictor", None)
+    if fn is None:
+        raise NotImplementedError(f"{type(model).__name__} has no to_fast_predictor()")
+    if preprocess is None:
+        return fn(feature_order)
+    return PreprocessedPredictor(fn(list(preprocess.columns)), preprocess)
+
+
+def fitted_feature_order(est, feature_order: Optional[Sequence[str]] = None):
+    """Explicit order, else the column names the estimator was fitted on, else f0..fn-1."""
+    if feature_order is not None:
+        return list(feature_order)
+    names = getattr(est, "feature_names_in_", None)
+    if names is not None:
+        return [str(c) for c in names]
+    return [f"f{i}" for i in range(int(est.n_features_in_))]
+
+
+def bench(pred: FastPredictor, X: np.ndarray, repeat: int = 20000) -> Dict[str, float]:
+    """Mean latency of predict_proba_one over `repeat` calls on rows of X (µs per call)."""
+    X = np.ascontiguousarray(np.asarray(X, dtype=np.float64))
+    pred.predict_proba_one(X[0])  # JIT warm-up
+    n = X.shape[0]
+    t0 = time.perf_counter()
+    for i in range(repeat):
+        pred.predict_proba_one(X[i % n])
+    return {"us_per_row": (time.perf_counter() - t0) / repeat * 1e6, "numba": HAVE_NUMBA}
@@ -2,6 +2,7 @@
 import pandas as pd
 from sklearn.linear_model import LogisticRegression
 from models.base import register_model
+from models.fast import FastLinear, fitted_feature_order
 
 @register_model(name="logit", desc="Logistic Regression classifier", task="classification")
 class LogitModel:
@@ -16,3 +17,8 @@ class LogitModel:
 
     def predict_proba(self, X: pd.DataFrame):
         return self.clf.predict_proba(X)
+
+    def to_fast_predictor(self, feature_order=None) -> FastLinear:
+        """Coefficients as a NumPy dot product (binary classification)."""
+        return FastLinear(self.clf.coef_[0], self.clf.intercept_[0],
+                          fitted_feature_order(self.clf, feature_order))
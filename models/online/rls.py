@@ -0,0 +1,90 @@
+# models/online/rls.py
+import numpy as np
+import pandas as pd
+from models.base import OnlineModel, register_model
+
+try:  # optional accelerator
+    from numba import njit
+except ImportError:  # pragma: no cover - depends on environment
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda f: f
+
+
+@njit(cache=True)
+def _rls_rows(P, w, Z, y, lam):
+    """Rank-one RLS step per row (Sherman-Morrison on P = A⁻¹), in place; O(d²) per row."""
+    d = Z.shape[1]
+    Pz = np.empty(d)
+    for i in range(Z.shape[0]):
+        z = Z[i]
+        denom = lam
+        err = y[i]
+        for a in range(d):
+            s = 0.0
+            for b in range(d):
+                s += P[a, b] * z[b]
+            Pz[a] = s
+            denom += z[a] * s
+            err -= z[a] * w[a]
+        for a in range(d):
+            k = Pz[a] / denom
+            w[a] += k * err
+            for b in range(d):
+                P[a, b] = (P[a, b] - k * Pz[b]) / lam
+
+
+@register_model(name="rls", desc="Recursive least squares / Bayesian linear regression (online, forgetting)",
+                task="classification")
+class RLSModel(OnlineModel):
+    """
+    Linear probability model p = clip(w·[x, 1], 0, 1), fitted by exponentially weighted RLS:
+        A <- lam A + z zᵀ,   w = A⁻¹ r,   A0 = delta I
+    The covariance P = A⁻¹ is kept and updated one row at a time (Sherman-Morrison), so a
+    batch of b rows costs O(b·d²) with no factorization (d = #features + 1).
+    With lam = 1 this is the Bayesian linear regression posterior mean under a N(0, 1/delta)
+    prior; lam < 1 discounts old rows (half-life ln2/(1-lam) rows), the prior included, so
+    directions the features stop exciting regain variance over time.
+    """
+
+    def __init__(self, lam: float = 1.0, delta: float = 1.0):
+        self.lam = lam
+        self.delta = delta
+        self.reset()
+
+    def reset(self):
+        self.P = None
+        self.coef_ = None
+        self.n_seen = 0
+        return self
+
+    @staticmethod
+    def _design(X) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float64)
+        return np.hstack([X, np.ones((X.shape[0], 1))])
+
+    def partial_fit(self, X: pd.DataFrame, y):
+        if hasattr(X, "columns"):
+            self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        Z = self._design(X)
+        y = np.asarray(y, dtype=np.float64)
+        if self.P is None:
+            d = Z.shape[1]
+            self.P = np.eye(d) / self.delta
+            self.coef_ = np.zeros(d)
+        _rls_rows(self.P, self.coef_, Z, y, float(self.lam))
+        self.P = 0.5 * (self.P + self.P.T)   # keep rounding from breaking symmetry
+        self.n_seen += len(y)
+        return self
+
+    def predict_proba(self, X: pd.DataFrame):
+        if self.coef_ is None:
+            return np.full((len(X), 2), 0.5)
+        p = np.clip(self._design(X) @ self.coef_, 0.0, 1.0)
+        return np.column_stack([1.0 - p, p])
+
+    def predict_std(self, X: pd.DataFrame) -> np.ndarray:
+        """Posterior std of w·x (noise variance 1) — the Bayesian view's parameter uncertainty."""
+        Z = self._design(X)
+        return np.sqrt(np.einsum("ij,jk,ik->i", Z, self.P, Z))
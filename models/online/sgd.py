@@ -0,0 +1,37 @@
+# models/online/sgd.py
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDClassifier
+from models.base import OnlineModel, register_model
+from models.fast import FastLinear, fitted_feature_order
+
+CLASSES = np.array([0, 1])
+
+
+@register_model(name="sgd_logit", desc="Online logistic regression (SGD, partial_fit)", task="classification")
+class SGDLogitModel(OnlineModel):
+    def __init__(self, alpha: float = 1e-4, eta0: float = 0.01):
+        self.alpha = alpha
+        self.eta0 = eta0
+        self.reset()
+
+    def reset(self):
+        # constant step: keeps adapting intraday instead of decaying towards a frozen model
+        self.clf = SGDClassifier(loss="log_loss", alpha=self.alpha, learning_rate="constant", eta0=self.eta0)
+        self.n_seen = 0
+        return self
+
+    def partial_fit(self, X: pd.DataFrame, y):
+        self.clf.partial_fit(X, y, classes=CLASSES)
+        self.n_seen += len(y)
+        return self
+
+    def predict_proba(self, X: pd.DataFrame):
+        if self.n_seen == 0:
+            return np.full((len(X), 2), 0.5)
+        return self.clf.predict_proba(X)
+
+    def to_fast_predictor(self, feature_order=None) -> FastLinear:
+        """Current weights as a NumPy dot product (rebuild after each partial_fit)."""
+        return FastLinear(self.clf.coef_[0], self.clf.intercept_[0],
+                          fitted_feature_order(self.clf, feature_order))
@@ -2,6 +2,7 @@
 import pandas as pd
 from xgboost import XGBClassifier
 from models.base import register_model
+from models.fast import FastTrees, fitted_feature_order
 
 @register_model(name="xgb", desc="XGBoost Classifier")
 class XGBModel:
@@ -15,4 +16,8 @@ class XGBModel:
         return self.clf.predict(X)
 
     def predict_proba(self, X: pd.DataFrame):
-        return self.clf.predict_proba(X)[:, 1]
\ No newline at end of file
+        return self.clf.predict_proba(X)[:, 1]
+
+    def to_fast_predictor(self, feature_order=None) -> FastTrees:
+        """Trees flattened into node arrays (see models/fast.py)."""
+        return FastTrees.from_xgboost(self.clf.get_booster(), fitted_feature_order(self.clf, feature_order))
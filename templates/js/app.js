@@ -4,7 +4,63 @@ window.HFT = {
   lastArtifactsDir: null,
   darkLayout: { paper_bgcolor:'#1c1c1c', plot_bgcolor:'#1c1c1c', font:{color:'#fff'}, margin:{t:40,r:10,b:40,l:50} },
   fmt: (x,d=4)=>{ if(x==null||x===undefined) return "-"; if(typeof x!=='number') return x; if(!isFinite(x)) return String(x); return x.toFixed(d); },
-  setStatus: (id,msg,kind='ok')=>{ const el=document.getElementById(id); el.textContent=msg; el.style.color=(kind==='loading')?'#ffd166':(kind==='err'?'#ff6b6b':'#9be564'); }
+  setStatus: (id,msg,kind='ok')=>{ const el=document.getElementById(id); el.textContent=msg; el.style.color=(kind==='loading')?'#ffd166':(kind==='err'?'#ff6b6b':'#9be564'); },
+  // chart width in points for server-side downsampling (~2 rows per pixel)
+  plotPoints: (id)=>{ const el=document.getElementById(id); return Math.max(200, 2*Math.round((el && el.clientWidth) || 1000)); }
+};
+
+// format=b64 payloads: {dtype, shape, b64} -> typed arrays (int64 -> Float64Array for Plotly)
+HFT.decodeArrays = function(obj){
+  if (Array.isArray(obj)) return obj.map(HFT.decodeArrays);
+  if (!obj || typeof obj !== 'object') return obj;
+  if (typeof obj.b64 === 'string' && obj.dtype){
+    const bin = atob(obj.b64), buf = new ArrayBuffer(bin.length), u8 = new Uint8Array(buf);
+    for (let i = 0; i < bin.length; i++) u8[i] = bin.charCodeAt(i);
+    const T = {f8:Float64Array, f4:Float32Array, i4:Int32Array, u4:Uint32Array, i2:Int16Array, u2:Uint16Array,
+               i1:Int8Array, u1:Uint8Array, i8:BigInt64Array, u8:BigUint64Array}[obj.dtype];
+    if (!T) throw new Error(`unsupported dtype ${obj.dtype}`);
+    const arr = new T(buf);
+    return (T === BigInt64Array || T === BigUint64Array) ? Float64Array.from(arr, Number) : arr;
+  }
+  const out = {};
+  for (const [k, v] of Object.entries(obj)) out[k] = HFT.decodeArrays(v);
+  return out;
+};
+
+// zoom: on x-range change re-query a /range endpoint (pyramid buckets) and redraw the same div
+HFT.bindZoom = function(divId, draw){
+  const el = document.getElementById(divId);
+  if (!el || !el.on) return;
+  if (el.removeAllListeners) el.removeAllListeners('plotly_relayout');
+  let seq = 0;
+  el.on('plotly_relayout', async (ev)=>{
+    let lo = ev['xaxis.range[0]'], hi = ev['xaxis.range[1]'];
+    if (ev['xaxis.range']) [lo, hi] = ev['xaxis.range'];
+    if (lo === undefined && !ev['xaxis.autorange']) return;
+    const mine = ++seq;
+    try{
+      const q = new URLSearchParams({points: HFT.plotPoints(divId), format: 'b64'});
+      if (lo !== undefined){ q.set('start_ns', Math.floor(+lo)); q.set('end_ns', Math.ceil(+hi)); }
+      await draw(q, () => mine === seq);
+    }catch(err){ console.error(err); }
+  });
+};
+
+// min/max band + last line for one series of a /range reply
+HFT.rangeTraces = function(s, name, label){
+  return [
+    {x:s.ts, y:s[`${name}_max`], type:'scatter', mode:'lines', line:{width:0}, showlegend:false, hoverinfo:'skip'},
+    {x:s.ts, y:s[`${name}_min`], type:'scatter', mode:'lines', line:{width:0}, fill:'tonexty',
+     fillcolor:'rgba(0,170,255,0.2)', showlegend:false, hoverinfo:'skip'},
+    {x:s.ts, y:s[`${name}_last`], type:'scatter', mode:'lines', name:label || name},
+  ];
+};
+
+HFT.fetchSeries = async function(url){
+  const res = await fetch(url);
+  if (!res.ok) throw new Error(`HTTP ${res.status}`);
+  const data = await res.json();
+  return data.encoding === 'b64' ? HFT.decodeArrays(data) : data;
 };
 
 window.addEventListener('DOMContentLoaded', ()=>{
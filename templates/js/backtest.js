@@ -7,7 +7,7 @@
     H.setStatus('backtest-status','Backtesting…','loading');
     H.clearBacktest();
 
-    const q = new URLSearchParams({horizon});
+    const q = new URLSearchParams({horizon, points: H.plotPoints('pnl-plot'), format: 'b64'});
     if (H.lastArtifactsDir) q.set('artifacts_dir', H.lastArtifactsDir);
     else {
       if (!H.selectedFactor){ alert('先选择一个因子'); return; }
@@ -16,14 +16,14 @@
     }
 
     try{
-      const res = await fetch(`/api/backtest?${q.toString()}`);
-      if (!res.ok) throw new Error(`HTTP ${res.status}`);
-      const data = await res.json();
+      const data = await H.fetchSeries(`/api/backtest?${q.toString()}`);
 
       // KPI badges
-      const k = data.risk || {}; const c = data.classification || {};
+      const k = data.risk || {}; const c = data.classification || {}; const kn = data.risk_net || {};
       document.getElementById('kpi').innerHTML = [
         H.badge('Max Drawdown', k.max_drawdown),
+        H.badge('PnL (net)', kn.pnl_net),
+        H.badge('Costs', kn.cost_total),
         H.badge('Sharpe(step)', k.sharpe_step),
         H.badge('Exposure', k.exposure),
         H.badge('Turnover', k.turnover),
@@ -36,8 +36,25 @@
       ].join('');
 
       // 1) cumulative PnL
-      Plotly.newPlot('pnl-plot', [{x:data.series.ts, y:data.series.pnl, type:'scatter', mode:'lines', name:'PnL'}],
+      const pnlTraces = [{x:data.series.ts, y:data.series.pnl, type:'scatter', mode:'lines', name:'PnL'}];
+      if (data.series.pnl_net) pnlTraces.push({x:data.series.ts, y:data.series.pnl_net, type:'scatter', mode:'lines', name:'PnL (net of costs)'});
+      Plotly.newPlot('pnl-plot', pnlTraces,
         Object.assign({}, H.darkLayout, {title:'Cumulative PnL (Test 1/6)', xaxis:{title:'Time'}, yaxis:{title:'PnL'}}), {responsive:true});
+      // zoom -> /api/backtest/range (pyramid buckets of the visible window)
+      H.bindZoom('pnl-plot', async (q, current) => {
+        q.set('artifacts_dir', data.artifacts_dir); q.set('horizon', horizon);
+        q.set('latency_ticks', (data.costs || {}).latency_ticks || 0);
+        const r = await H.fetchSeries(`/api/backtest/range?${q.toString()}`);
+        if (!current()) return;
+        const range = q.has('start_ns') ? [+q.get('start_ns'), +q.get('end_ns')] : undefined;
+        Plotly.react('pnl-plot', H.rangeTraces(r.series, 'pnl', 'PnL').concat(H.rangeTraces(r.series, 'pnl_net', 'PnL (net of costs)')),
+          Object.assign({}, H.darkLayout, {title:'Cumulative PnL (Test 1/6)', xaxis:{title:'Time', range}, yaxis:{title:'PnL'}}), {responsive:true});
+      });
+
+      // 1b) threshold sweep (all thresholds from one sort) + slider lookups
+      H.lastBacktest = {artifacts_dir: data.artifacts_dir, sweep: data.threshold_sweep,
+                        horizon, latency_ticks: (data.costs || {}).latency_ticks || 0};
+      H.setupThresholdSlider(data);
 
       // 2) drawdown
       Plotly.newPlot('dd-plot', [{x:data.series.ts, y:data.series.drawdown, type:'scatter', mode:'lines', name:'Drawdown'}],
@@ -103,4 +120,73 @@
       console.error(err);
     }
   };
+
+  H.setupThresholdSlider = function(data){
+    const sw = data.threshold_sweep;
+    const box = document.getElementById('thr-controls');
+    if (!sw || !sw.threshold || !sw.threshold.length){ box.style.display = 'none'; return; }
+    const lo = sw.threshold[0], hi = sw.threshold[sw.threshold.length - 1];
+    for (const id of ['thr-long', 'thr-short']){
+      const el = document.getElementById(id);
+      el.min = lo; el.max = hi; el.step = Math.max((hi - lo) / 500, 1e-6);
+      el.value = data.threshold;
+    }
+    document.getElementById('thr-short-on').checked = false;
+    document.getElementById('thr-long-val').textContent = H.fmt(data.threshold, 3);
+    document.getElementById('thr-short-val').textContent = '';
+    document.getElementById('thr-kpi').textContent = '';
+    box.style.display = 'flex';
+    H.plotSweep(data.threshold);
+  };
+
+  H.plotSweep = function(thr){
+    const sw = H.lastBacktest && H.lastBacktest.sweep;
+    if (!sw) return;
+    const traces = [
+      {x:sw.threshold, y:sw.pnl, type:'scatter', mode:'lines', name:'PnL'},
+      {x:sw.threshold, y:sw.pnl_net, type:'scatter', mode:'lines', name:'PnL (net)'},
+      {x:sw.threshold, y:sw.f1, type:'scatter', mode:'lines', name:'F1', yaxis:'y2', line:{dash:'dot'}},
+    ];
+    const layout = Object.assign({}, H.darkLayout, {
+      title:'Threshold sweep', xaxis:{title:'Threshold (long if p > thr)'}, yaxis:{title:'PnL'},
+      yaxis2:{title:'F1', overlaying:'y', side:'right', range:[0,1]},
+      shapes:[{type:'line', x0:thr, x1:thr, yref:'paper', y0:0, y1:1, line:{dash:'dot', color:'#aaa'}}]
+    });
+    Plotly.react('sweep-plot', traces, layout, {responsive:true});
+  };
+
+  // slider -> /api/backtest/threshold (lookup in the precomputed sweep, no model run)
+  let thrTimer = null, thrSeq = 0;
+  H.onThreshold = function(){
+    clearTimeout(thrTimer);
+    thrTimer = setTimeout(async () => {
+      if (!H.lastBacktest || !H.lastBacktest.artifacts_dir) return;
+      const tl = +document.getElementById('thr-long').value;
+      const shortOn = document.getElementById('thr-short-on').checked;
+      let ts = +document.getElementById('thr-short').value;
+      if (shortOn && ts > tl){ ts = tl; document.getElementById('thr-short').value = ts; }
+      document.getElementById('thr-long-val').textContent = H.fmt(tl, 3);
+      document.getElementById('thr-short-val').textContent = shortOn ? H.fmt(ts, 3) : '';
+      const q = new URLSearchParams({artifacts_dir: H.lastBacktest.artifacts_dir, t_long: tl,
+                                     horizon: H.lastBacktest.horizon, latency_ticks: H.lastBacktest.latency_ticks,
+                                     points: H.plotPoints('pnl-plot'), format: 'b64'});
+      if (shortOn) q.set('t_short', ts);
+      const seq = ++thrSeq;
+      try{
+        const r = await H.fetchSeries(`/api/backtest/threshold?${q.toString()}`);
+        if (seq !== thrSeq) return;   // a newer slider position already answered
+        const x = r.series.ts;
+        Plotly.react('pnl-plot', [
+          {x, y:r.series.pnl, type:'scatter', mode:'lines', name:'PnL'},
+          {x, y:r.series.pnl_net, type:'scatter', mode:'lines', name:'PnL (net of costs)'},
+        ], Object.assign({}, H.darkLayout, {title:'Cumulative PnL (Test 1/6)', xaxis:{title:'Time'}, yaxis:{title:'PnL'}}), {responsive:true});
+        document.getElementById('thr-kpi').textContent =
+          `PnL ${H.fmt(r.pnl, 5)} · net ${H.fmt(r.pnl_net, 5)} · MaxDD ${H.fmt(r.max_drawdown, 5)} · ` +
+          `exposure ${H.fmt(r.exposure, 3)} · turnover ${H.fmt(r.turnover, 0)}` + (shortOn ? '' : ` · F1 ${H.fmt(r.f1, 3)}`);
+        H.plotSweep(tl);
+      }catch(err){
+        console.error(err);
+      }
+    }, 50);
+  };
 })(window.HFT);
@@ -33,9 +33,17 @@
     document.getElementById('factor-formula').textContent = meta.formula || '';
     document.getElementById('factor-explanation').textContent = meta.explanation || '';
 
-    const res = await fetch(`/api/compute?factor=${encodeURIComponent(name)}`);
-    const data = await res.json();
-    Plotly.newPlot('plot', [{x:data.x, y:data.y, type:'scatter', mode:'lines'}],
-      Object.assign({}, H.darkLayout, {title:`${name} over time`}), {responsive:true});
+    const q = new URLSearchParams({factor: name, points: H.plotPoints('plot'), format: 'b64'});
+    const data = await H.fetchSeries(`/api/compute?${q.toString()}`);
+    const layout = Object.assign({}, H.darkLayout, {title:`${name} over time`});
+    Plotly.newPlot('plot', [{x:data.x, y:data.y, type:'scatter', mode:'lines'}], layout, {responsive:true});
+    // zoom -> /api/compute/range (min/max/last buckets of the visible window only)
+    H.bindZoom('plot', async (q, current) => {
+      q.set('factor', name);
+      const r = await H.fetchSeries(`/api/compute/range?${q.toString()}`);
+      if (!current() || H.selectedFactor !== name) return;
+      const keep = Object.assign({}, layout, {xaxis:{range: q.has('start_ns') ? [+q.get('start_ns'), +q.get('end_ns')] : undefined}});
+      Plotly.react('plot', H.rangeTraces(r.series, 'y', name), keep, {responsive:true});
+    });
   };
 })(window.HFT);
@@ -1,5 +1,24 @@
 # tickify.py
-import os, csv, numpy as np, pandas as pd, random
+# 日线 OHLCV -> 合成顶档 tick（ts_ns, side, price, qty）。
+# 每天的时间戳 / 中间价轨迹 / 数量整列向量化生成；每天用 (seed, 行号) 派生独立随机流，
+# 结果与进程数、分块大小无关。输出 CSV（大批量写入）或直接写 experiments/tickstore 列式库。
+#   python tickify.py --in data/origin_daily.csv --out data/orderbook_top_ticks.csv --workers 4
+#   python tickify.py --format store --out data/orderbook_top_ticks.ticks
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:  # optional: ~10x faster CSV writer than DataFrame.to_csv
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    HAVE_ARROW = True
+except ImportError:  # pragma: no cover - depends on environment
+    HAVE_ARROW = False
 
 # ===== 可调参数 =====
 DATA_IN  = "data/origin_daily.csv"
@@ -9,17 +28,18 @@ TICK_SIZE = 0.01
 LOT       = 10       # 数量粒度
 TS_START_NS = 1_600_000_000_000_000_000  # 任意起点ns
 RNG_SEED  = 42
+DT_MIN_NS, DT_MAX_NS = 50_000, 200_000   # 每个tick间隔 50–200 微秒
+CHUNK_DAYS = 64      # 每个任务 / 每次写盘的天数
 
-random.seed(RNG_SEED); np.random.seed(RNG_SEED)
-
-def round_tick(p): return round(round(p / TICK_SIZE) * TICK_SIZE, 2)
+def round_tick(p): return np.round(np.round(np.asarray(p) / TICK_SIZE) * TICK_SIZE, 2)
 
 def ticks_per_day(volume):  # 基于成交量的粗略分配，避免过少或过多
-    return max(200, min(int(volume/1000), 5000))
+    return np.maximum(200, np.minimum((np.asarray(volume) / 1000).astype(np.int64), 5000))
 
-def brownian_bridge(n, start, end, low, high, vol=0.25):
+def brownian_bridge(n, start, end, low, high, vol=0.25, rng=None):
+    rng = rng if rng is not None else np.random.default_rng()
     t = np.linspace(0, 1, n)
-    bm = np.cumsum(np.random.normal(scale=vol/np.sqrt(n), size=n))
+    bm = np.cumsum(rng.normal(scale=vol/np.sqrt(n), size=n))
     bridge = start + (end - start)*t + (bm - t*bm[-1])
     return np.clip(bridge, low, high)
 
@@ -42,46 +62,113 @@ def normalize_cols(df):
         raise ValueError(f"缺少必要列: {missing}")
     return df
 
+def load_days(path: str) -> pd.DataFrame:
+    """读日线并数值化；无法解析的行丢弃，保留原始行号 day_id 作为随机流种子的一部分。"""
+    df = normalize_cols(pd.read_csv(path))
+    days = pd.DataFrame({c: pd.to_numeric(df[c], errors="coerce")
+                         for c in ("Open", "High", "Low", "Close", "Volume")})
+    days["day_id"] = np.arange(len(df))
+    return days.dropna().reset_index(drop=True)
+
+def simulate_day(day_id, o, h, l, c, v, seed=RNG_SEED, spread=SPREAD):
+    """一天的 tick 数组：(dt_ns, bid, ask, qty)，随机流只取决于 (seed, day_id)。"""
+    rng = np.random.default_rng([seed, int(day_id)])
+    n = int(ticks_per_day(v))
+    mid_path = brownian_bridge(n, o, c, l, h, vol=0.25, rng=rng)
+    # 把总量大致分配到每个tick（加随机，量化到LOT）
+    qty = np.maximum(LOT, (v / n) * (0.5 + rng.random(n))).astype(np.int64)
+    qty = (qty // LOT) * LOT
+    dt = rng.integers(DT_MIN_NS, DT_MAX_NS, size=n, dtype=np.int64)
+    mid = round_tick(mid_path)
+    return dt, round_tick(mid - spread / 2), round_tick(mid + spread / 2), qty
+
+def simulate_chunk(task: Tuple[np.ndarray, int, float]) -> Dict[str, np.ndarray]:
+    """一组天（行 = day_id, O, H, L, C, V）拼成连续数组；进程池的任务单元。"""
+    rows, seed, spread = task
+    parts = [simulate_day(*r, seed=seed, spread=spread) for r in rows]
+    if not parts:
+        return {k: np.empty(0) for k in ("dt", "bid", "ask", "qty")}
+    return {k: np.concatenate([p[j] for p in parts]) for j, k in enumerate(("dt", "bid", "ask", "qty"))}
+
+def iter_chunks(days: pd.DataFrame, workers: int = 1, seed: int = RNG_SEED, spread: float = SPREAD,
+                chunk_days: int = CHUNK_DAYS, ts_start: int = TS_START_NS):
+    """按原顺序产出每块 tick 列（ts_ns 已累加为绝对时间）；workers>1 时并行生成、顺序拼接。"""
+    rows = days[["day_id", "Open", "High", "Low", "Close", "Volume"]].to_numpy(dtype=float)
+    tasks = [(rows[i:i + chunk_days], seed, spread) for i in range(0, len(rows), chunk_days)]
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 and len(tasks) > 1 else None
+    try:
+        results = pool.map(simulate_chunk, tasks) if pool else map(simulate_chunk, tasks)
+        ts = ts_start
+        for r in results:
+            dt = r.pop("dt")
+            r["ts_ns"] = ts + np.cumsum(dt)
+            if len(dt):
+                ts = int(r["ts_ns"][-1])
+            yield r
+    finally:
+        if pool:
+            pool.shutdown()
+
+def write_csv_chunk(f, chunk: Dict[str, np.ndarray]) -> int:
+    """每个 tick 两行（顶档买 & 顶档卖），整块一次写出。"""
+    n = len(chunk["ts_ns"])
+    long = pd.DataFrame({
+        "ts_ns": np.repeat(chunk["ts_ns"], 2),
+        "side": np.tile(np.array(["BUY", "SELL"], dtype=object), n),
+        "price": np.column_stack([chunk["bid"], chunk["ask"]]).ravel(),
+        "qty": np.repeat(chunk["qty"], 2),
+    })
+    if HAVE_ARROW:
+        buf = pa.BufferOutputStream()
+        pa_csv.write_csv(pa.Table.from_pandas(long, preserve_index=False), buf,
+                         pa_csv.WriteOptions(include_header=False, quoting_style="none"))
+        f.write(buf.getvalue().to_pybytes())
+    else:
+        long.to_csv(f, header=False, index=False, float_format="%.2f", lineterminator="\n")
+    return 2 * n
+
+def tickify(data_in: str = DATA_IN, data_out: str = DATA_OUT, fmt: str = "csv", workers: int = 1,
+            seed: int = RNG_SEED, spread: float = SPREAD, chunk_days: int = CHUNK_DAYS) -> dict:
+    days = load_days(data_in)
+    out_dir = os.path.dirname(data_out)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    chunks = iter_chunks(days, workers, seed, spread, chunk_days)
+    ticks = 0
+    if fmt == "csv":
+        with open(data_out, "wb") as f:
+            f.write(b"ts_ns,side,price,qty\n")
+            for chunk in chunks:
+                ticks += write_csv_chunk(f, chunk) // 2
+    elif fmt == "store":
+        from experiments.tickstore import write_store
+        parts: List[Dict[str, np.ndarray]] = list(chunks)
+        col = lambda k: np.concatenate([p[k] for p in parts]) if parts else np.empty(0)
+        bid, ask, qty = col("bid"), col("ask"), col("qty").astype(float)
+        mid = pd.DataFrame({"ts_ns": col("ts_ns").astype(np.int64), "bid": bid, "ask": ask,
+                            "bid_qty": qty, "ask_qty": qty, "midprice": (bid + ask) / 2.0})
+        write_store(mid, data_out)
+        ticks = len(mid)
+    else:
+        raise ValueError(f"unknown format {fmt!r} (csv|store)")
+    return {"days": int(len(days)), "ticks": int(ticks), "out": data_out, "format": fmt}
+
 def main():
-    os.makedirs(os.path.dirname(DATA_OUT), exist_ok=True)
-
-    df = pd.read_csv(DATA_IN)
-    df = normalize_cols(df)
-
-    with open(DATA_OUT, "w", newline="") as f:
-        csv.writer(f).writerow(["ts_ns","side","price","qty"])
-
-    ts_ns = TS_START_NS
-    for _, r in df.iterrows():
-        try:
-            o,h,l,c,v = float(r["Open"]), float(r["High"]), float(r["Low"]), float(r["Close"]), float(r["Volume"])
-        except:
-            continue
-        n = ticks_per_day(v)
-        if n <= 0: continue
-
-        # 生成中间价轨迹
-        mid_path = brownian_bridge(n, o, c, l, h, vol=0.25)
-
-        # 把总量大致分配到每个tick（加随机，量化到LOT）
-        qtys = np.maximum(LOT, (v/max(n,1))*(0.5+np.random.rand(n))).astype(int)
-        qtys = (qtys // LOT) * LOT
-
-        with open(DATA_OUT, "a", newline="") as f:
-            w = csv.writer(f)
-            for i in range(n):
-                # 时间推进（每个tick间隔 50–200 微秒）
-                ts_ns += np.random.randint(50_000, 200_000)
-                mid = round_tick(mid_path[i])
-                bid = round_tick(mid - SPREAD/2)
-                ask = round_tick(mid + SPREAD/2)
-                q = int(qtys[i])
-
-                # 一次写两行：顶档买 & 顶档卖
-                w.writerow([ts_ns, "BUY",  bid, q])
-                w.writerow([ts_ns, "SELL", ask, q])
-
-    print(f"[tickify] wrote {DATA_OUT}")
+    ap = argparse.ArgumentParser(description="Daily OHLCV -> synthetic top-of-book ticks")
+    ap.add_argument("--in", dest="data_in", default=DATA_IN)
+    ap.add_argument("--out", default=DATA_OUT, help="CSV path, or the store directory with --format store")
+    ap.add_argument("--format", choices=["csv", "store"], default="csv")
+    ap.add_argument("--workers", type=int, default=1, help="processes (0 = all cores); output does not depend on it")
+    ap.add_argument("--seed", type=int, default=RNG_SEED)
+    ap.add_argument("--spread", type=float, default=SPREAD)
+    ap.add_argument("--chunk_days", type=int, default=CHUNK_DAYS)
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    info = tickify(args.data_in, args.out, args.format, args.workers or (os.cpu_count() or 1),
+                   args.seed, args.spread, args.chunk_days)
+    print(f"[tickify] wrote {info['out']} ({info['days']} days, {info['ticks']} ticks, "
+          f"{time.perf_counter() - t0:.2f}s)")
 
 if __name__ == "__main__":
     main()